@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite of the Nengoo API.
+
+Boots the FastAPI `app` of server.py in-process against a local MongoDB
+(a dedicated database, dropped and re-seeded with synthetic_data), then drives
+scenario scripts through the ASGI interface and reports throughput and
+p50/p95/p99 latencies per scenario.
+
+    python benchmark.py --products 10000 --requests 500 --concurrency 10
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json --tolerance 0.2   # exit 1 on regression
+
+MongoDB: --mongo-url (or BENCH_MONGO_URL), default mongodb://localhost:27017,
+e.g. `docker run -p 27017:27017 mongo:7`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlencode
+
+SCENARIOS = {}
+
+
+def scenario(func):
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+# --- Scenarios: each returns the requests of one iteration (method, path, headers, body) ---
+
+@scenario
+def catalog_browse(rng, dataset):
+    return [
+        ("GET", "/api/products", {}, None),
+        ("GET", "/api/categories", {}, None),
+        ("GET", "/api/products/max-price", {}, None),
+    ]
+
+
+@scenario
+def search(rng, dataset):
+    from synthetic_data import WORDS
+    return [("GET", "/api/products?" + urlencode({"search": rng.choice(WORDS)}), {}, None)]
+
+
+@scenario
+def product_page(rng, dataset):
+    product_id = rng.choice(dataset.product_ids)
+    return [
+        ("GET", f"/api/products/{product_id}", {}, None),
+        ("GET", f"/api/products/{product_id}/reviews", {}, None),
+        ("GET", f"/api/interactions/product/{product_id}", {}, None),
+    ]
+
+
+@scenario
+def checkout(rng, dataset):
+    buyer_index = rng.randrange(len(dataset.buyer_ids))
+    body = {
+        "firstName": "Acheteur", "lastName": str(buyer_index),
+        "email": f"buyer{buyer_index}@example.com", "phone": f"+2375{buyer_index:08d}",
+        "address": "Quartier Bastos", "city": "Yaoundé", "region": "Centre",
+        "paymentMethod": "cashOnDelivery", "deliveryOption": "delivery",
+        "cartItems": [{"id": pid, "quantity": rng.randint(1, 3)} for pid in rng.sample(dataset.product_ids, 2)],
+    }
+    return [("POST", "/api/checkout", {}, body)]
+
+
+@scenario
+def admin_orders(rng, dataset):
+    return [("GET", "/api/orders", {"X-Admin-Role": "admin"}, None)]
+
+
+@scenario
+def seller_analytics(rng, dataset):
+    return [("GET", f"/api/sellers/{rng.choice(dataset.seller_ids)}/analytics", {}, None)]
+
+
+# --- Minimal ASGI driver (no network, no HTTP client dependency) ---
+
+async def asgi_request(app, method, path, headers, body):
+    """Returns (status, latency in seconds until the last body chunk)."""
+    path, _, query_string = path.partition("?")
+    raw_body = json.dumps(body).encode() if body is not None else b""
+    header_list = [(k.lower().encode(), str(v).encode()) for k, v in headers.items()]
+    if body is not None:
+        header_list.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query_string.encode(), "root_path": "", "headers": header_list,
+        "client": ("127.0.0.1", 50000), "server": ("benchmark", 80),
+    }
+    done = asyncio.Event()
+    request_sent = False
+    result = {"status": None, "end": None}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": raw_body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            result["end"] = time.perf_counter()
+            done.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return result["status"], (result["end"] or time.perf_counter()) - start
+
+
+class Lifespan:
+    def __init__(self, app):
+        self.app = app
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        self.task = None
+
+    async def _call(self, event):
+        await self.incoming.put({"type": event})
+        message = await self.outgoing.get()
+        if message["type"].endswith(".failed"):
+            raise RuntimeError(f"{event} failed: {message.get('message')}")
+
+    async def startup(self):
+        self.task = asyncio.create_task(
+            self.app({"type": "lifespan", "asgi": {"version": "3.0"}}, self.incoming.get, self.outgoing.put)
+        )
+        await self._call("lifespan.startup")
+
+    async def shutdown(self):
+        await self._call("lifespan.shutdown")
+        await self.task
+
+
+# --- Runner ---
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(app, name, dataset, iterations, concurrency, warmup, seed):
+    rng = random.Random(seed)
+    build = SCENARIOS[name]
+
+    async def iteration():
+        total = 0.0
+        for method, path, headers, body in build(rng, dataset):
+            status_code, latency = await asgi_request(app, method, path, headers, body)
+            total += latency
+            if status_code >= 400:
+                return total, False
+        return total, True
+
+    for _ in range(warmup):
+        await iteration()
+
+    latencies, errors = [], 0
+    remaining = iterations
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            latency, ok = await iteration()
+            latencies.append(latency)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "iterations": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if current["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']:.1f}ms > baseline {reference['p95_ms']:.1f}ms")
+        if current["throughput"] < reference["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['throughput']:.1f} it/s < baseline {reference['throughput']:.1f} it/s")
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'scenario':<18}{'it':>7}{'err':>6}{'it/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['iterations']:>7}{r['errors']:>6}{r['throughput']:>10.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+
+async def main(args):
+    if "bench" not in args.db_name:
+        sys.exit("❌ --db-name must contain 'bench': the database is dropped before seeding")
+
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["SUPPRESS_SEND"] = "true"
+
+    import server
+    from synthetic_data import seed_database
+
+    await server.client.drop_database(args.db_name)
+    print(f"🌱 Seeding {args.products} products, {args.orders} orders, "
+          f"{args.interactions} interactions, {args.messages} messages...")
+    seed_start = time.perf_counter()
+    dataset = await seed_database(server.db, args.products, args.orders, args.interactions, args.messages, args.seed)
+    print(f"   done in {time.perf_counter() - seed_start:.1f}s")
+
+    lifespan = Lifespan(server.app)
+    await lifespan.startup()
+    try:
+        results = {}
+        for name in args.scenarios:
+            print(f"▶️  {name}")
+            results[name] = await run_scenario(
+                server.app, name, dataset, args.requests, args.concurrency, args.warmup, args.seed
+            )
+    finally:
+        await lifespan.shutdown()
+
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ No regression against the baseline")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Nengoo API against a local MongoDB")
+    parser.add_argument("--mongo-url", default=os.getenv("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="nengoo_bench")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--interactions", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="iterations per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline")
+    parser.add_argument("--baseline", help="fail if p95/throughput regress against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression ratio (default 0.2)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,155 @@
+"""
+Catalog filters and facet counts (GET /api/products/facets).
+
+`build_query` turns the catalog filters into a MongoDB query; GET /api/products
+applies it server-side. `compute_facets` counts, in a single `$facet`
+aggregation, the products per category, seller, price bucket, rating bucket and
+stock state, plus the price range. Each facet ignores its own filter (price
+counts are not restricted by the selected price range, and so on), so the UI
+can show the alternatives of every filter.
+
+Results are cached per query signature for FACETS_CACHE_SECONDS. Product
+writes call `facet_cache.clear()`; the TTL bounds staleness across workers.
+"""
+
+import os
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# XAF; last bucket is open-ended
+PRICE_BOUNDARIES = [0, 5000, 10000, 25000, 50000, 100000, 250000, 500000]
+RATING_BOUNDARIES = [0, 1, 2, 3, 4, 5.01]
+TOP_SELLERS = 20
+
+FILTERS = ("category", "seller_id", "min_price", "max_price", "min_rating", "in_stock")
+
+
+def build_query(search: Optional[str] = None, exclude: Optional[str] = None, **filters) -> dict:
+    """Query of the catalog filters (FILTERS), without the `exclude` one."""
+    query = {}
+    if search:
+        query["$or"] = [
+            {"name": {"$regex": search, "$options": "i"}},
+            {"description": {"$regex": search, "$options": "i"}},
+        ]
+    if filters.get("category") and exclude != "category":
+        query["category"] = filters["category"]
+    if filters.get("seller_id") and exclude != "seller_id":
+        query["sellerId"] = filters["seller_id"]
+    if exclude != "price":
+        price = {}
+        if filters.get("min_price") is not None:
+            price["$gte"] = filters["min_price"]
+        if filters.get("max_price") is not None:
+            price["$lte"] = filters["max_price"]
+        if price:
+            query["price"] = price
+    if filters.get("min_rating") is not None and exclude != "rating":
+        query["rating"] = {"$gte": filters["min_rating"]}
+    if filters.get("in_stock") is not None and exclude != "in_stock":
+        query["stock"] = {"$gt": 0} if filters["in_stock"] else {"$lte": 0}
+    return query
+
+
+def _bucket_label(boundaries, value) -> str:
+    index = boundaries.index(value)
+    if index + 1 < len(boundaries):
+        return f"{value}-{boundaries[index + 1]}"
+    return f"{value}+"
+
+
+async def compute_facets(db, search: Optional[str] = None, **filters) -> dict:
+    """
+    {"total", "priceRange": {"min", "max"}, "categories": [{"value", "count"}], "sellers": [...],
+     "prices": [{"value": "5000-10000", "min", "max", "count"}], "ratings": [...], "inStock": {"true", "false"}}
+    """
+    def facet(dimension, *stages):
+        return [{"$match": build_query(None, exclude=dimension, **filters)}, *stages]
+
+    pipeline = [
+        # The text filter is shared by every facet; the others are applied per facet
+        {"$match": build_query(search)},
+        {"$facet": {
+            "total": facet(None, {"$count": "count"}),
+            "priceRange": facet("price", {"$group": {"_id": None, "min": {"$min": "$price"}, "max": {"$max": "$price"}}}),
+            "categories": facet("category", {"$sortByCount": "$category"}),
+            "sellers": facet(
+                "seller_id",
+                {"$group": {"_id": "$sellerId", "name": {"$first": "$sellerName"}, "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": TOP_SELLERS},
+            ),
+            "prices": facet("price", {"$bucket": {
+                "groupBy": "$price", "boundaries": PRICE_BOUNDARIES + [float("inf")], "default": "other",
+            }}),
+            "ratings": facet("rating", {"$bucket": {
+                "groupBy": {"$ifNull": ["$rating", 0]}, "boundaries": RATING_BOUNDARIES, "default": "other",
+            }}),
+            "inStock": facet("in_stock", {"$group": {"_id": {"$gt": ["$stock", 0]}, "count": {"$sum": 1}}}),
+        }},
+    ]
+    result = (await db.products.aggregate(pipeline).to_list(1))[0]
+
+    price_range = result["priceRange"][0] if result["priceRange"] else {"min": 0.0, "max": 0.0}
+    boundaries = PRICE_BOUNDARIES + [None]
+    return {
+        "total": result["total"][0]["count"] if result["total"] else 0,
+        "priceRange": {"min": price_range["min"], "max": price_range["max"]},
+        "categories": [{"value": c["_id"], "count": c["count"]} for c in result["categories"]],
+        "sellers": [{"value": s["_id"], "name": s.get("name"), "count": s["count"]} for s in result["sellers"]],
+        "prices": [
+            {"value": _bucket_label(PRICE_BOUNDARIES, b["_id"]), "min": b["_id"],
+             "max": boundaries[PRICE_BOUNDARIES.index(b["_id"]) + 1], "count": b["count"]}
+            for b in result["prices"] if b["_id"] != "other"
+        ],
+        "ratings": [
+            {"value": f"{b['_id']}+", "min": b["_id"], "count": b["count"]}
+            for b in result["ratings"] if b["_id"] != "other"
+        ],
+        "inStock": {str(s["_id"]).lower(): s["count"] for s in result["inStock"]},
+    }
+
+
+def signature(search: Optional[str], **filters) -> str:
+    normalized = {"search": (search or "").strip().lower() or None}
+    normalized.update({name: filters.get(name) for name in FILTERS})
+    return json.dumps(normalized, sort_keys=True)
+
+
+class FacetCache:
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # {signature: (expires_at, facets)}
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, facets: dict):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, facets)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+facet_cache = FacetCache(ttl_seconds=float(os.getenv("FACETS_CACHE_SECONDS", "60")))
+
+
+async def get_facets(db, search: Optional[str] = None, **filters) -> dict:
+    search = (search or "").strip() or None
+    key = signature(search, **filters)
+    facets = facet_cache.get(key)
+    if facets is None:
+        facets = await compute_facets(db, search, **filters)
+        facet_cache.put(key, facets)
+    return facets
@@ -0,0 +1,189 @@
+"""
+Catalog statistics (price range, product and in-stock counts) kept up to date
+on product writes and served from memory.
+
+`db.catalog_stats` holds one document per scope:
+    {"_id": "global" | "category:<name>", "count", "inStock", "minPrice", "maxPrice", "updatedAt"}
+
+Product writes call `record_change(db, before, after)` with the product as it
+was and as it is (None for a creation / deletion), or `record_changes` for a
+batch: counts are `$inc`ed and the price range widened with `$min` / `$max`;
+when the product that held the minimum or maximum leaves the scope or changes
+price, that bound is recomputed with one indexed query. Each worker keeps the documents in `stats`, reloads
+the scopes it changed and refreshes everything every CATALOG_STATS_REFRESH_SECONDS
+for the writes of the other workers.
+
+`reconcile` recomputes every scope from the products (one aggregation):
+    python catalog_stats.py        # e.g. nightly, or after bulk imports
+"""
+
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Fields to read from a product before a write
+PROJECTION = {"_id": 0, "category": 1, "price": 1, "stock": 1}
+
+REFRESH_SECONDS = float(os.getenv("CATALOG_STATS_REFRESH_SECONDS", "30"))
+GLOBAL = "global"
+EMPTY = {"count": 0, "inStock": 0, "minPrice": None, "maxPrice": None}
+
+
+def scope_id(category: Optional[str] = None) -> str:
+    return f"category:{category}" if category else GLOBAL
+
+
+def _scopes(product: Optional[dict]) -> List[str]:
+    if not product:
+        return []
+    return [GLOBAL, scope_id(product.get("category"))] if product.get("category") else [GLOBAL]
+
+
+def _in_stock(product: dict) -> int:
+    return 1 if (product.get("stock") or 0) > 0 else 0
+
+
+class CatalogStats:
+    def __init__(self):
+        self.scopes: Dict[str, dict] = {}
+
+    def get(self, category: Optional[str] = None) -> dict:
+        return self.scopes.get(scope_id(category), EMPTY)
+
+    async def reload(self, db, scope_ids: Optional[List[str]] = None):
+        query = {"_id": {"$in": list(scope_ids)}} if scope_ids is not None else {}
+        docs = {doc["_id"]: doc async for doc in db.catalog_stats.find(query)}
+        if scope_ids is None:
+            self.scopes = docs
+        else:
+            for scope in scope_ids:
+                if scope in docs:
+                    self.scopes[scope] = docs[scope]
+                else:
+                    self.scopes.pop(scope, None)
+
+
+stats = CatalogStats()
+
+
+async def _recompute_bounds(db, scope: str):
+    query = {} if scope == GLOBAL else {"category": scope[len("category:"):]}
+    lowest, highest = await asyncio.gather(
+        db.products.find(query, {"_id": 0, "price": 1}).sort("price", 1).limit(1).to_list(1),
+        db.products.find(query, {"_id": 0, "price": 1}).sort("price", -1).limit(1).to_list(1),
+    )
+    await db.catalog_stats.update_one({"_id": scope}, {"$set": {
+        "minPrice": lowest[0]["price"] if lowest else None,
+        "maxPrice": highest[0]["price"] if highest else None,
+    }})
+
+
+async def record_changes(db, changes: List[Tuple[Optional[dict], Optional[dict]]]):
+    """
+    Applies product writes: (before, after) pairs of {"category", "price", "stock"},
+    None for the side where the product does not exist.
+    """
+    deltas = defaultdict(lambda: {"count": 0, "inStock": 0})
+    lowest, highest = {}, {}
+    moved = defaultdict(set)  # scope -> old prices that may have been a bound
+    for before, after in changes:
+        after_scopes = _scopes(after)
+        for product, sign in ((before, -1), (after, 1)):
+            for scope in _scopes(product):
+                deltas[scope]["count"] += sign
+                deltas[scope]["inStock"] += sign * _in_stock(product)
+        if after and after.get("price") is not None:
+            for scope in after_scopes:
+                lowest[scope] = min(lowest.get(scope, after["price"]), after["price"])
+                highest[scope] = max(highest.get(scope, after["price"]), after["price"])
+        if before and before.get("price") is not None:
+            for scope in _scopes(before):
+                if scope not in after_scopes or after.get("price") != before["price"]:
+                    moved[scope].add(before["price"])
+    if not deltas:
+        return
+
+    now = datetime.utcnow()
+    operations = []
+    for scope, delta in deltas.items():
+        update = {"$inc": delta, "$set": {"updatedAt": now}}
+        if scope in lowest:
+            update["$min"] = {"minPrice": lowest[scope]}
+            update["$max"] = {"maxPrice": highest[scope]}
+        operations.append(UpdateOne({"_id": scope}, update, upsert=True))
+    await db.catalog_stats.bulk_write(operations, ordered=False)
+
+    if moved:
+        current = {doc["_id"]: doc async for doc in db.catalog_stats.find({"_id": {"$in": list(moved)}})}
+        await asyncio.gather(*(
+            _recompute_bounds(db, scope) for scope, prices in moved.items()
+            if prices & {current.get(scope, {}).get("minPrice"), current.get(scope, {}).get("maxPrice")}
+        ))
+    await stats.reload(db, list(deltas))
+
+
+async def record_change(db, before: Optional[dict], after: Optional[dict]):
+    await record_changes(db, [(before, after)])
+
+
+async def reconcile(db) -> int:
+    """Recomputes every scope from the products; returns the number of scopes."""
+    pipeline = [{"$group": {
+        "_id": "$category",
+        "count": {"$sum": 1},
+        "inStock": {"$sum": {"$cond": [{"$gt": ["$stock", 0]}, 1, 0]}},
+        "minPrice": {"$min": "$price"},
+        "maxPrice": {"$max": "$price"},
+    }}]
+    now = datetime.utcnow()
+    total = {"count": 0, "inStock": 0, "minPrice": None, "maxPrice": None}
+    docs = {}
+    async for group in db.products.aggregate(pipeline, allowDiskUse=True):
+        for field in ("count", "inStock"):
+            total[field] += group[field]
+        for field, pick in (("minPrice", min), ("maxPrice", max)):
+            if group[field] is not None:
+                total[field] = group[field] if total[field] is None else pick(total[field], group[field])
+        if group["_id"]:
+            docs[scope_id(group["_id"])] = {key: group[key] for key in ("count", "inStock", "minPrice", "maxPrice")}
+    docs[GLOBAL] = total
+
+    await db.catalog_stats.bulk_write(
+        [ReplaceOne({"_id": scope}, {**doc, "updatedAt": now}, upsert=True) for scope, doc in docs.items()],
+        ordered=False,
+    )
+    await db.catalog_stats.delete_many({"_id": {"$nin": list(docs)}})
+    await stats.reload(db)
+    return len(docs)
+
+
+async def load(db):
+    """Fills `stats`, building the documents first if they do not exist yet."""
+    await stats.reload(db)
+    if GLOBAL not in stats.scopes:
+        await reconcile(db)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        scopes = await reconcile(db)
+        overall = stats.get()
+        print(f"✅ {scopes} statistiques recalculées: {overall['count']} produits, "
+              f"prix {overall['minPrice']} - {overall['maxPrice']}")
+        client.close()
+
+    asyncio.run(main())
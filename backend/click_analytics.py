@@ -0,0 +1,299 @@
+"""
+WhatsApp click analytics pre-aggregated into time buckets.
+
+Each click upserts two counters in `db.whatsapp_click_buckets`, one per hour
+and one per day, keyed by product:
+    {"_id": "day:<productId>:2026-01-31T00:00:00", "granularity": "day",
+     "bucket": datetime, "productId", "sellerId", "productName", "sellerName",
+     "clicks": int, "lastClick": datetime}
+
+Dashboards read the buckets of their time window, so their cost follows the
+number of active products per period instead of the total click history.
+Raw events go to the product event log (event_store.py, type "click"); the
+legacy `db.whatsapp_clicks` documents expire after WHATSAPP_CLICKS_RAW_TTL_DAYS.
+Hourly buckets expire after WHATSAPP_CLICKS_HOURLY_TTL_DAYS; daily buckets
+are kept.
+
+The legacy clicks are folded into the buckets once by a startup migration
+(schema_migrations.py, `backfill_legacy_clicks`); their TTL index is only
+created once that migration is recorded, so no click expires before it is
+counted.
+
+`backfill_buckets` rebuilds the buckets from the events still in the log:
+    python click_analytics.py --backfill
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, List, Optional
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+
+import event_store
+
+logger = logging.getLogger(__name__)
+
+RAW_TTL_DAYS = int(os.getenv("WHATSAPP_CLICKS_RAW_TTL_DAYS", "90"))
+HOURLY_TTL_DAYS = int(os.getenv("WHATSAPP_CLICKS_HOURLY_TTL_DAYS", "35"))
+
+GRANULARITIES = ("hour", "day")
+RAW_TTL_INDEX_NAME = "raw_clicks_ttl"
+LEGACY_BACKFILL_MIGRATION = "whatsapp_click_buckets_backfill"
+HOURLY_TTL_INDEX_NAME = "hourly_buckets_ttl"
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bucket_update(click: dict, granularity: str, clicks: int = 1, last_click: datetime = None, absolute: bool = False):
+    start = bucket_start(click["timestamp"], granularity)
+    counter = {"$set": {"clicks": clicks}} if absolute else {"$inc": {"clicks": clicks}}
+    return UpdateOne(
+        {"_id": f"{granularity}:{click['productId']}:{start.isoformat()}"},
+        {
+            **counter,
+            "$max": {"lastClick": last_click or click["timestamp"]},
+            "$set": {
+                **counter.get("$set", {}),
+                "productName": click["productName"],
+                "sellerName": click["sellerName"],
+            },
+            "$setOnInsert": {
+                "granularity": granularity,
+                "bucket": start,
+                "productId": click["productId"],
+                "sellerId": click["sellerId"],
+            },
+        },
+        upsert=True,
+    )
+
+
+def _click_event(click: dict) -> dict:
+    return event_store.product_event(
+        "click", click["productId"], click["sellerId"], click["timestamp"],
+        productName=click["productName"], sellerName=click["sellerName"],
+    )
+
+
+async def record_click(db, click: dict):
+    """Logs the event and increments its hourly and daily buckets (one bulk write)."""
+    await asyncio.gather(
+        event_store.record(db, [_click_event(click)]),
+        db.whatsapp_click_buckets.bulk_write(
+            [_bucket_update(click, granularity) for granularity in GRANULARITIES], ordered=False
+        ),
+    )
+
+
+def click_writes(db, clicks: List[dict]) -> List[Awaitable]:
+    """The writes of `record_clicks`, for callers that need the outcome of each one."""
+    if not clicks:
+        return []
+    buckets = {}
+    for click in clicks:
+        for granularity in GRANULARITIES:
+            key = (granularity, click["productId"], bucket_start(click["timestamp"], granularity))
+            _, count, last_click = buckets.get(key, (click, 0, click["timestamp"]))
+            buckets[key] = (click, count + 1, max(last_click, click["timestamp"]))
+    return [
+        *event_store.record_writes(db, [_click_event(click) for click in clicks]),
+        db.whatsapp_click_buckets.bulk_write(
+            [_bucket_update(click, granularity, count, last_click)
+             for (granularity, _, _), (click, count, last_click) in buckets.items()],
+            ordered=False,
+        ),
+    ]
+
+
+async def record_clicks(db, clicks: List[dict]):
+    """Batch version of record_click: one insert_many and one bulk write, one update per bucket."""
+    await asyncio.gather(*click_writes(db, clicks))
+
+
+def _window_match(granularity: str, since: Optional[datetime], until: Optional[datetime]) -> dict:
+    match = {"granularity": granularity}
+    if since or until:
+        match["bucket"] = {}
+        if since:
+            match["bucket"]["$gte"] = bucket_start(since, granularity)
+        if until:
+            match["bucket"]["$lt"] = until
+    return match
+
+
+async def top_products(db, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                       limit: int = 10, seller_id: Optional[str] = None) -> List[dict]:
+    """[{"_id": productId, "productName", "sellerName", "clickCount", "lastClick"}] by clicks, over daily buckets."""
+    match = _window_match("day", since, until)
+    if seller_id:
+        match["sellerId"] = seller_id
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"bucket": -1}},  # $first = latest names
+        {"$group": {
+            "_id": "$productId",
+            "productName": {"$first": "$productName"},
+            "sellerName": {"$first": "$sellerName"},
+            "sellerId": {"$first": "$sellerId"},
+            "clickCount": {"$sum": "$clicks"},
+            "lastClick": {"$max": "$lastClick"},
+        }},
+        {"$sort": {"clickCount": -1}},
+        {"$limit": limit},
+    ]
+    return await db.whatsapp_click_buckets.aggregate(pipeline, allowDiskUse=True).to_list(limit)
+
+
+async def seller_trend(db, seller_id: str, since: datetime, until: Optional[datetime] = None,
+                       granularity: str = "day") -> List[dict]:
+    """[{"bucket": datetime, "clicks": int}] of a seller, every period of the window included (0 if no click)."""
+    until = until or datetime.utcnow()
+    pipeline = [
+        {"$match": {**_window_match(granularity, since, until), "sellerId": seller_id}},
+        {"$group": {"_id": "$bucket", "clicks": {"$sum": "$clicks"}}},
+    ]
+    counts = {doc["_id"]: doc["clicks"] async for doc in db.whatsapp_click_buckets.aggregate(pipeline)}
+
+    step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    series = []
+    current = bucket_start(since, granularity)
+    while current < until:
+        series.append({"bucket": current, "clicks": counts.get(current, 0)})
+        current += step
+    return series
+
+
+async def ensure_click_indexes(db):
+    """
+    TTL indexes of the raw events and of the hourly buckets (delays updated if they changed).
+    The raw one waits for the legacy clicks to be in the buckets.
+    """
+    indexes = [("whatsapp_click_buckets", HOURLY_TTL_INDEX_NAME, "bucket", HOURLY_TTL_DAYS, {"granularity": "hour"})]
+    if await db.schema_migrations.find_one({"_id": LEGACY_BACKFILL_MIGRATION}, {"_id": 1}):
+        indexes.append(("whatsapp_clicks", RAW_TTL_INDEX_NAME, "timestamp", RAW_TTL_DAYS, None))
+    else:
+        logger.warning(f"{RAW_TTL_INDEX_NAME} not created: legacy clicks not backfilled yet")
+    for collection, name, field, days, partial in indexes:
+        options = {"name": name, "expireAfterSeconds": days * 24 * 3600}
+        if partial:
+            options["partialFilterExpression"] = partial
+        try:
+            await db[collection].create_index([(field, ASCENDING)], **options)
+        except OperationFailure:
+            await db.command({"collMod": collection, "index": {"name": name, "expireAfterSeconds": days * 24 * 3600}})
+
+
+async def backfill_legacy_clicks(db) -> int:
+    """
+    Adds the clicks of `db.whatsapp_clicks` to the buckets. Each bucket remembers the
+    legacy count it received (`legacyClicks`), so a rerun replaces it instead of adding
+    it twice, and the clicks counted since stay. Returns the number of buckets written.
+    """
+    written = 0
+    for granularity in GRANULARITIES:
+        pipeline = [
+            {"$group": {
+                "_id": {"productId": "$productId",
+                        "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": granularity}}},
+                "clicks": {"$sum": 1},
+                "lastClick": {"$max": "$timestamp"},
+                "productName": {"$last": "$productName"},
+                "sellerId": {"$last": "$sellerId"},
+                "sellerName": {"$last": "$sellerName"},
+            }},
+        ]
+        batch = []
+        async for group in db.whatsapp_clicks.aggregate(pipeline, allowDiskUse=True):
+            product_id, start = group["_id"]["productId"], group["_id"]["bucket"]
+            batch.append(UpdateOne(
+                {"_id": f"{granularity}:{product_id}:{start.isoformat()}"},
+                [{"$set": {  # pipeline update: names wrapped in $literal
+                    "clicks": {"$add": [
+                        {"$subtract": [{"$ifNull": ["$clicks", 0]}, {"$ifNull": ["$legacyClicks", 0]}]},
+                        group["clicks"],
+                    ]},
+                    "legacyClicks": group["clicks"],
+                    "lastClick": {"$max": ["$lastClick", group["lastClick"]]},
+                    "productName": {"$ifNull": ["$productName", {"$literal": group["productName"]}]},
+                    "sellerName": {"$ifNull": ["$sellerName", {"$literal": group["sellerName"]}]},
+                    "granularity": granularity,
+                    "bucket": start,
+                    "productId": {"$literal": product_id},
+                    "sellerId": {"$ifNull": ["$sellerId", {"$literal": group["sellerId"]}]},
+                }}],
+                upsert=True,
+            ))
+            if len(batch) >= 1000:
+                await db.whatsapp_click_buckets.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        if batch:
+            await db.whatsapp_click_buckets.bulk_write(batch, ordered=False)
+            written += len(batch)
+    return written
+
+
+async def backfill_buckets(db) -> int:
+    """Recomputes the buckets covered by the logged clicks (idempotent). Returns the number of buckets written."""
+    written = 0
+    for granularity in GRANULARITIES:
+        pipeline = [
+            {"$match": {"meta.type": "click"}},
+            {"$group": {
+                "_id": {"productId": "$meta.productId",
+                        "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": granularity}}},
+                "clicks": {"$sum": 1},
+                "lastClick": {"$max": "$timestamp"},
+                "productName": {"$last": "$productName"},
+                "sellerId": {"$last": "$meta.sellerId"},
+                "sellerName": {"$last": "$sellerName"},
+            }},
+        ]
+        batch = []
+        events = db[event_store.EVENTS_COLLECTION]
+        async for group in events.aggregate(pipeline, allowDiskUse=True):
+            click = {
+                "productId": group["_id"]["productId"], "timestamp": group["_id"]["bucket"],
+                "productName": group["productName"], "sellerId": group["sellerId"], "sellerName": group["sellerName"],
+            }
+            batch.append(_bucket_update(click, granularity, group["clicks"], group["lastClick"], absolute=True))
+            if len(batch) >= 1000:
+                await db.whatsapp_click_buckets.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        if batch:
+            await db.whatsapp_click_buckets.bulk_write(batch, ordered=False)
+            written += len(batch)
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="WhatsApp click buckets maintenance")
+    parser.add_argument("--backfill", action="store_true", help="rebuild the buckets from the logged clicks")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        await ensure_click_indexes(db)
+        if args.backfill:
+            written = await backfill_buckets(db)
+            print(f"✅ {written} compteurs de clics recalculés")
+        else:
+            print("✅ Index des clics WhatsApp à jour")
+        client.close()
+
+    asyncio.run(main())
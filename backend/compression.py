@@ -0,0 +1,136 @@
+"""
+Response compression (Brotli, else gzip) for the text responses of the API.
+
+`CompressionMiddleware` (ASGI) compresses the complete responses whose type is
+compressible (JSON, text, JavaScript, XML, SVG) and whose body is at least
+COMPRESSION_MIN_BYTES, with the best encoding the client accepts: `br` when
+the `brotli` package is installed, else `gzip`. Smaller bodies are not worth
+the CPU and header overhead and are sent as is. Streamed responses and bodies
+that already have a Content-Encoding are passed through.
+
+The compressed representation keeps the ETag of http_cache.py as a weak one
+(W/"..."), so If-None-Match keeps matching whatever the encoding. Large bodies
+are compressed in a thread so the event loop keeps serving other requests.
+"""
+
+import os
+import gzip
+import asyncio
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))  # 11 is far too slow per request
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+THREAD_ABOVE_BYTES = 256 * 1024
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/", b"application/javascript", b"application/xml", b"image/svg+xml")
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """{coding: q} of an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    accepted = accepted_encodings(header)
+    candidates = ("br", "gzip") if brotli is not None else ("gzip",)
+    best = max(candidates, key=lambda coding: accepted.get(coding, accepted.get("*", 0.0)))
+    return best if accepted.get(best, accepted.get("*", 0.0)) > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _weak(etag: bytes) -> bytes:
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                if message["status"] == 304:
+                    # Same validator as the representation the client holds
+                    passthrough = True
+                    await send({**message, "headers": self._vary(message["headers"], weaken=True)})
+                elif b"content-encoding" in headers or not headers.get(b"content-type", b"").startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message.get("more_body", False):
+                # Streamed response: sent as is
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            await self._finish(start, message.get("body", b""), encoding, send)
+
+        await self.app(scope, receive, compressing_send)
+
+    @staticmethod
+    def _vary(headers, weaken: bool):
+        vary = [value for name, value in headers if name.lower() == b"vary"]
+        kept = [(name, _weak(value) if weaken and name.lower() == b"etag" else value)
+                for name, value in headers if name.lower() != b"vary"]
+        kept.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        return kept
+
+    async def _finish(self, start, body: bytes, encoding: str, send):
+        if len(body) < MIN_BYTES:
+            await send({**start, "headers": self._vary(start.get("headers", []), weaken=False)})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        if len(body) > THREAD_ABOVE_BYTES:
+            compressed = await asyncio.to_thread(compress, body, encoding)
+        else:
+            compressed = compress(body, encoding)
+        headers = [(name, value) for name, value in self._vary(start.get("headers", []), weaken=True)
+                   if name.lower() != b"content-length"]
+        headers += [(b"content-encoding", encoding.encode("latin-1")),
+                    (b"content-length", str(len(compressed)).encode("latin-1"))]
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": compressed})
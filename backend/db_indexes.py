@@ -0,0 +1,235 @@
+"""
+Index declarations for the collections queried by server.py, and an
+idempotent manager that builds them without dropping anything.
+
+Runs at application startup (disable with ENSURE_INDEXES_ON_STARTUP=false)
+or as a script:
+    python db_indexes.py            # build missing indexes
+    python db_indexes.py --report   # list missing / unused indexes
+"""
+
+import os
+import asyncio
+import logging
+from pathlib import Path
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+import notification_retention
+import click_analytics
+import event_ingest
+import event_store
+
+logger = logging.getLogger(__name__)
+
+# Keys of the find_one_and_update(upsert=True) calls: unique, so two concurrent first
+# events cannot create two documents (the loser retries on DuplicateKeyError).
+# Built by the unique_* migrations (schema_migrations.py) after deduplication.
+CONVERSATION_KEY = IndexModel(
+    [("buyer_id", ASCENDING), ("seller_id", ASCENDING), ("product_id", ASCENDING)],
+    name="conversation_key", unique=True,
+)
+NOTIFICATION_GROUP_KEY = IndexModel(
+    [("recipient_id", ASCENDING), ("recipient_type", ASCENDING), ("type", ASCENDING), ("group_key", ASCENDING)],
+    name="unread_notification_group", unique=True,
+    partialFilterExpression={"read": False, "group_key": {"$type": "string"}},
+)
+
+# Keep each entry next to the queries it serves in server.py
+COLLECTION_INDEXES = {
+    "products": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("slug", ASCENDING)]),
+        IndexModel([("sellerId", ASCENDING), ("createdAt", DESCENDING)]),  # seller catalog
+        IndexModel([("category", ASCENDING)]),
+        IndexModel([("category", ASCENDING), ("price", DESCENDING)]),  # catalog_stats.py bounds
+        IndexModel([("price", DESCENDING)]),  # max-price
+        IndexModel([("status", ASCENDING)]),  # sitemap
+        IndexModel([("imageVariantsPending", ASCENDING)], sparse=True),  # image_pipeline.py
+    ],
+    "sellers": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("whatsapp", ASCENDING)]),
+        IndexModel([("email", ASCENDING)]),
+        IndexModel([("oauth_uid", ASCENDING)], sparse=True),
+        IndexModel([("reset_token", ASCENDING)], sparse=True),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("whatsapp", ASCENDING), ("type", ASCENDING)]),
+        IndexModel([("email", ASCENDING), ("type", ASCENDING)]),
+        IndexModel([("oauth_uid", ASCENDING)], sparse=True),
+        IndexModel([("reset_token", ASCENDING)], sparse=True),
+    ],
+    "admins": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("whatsapp", ASCENDING)]),
+        IndexModel([("role", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "orders": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("buyerId", ASCENDING), ("orderedDate", DESCENDING)]),
+        IndexModel([("sellerId", ASCENDING), ("orderedDate", DESCENDING)]),
+        IndexModel([("orderedDate", DESCENDING)]),  # admin order list
+    ],
+    "messages": [
+        IndexModel([("conversation_id", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("id", ASCENDING)]),
+    ],
+    "conversations": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("buyer_id", ASCENDING), ("last_message_timestamp", DESCENDING)]),
+        IndexModel([("seller_id", ASCENDING), ("last_message_timestamp", DESCENDING)]),
+        CONVERSATION_KEY,  # create_message upsert
+    ],
+    "notifications": [
+        IndexModel([("recipient_id", ASCENDING), ("recipient_type", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("id", ASCENDING)]),
+        NOTIFICATION_GROUP_KEY,  # notification_retention.push_grouped_notification
+    ],
+    "interactions": [
+        IndexModel([("userId", ASCENDING), ("productId", ASCENDING)]),
+        IndexModel([("userId", ASCENDING), ("timestamp", DESCENDING)]),
+        IndexModel([("productId", ASCENDING)]),
+    ],
+    "whatsapp_clicks": [
+        IndexModel([("productId", ASCENDING)]),
+    ],
+    "whatsapp_click_buckets": [
+        IndexModel([("granularity", ASCENDING), ("bucket", DESCENDING)]),  # top products
+        IndexModel([("sellerId", ASCENDING), ("granularity", ASCENDING), ("bucket", DESCENDING)]),  # seller trend
+    ],
+    "reviews": [
+        IndexModel([("productId", ASCENDING), ("buyerId", ASCENDING)]),
+        IndexModel([("productId", ASCENDING), ("createdAt", DESCENDING)]),
+    ],
+    "pickupPoints": [
+        IndexModel([("id", ASCENDING)]),
+    ],
+    "categories": [
+        IndexModel([("id", ASCENDING)]),
+        IndexModel([("name", ASCENDING)]),
+    ],
+    "ads": [
+        IndexModel([("isActive", ASCENDING)]),
+    ],
+    "product_trending": [
+        IndexModel([("score", DESCENDING)]),  # trending.py refresh
+    ],
+    "recommender_pairs": [
+        IndexModel([("a", ASCENDING), ("w", DESCENDING)]),  # recommender.py neighbours
+    ],
+    "newsletter_subscriptions": [
+        IndexModel([("email", ASCENDING)]),
+    ],
+}
+
+# Indexes managed elsewhere, never reported as undeclared
+EXTERNALLY_MANAGED = {
+    "notifications": {notification_retention.TTL_INDEX_NAME},
+    "whatsapp_clicks": {click_analytics.RAW_TTL_INDEX_NAME},
+    "whatsapp_click_buckets": {click_analytics.HOURLY_TTL_INDEX_NAME},
+    "analytics_event_ids": {event_ingest.EVENT_IDS_TTL_INDEX_NAME},
+    event_store.EVENTS_COLLECTION: {index.document["name"] for index in event_store.EVENT_INDEXES},
+}
+
+
+def declared_index_names(collection_name: str) -> set:
+    names = {index.document["name"] for index in COLLECTION_INDEXES.get(collection_name, [])}
+    return names | EXTERNALLY_MANAGED.get(collection_name, set()) | {"_id_"}
+
+
+async def ensure_indexes(db) -> dict:
+    """
+    Creates every declared index that does not exist yet.
+    Existing indexes (including conflicting definitions) are left untouched.
+    Returns {collection: [created index names]}.
+    """
+    created = {}
+
+    async def ensure_collection(collection_name, indexes):
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        for index in indexes:
+            name = index.document["name"]
+            if name in existing:
+                continue
+            try:
+                await collection.create_indexes([index])
+                created.setdefault(collection_name, []).append(name)
+            except OperationFailure as e:
+                # e.g. same keys already indexed under another name or options
+                logger.warning(f"Index {collection_name}.{name} not created: {e}")
+
+    # Collections are independent: one round-trip of latency instead of one per collection at startup
+    await asyncio.gather(
+        *(ensure_collection(name, indexes) for name, indexes in COLLECTION_INDEXES.items()),
+        notification_retention.ensure_notification_indexes(db),
+        click_analytics.ensure_click_indexes(db),
+        event_ingest.ensure_event_id_indexes(db),
+        event_store.ensure_event_collections(db),
+    )
+
+    if created:
+        logger.info(f"Indexes created: {created}")
+    return created
+
+
+async def report_indexes(db) -> dict:
+    """
+    Compares the declared indexes with the database.
+    - missing: declared but not built
+    - undeclared: built but not declared here
+    - unused: built but with no recorded access since the last mongod restart
+    """
+    report = {}
+    # system.buckets.* hold the data of time-series collections (event_store.py)
+    listed = await db.list_collection_names(filter={"name": {"$not": {"$regex": r"^system\."}}})
+    collection_names = set(listed) | set(COLLECTION_INDEXES)
+    for collection_name in sorted(collection_names):
+        collection = db[collection_name]
+        existing = set(await collection.index_information())
+        declared = declared_index_names(collection_name)
+
+        unused = []
+        if existing:
+            async for stats in collection.aggregate([{"$indexStats": {}}]):
+                if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0:
+                    unused.append(stats["name"])
+
+        entry = {
+            "missing": sorted(declared - existing - {"_id_"}),
+            "undeclared": sorted(existing - declared),
+            "unused": sorted(unused),
+        }
+        if any(entry.values()):
+            report[collection_name] = entry
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Build or audit the MongoDB indexes used by the API")
+    parser.add_argument("--report", action="store_true", help="only report missing/unused indexes")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        if args.report:
+            print(json.dumps(await report_indexes(db), indent=2))
+        else:
+            created = await ensure_indexes(db)
+            total = sum(len(names) for names in created.values())
+            print(f"✅ {total} index créés")
+            for collection_name, names in created.items():
+                print(f"   {collection_name}: {', '.join(names)}")
+        client.close()
+
+    asyncio.run(main())
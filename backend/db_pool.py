@@ -0,0 +1,138 @@
+"""
+MongoDB connection pool settings and monitoring for the Motor client.
+
+Pool options come from the environment (defaults are pymongo's, except the
+server selection timeout which is shortened so that an unreachable cluster
+fails the readiness probe instead of hanging requests for 30s):
+
+    MONGO_MAX_POOL_SIZE                 100
+    MONGO_MIN_POOL_SIZE                 0
+    MONGO_MAX_IDLE_TIME_MS              (none)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS         (none)  time a request may wait for a free connection
+    MONGO_CONNECT_TIMEOUT_MS            20000
+    MONGO_SOCKET_TIMEOUT_MS             (none)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS   5000
+    MONGO_COMPRESSORS                   e.g. "zstd,snappy,zlib" (zstd needs `zstandard`,
+                                        snappy needs `python-snappy`; unavailable ones are skipped)
+
+`pool_monitor` counts connections per server; `pool_stats()` is exposed by /readyz.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+
+def _int_env(name: str, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def client_options() -> dict:
+    """Keyword arguments of AsyncIOMotorClient for the pool."""
+    options = {
+        "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 100),
+        "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 0),
+        "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 20000),
+        "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+    }
+    for option, name in (
+        ("maxIdleTimeMS", "MONGO_MAX_IDLE_TIME_MS"),
+        ("waitQueueTimeoutMS", "MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        ("socketTimeoutMS", "MONGO_SOCKET_TIMEOUT_MS"),
+    ):
+        value = _int_env(name)
+        if value is not None:
+            options[option] = value
+    compressors = os.getenv("MONGO_COMPRESSORS", "").strip()
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Open / checked-out connections and waiting requests per server address."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.servers = {}  # {"host:port": {"open": n, "in_use": n, "waiting": n, "checkout_failures": n}}
+
+    def _update(self, address, **deltas):
+        key = f"{address[0]}:{address[1]}"
+        with self.lock:
+            stats = self.servers.setdefault(key, {"open": 0, "in_use": 0, "waiting": 0, "checkout_failures": 0})
+            for field, delta in deltas.items():
+                stats[field] = max(0, stats[field] + delta)
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self.lock:
+            self.servers.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, waiting=-1, in_use=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, in_use=-1)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {address: dict(stats) for address, stats in self.servers.items()}
+
+
+pool_monitor = PoolMonitor()
+
+
+def pool_stats(max_pool_size: int) -> dict:
+    servers = pool_monitor.snapshot()
+    for stats in servers.values():
+        stats["utilization"] = round(stats["in_use"] / max_pool_size, 3) if max_pool_size else 0.0
+    return {"max_pool_size": max_pool_size, "servers": servers}
+
+
+async def ping(client, timeout: float = 2.0) -> bool:
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout)
+        return True
+    except Exception as e:
+        logger.warning(f"MongoDB ping failed: {e}")
+        return False
+
+
+async def wait_for_mongo(client, attempts: int = None, delay: float = 2.0):
+    """Pings MongoDB until it answers; raises after `attempts` failures (MONGO_STARTUP_ATTEMPTS, default 10)."""
+    attempts = attempts or _int_env("MONGO_STARTUP_ATTEMPTS", 10)
+    for attempt in range(1, attempts + 1):
+        if await ping(client, timeout=10.0):
+            return
+        logger.warning(f"MongoDB not reachable (attempt {attempt}/{attempts})")
+        if attempt < attempts:
+            await asyncio.sleep(delay)
+    raise RuntimeError("MongoDB unreachable at startup")
@@ -0,0 +1,244 @@
+"""
+Batched ingestion of client analytics events (POST /api/analytics/events).
+
+The app queues views, WhatsApp clicks, favourites and searches while offline
+and sends them in batches. Each event carries a client generated `eventId`:
+ids are claimed with one insert_many into `db.analytics_event_ids`
+(`_id` = "<user or anon>:<eventId>", expiring after EVENT_ID_TTL_DAYS), so a
+batch resent after a lost response only writes the events not seen yet.
+
+The accepted events are then written with one bulk operation per target:
+- view / favourite: `db.interactions` (one document per user and product, as
+  the single-event endpoint), the `views` / `favorites` counters of products
+  and the product event log (event_store.py)
+- click: the event log and the click buckets (click_analytics.record_clicks)
+- search: `db.search_events`
+
+Client timestamps are kept when plausible, clamped to the reception time
+otherwise.
+
+When writes fail, only the ids of the events none of whose counting writes
+(counters, event log, buckets, searches) applied are released for a resend.
+Events partly counted stay claimed: a resend would count them twice.
+"""
+
+import os
+import uuid
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Awaitable, List, Optional, Tuple
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+import click_analytics
+import event_store
+
+logger = logging.getLogger(__name__)
+
+EVENT_ID_TTL_DAYS = int(os.getenv("ANALYTICS_EVENT_ID_TTL_DAYS", "7"))
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+MAX_EVENT_AGE = timedelta(days=EVENT_ID_TTL_DAYS)  # older events could not be deduplicated
+
+EVENT_IDS_TTL_INDEX_NAME = "event_ids_ttl"
+DUPLICATE_KEY = 11000
+
+
+def event_time(client_timestamp: Optional[datetime], received_at: datetime) -> datetime:
+    if client_timestamp is None:
+        return received_at
+    if client_timestamp.tzinfo is not None:  # stored as naive UTC like the rest of the database
+        client_timestamp = (client_timestamp - client_timestamp.utcoffset()).replace(tzinfo=None)
+    if client_timestamp > received_at + MAX_CLOCK_SKEW or client_timestamp < received_at - MAX_EVENT_AGE:
+        return received_at
+    return min(client_timestamp, received_at)
+
+
+async def claim_event_ids(db, keys: List[str], received_at: datetime) -> set:
+    """Records the event keys; returns those already recorded by a previous batch."""
+    if not keys:
+        return set()
+    try:
+        await db.analytics_event_ids.insert_many(
+            [{"_id": key, "receivedAt": received_at} for key in keys], ordered=False
+        )
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error["code"] != DUPLICATE_KEY for error in errors):
+            raise
+        return {keys[error["index"]] for error in errors}
+    return set()
+
+
+async def release_event_ids(db, keys: List[str]):
+    """Forgets claimed keys whose events could not be written, so that the client can resend them."""
+    try:
+        await db.analytics_event_ids.delete_many({"_id": {"$in": keys}})
+    except Exception as e:
+        logger.error(f"Could not release analytics event ids: {e}")
+
+
+async def ingest(db, events: List[dict], user_id: Optional[str]) -> dict:
+    """
+    Writes a validated batch ({"type", "eventId", "clientTimestamp", ...} dicts).
+    Returns {"accepted", "duplicates", "rejected": [{"eventId", "reason"}]}.
+    """
+    received_at = datetime.utcnow()
+    owner = user_id or "anon"
+    rejected = []
+    total = len(events)
+
+    # Duplicates inside the batch itself (queue flushed twice before the response)
+    unique = {}
+    for event in events:
+        unique.setdefault(event["eventId"], event)
+    events = list(unique.values())
+
+    candidates = []
+    for event in events:
+        if event["type"] in ("view", "favourite") and not user_id:
+            rejected.append({"eventId": event["eventId"], "reason": "User ID required"})
+        else:
+            candidates.append(event)
+
+    product_ids = {event["productId"] for event in candidates if event["type"] != "search"}
+    seller_of = {}
+    if product_ids:
+        cursor = db.products.find({"id": {"$in": list(product_ids)}}, {"_id": 0, "id": 1, "sellerId": 1})
+        seller_of = {p["id"]: p.get("sellerId") async for p in cursor}
+    valid = []
+    for event in candidates:
+        if event["type"] != "search" and event["productId"] not in seller_of:
+            rejected.append({"eventId": event["eventId"], "reason": "Product not found"})
+        else:
+            valid.append(event)
+
+    keys = [f"{owner}:{event['eventId']}" for event in valid]
+    seen = await claim_event_ids(db, keys, received_at)
+    fresh = [(key, event) for key, event in zip(keys, valid) if key not in seen]
+
+    unapplied, errors = await _write(db, fresh, user_id, received_at, seller_of)
+    if errors:
+        if unapplied:
+            await release_event_ids(db, unapplied)
+        raise errors[0]
+
+    return {"accepted": len(fresh), "duplicates": total - len(rejected) - len(fresh), "rejected": rejected}
+
+
+def _applied(outcome) -> bool:
+    """Whether a write changed anything (unknown failures count as not applied)."""
+    if not isinstance(outcome, BaseException):
+        return True
+    if isinstance(outcome, BulkWriteError):
+        details = outcome.details
+        return any(details.get(field) for field in ("nInserted", "nUpserted", "nModified"))
+    return False
+
+
+async def _write(db, events: List[Tuple[str, dict]], user_id: Optional[str], received_at: datetime,
+                 seller_of: dict) -> Tuple[List[str], List[BaseException]]:
+    """
+    Writes the (key, event) pairs, one group of writes per kind of event.
+    Returns the keys of the events whose counting writes all failed, and the errors.
+    """
+    interactions, logged, clicks, searches = [], [], [], []
+    interaction_keys, click_keys, search_keys = [], [], []
+    views, favourites = Counter(), Counter()
+
+    # Events are applied in client order, so the last interaction of a product wins
+    for key, event in sorted(events, key=lambda pair: event_time(pair[1].get("clientTimestamp"), received_at)):
+        timestamp = event_time(event.get("clientTimestamp"), received_at)
+        kind = event["type"]
+        if kind in ("view", "favourite"):
+            interaction_keys.append(key)
+            update = {"interaction": kind, "timestamp": timestamp}
+            if kind == "favourite":
+                update["isFavourite"] = event["isFavourite"]
+                if event["isFavourite"]:
+                    favourites[event["productId"]] += 1
+            else:
+                views[event["productId"]] += 1
+            set_on_insert = {"id": f"int_{uuid.uuid4().hex[:8]}", "rating": 0}
+            if kind == "view":
+                set_on_insert["isFavourite"] = False
+            interactions.append(UpdateOne(
+                {"userId": user_id, "productId": event["productId"]},
+                {"$set": update, "$setOnInsert": set_on_insert},
+                upsert=True,
+            ))
+            fields = {"isFavourite": event["isFavourite"]} if kind == "favourite" else {}
+            logged.append(event_store.product_event(
+                kind, event["productId"], seller_of[event["productId"]], timestamp,
+                userId=user_id, receivedAt=received_at, **fields  # late events: recommender.py
+            ))
+        elif kind == "click":
+            click_keys.append(key)
+            clicks.append({
+                "id": f"wac_{str(uuid.uuid4())[:8]}",
+                "productId": event["productId"],
+                "productName": event["productName"],
+                "sellerId": event["sellerId"],
+                "sellerName": event["sellerName"],
+                "timestamp": timestamp,
+            })
+        else:
+            search_keys.append(key)
+            searches.append({
+                "id": f"sea_{uuid.uuid4().hex[:8]}",
+                "userId": user_id,
+                "query": event["query"],
+                "category": event.get("category"),
+                "resultsCount": event.get("resultsCount"),
+                "timestamp": timestamp,
+            })
+
+    counters = [
+        UpdateOne({"id": product_id}, {"$inc": {"views": views[product_id], "favorites": favourites[product_id]}})
+        for product_id in views.keys() | favourites.keys()
+    ]
+    # (keys, [(write, counts)]): the `interactions` upserts only $set, a resend is harmless
+    groups: List[Tuple[List[str], List[Tuple[Awaitable, bool]]]] = []
+    if interactions:
+        writes = [
+            # Ordered: two events of the same product must not race on the upsert
+            (db.interactions.bulk_write(interactions, ordered=True), False),
+            *((write, True) for write in event_store.record_writes(db, logged)),
+        ]
+        if counters:
+            writes.append((db.products.bulk_write(counters, ordered=False), True))
+        groups.append((interaction_keys, writes))
+    if clicks:
+        groups.append((click_keys, [(write, True) for write in click_analytics.click_writes(db, clicks)]))
+    if searches:
+        groups.append((search_keys, [(db.search_events.insert_many(searches, ordered=False), True)]))
+
+    outcomes = await asyncio.gather(*(
+        asyncio.gather(*(write for write, _ in writes), return_exceptions=True) for _, writes in groups
+    ))
+    unapplied, errors = [], []
+    for (keys, writes), results in zip(groups, outcomes):
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if not failures:
+            continue
+        errors += failures
+        if any(counts and _applied(result) for (_, counts), result in zip(writes, results)):
+            logger.error(f"{len(keys)} analytics events partly written, kept claimed: {failures[0]}")
+        else:
+            unapplied += keys
+    return unapplied, errors
+
+
+async def ensure_event_id_indexes(db):
+    """TTL index of the deduplication keys (delay updated if it changed)."""
+    expire_after = EVENT_ID_TTL_DAYS * 24 * 3600
+    try:
+        await db.analytics_event_ids.create_index(
+            [("receivedAt", ASCENDING)], name=EVENT_IDS_TTL_INDEX_NAME, expireAfterSeconds=expire_after
+        )
+    except OperationFailure:
+        await db.command({
+            "collMod": "analytics_event_ids",
+            "index": {"name": EVENT_IDS_TTL_INDEX_NAME, "expireAfterSeconds": expire_after},
+        })
@@ -0,0 +1,228 @@
+"""
+Product event log in a MongoDB time-series collection.
+
+Views, favourites, ratings, WhatsApp clicks and sales are appended to
+`db.product_events` (timeField `timestamp`, metaField `meta`):
+    {"timestamp": datetime,
+     "meta": {"type": "view" | "favourite" | "rate" | "click" | "sale", "productId", "sellerId"},
+     "userId", ...event fields (rating, isFavourite, productName, sellerName, quantity)}
+Recorded events also feed the trending scores (trending.py).
+
+MongoDB groups the events of one (type, product, seller) into compressed
+buckets, so the log takes a fraction of the space of regular documents and
+the rollups below only unpack the buckets of their product/seller and time
+range. Events expire after EVENT_STORE_RETENTION_DAYS (collection-level
+expiry, no TTL index needed).
+
+`db.interactions` keeps one document per user and product (favourite flag,
+rating, last interaction), read by the product and profile pages; this log
+is for analytics only.
+
+The collection and its secondary indexes are created here and not by
+db_indexes.py: an index built first would create a regular collection.
+
+    python event_store.py --migrate   # copy whatsapp_clicks and interactions once
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Dict, List, Optional
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+import trending
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COLLECTION = "product_events"
+RETENTION_DAYS = int(os.getenv("EVENT_STORE_RETENTION_DAYS", "365"))
+EVENT_TYPES = ("view", "favourite", "rate", "click", "sale")
+UNITS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+EVENT_INDEXES = [
+    IndexModel([("meta.productId", ASCENDING), ("timestamp", DESCENDING)], name="product_time"),
+    IndexModel([("meta.sellerId", ASCENDING), ("timestamp", DESCENDING)], name="seller_time"),
+]
+
+
+def product_event(event_type: str, product_id: str, seller_id: Optional[str], timestamp: datetime, **fields) -> dict:
+    return {
+        "timestamp": timestamp,
+        "meta": {"type": event_type, "productId": product_id, "sellerId": seller_id},
+        **fields,
+    }
+
+
+def record_writes(db, events: List[dict]) -> List[Awaitable]:
+    """The writes of `record`, for callers that need the outcome of each one."""
+    if not events:
+        return []
+    return [db[EVENTS_COLLECTION].insert_many(events, ordered=False), trending.bump(db, events)]
+
+
+async def record(db, events: List[dict]):
+    await asyncio.gather(*record_writes(db, events))
+
+
+async def ensure_event_collections(db):
+    """Creates the time-series collection and its indexes, or updates its expiry if it changed."""
+    expire_after = RETENTION_DAYS * 24 * 3600
+    if await db.list_collection_names(filter={"name": EVENTS_COLLECTION}):
+        try:
+            await db.command({"collMod": EVENTS_COLLECTION, "expireAfterSeconds": expire_after})
+        except OperationFailure as e:
+            logger.warning(f"Expiry of {EVENTS_COLLECTION} not updated: {e}")
+    else:
+        try:
+            await db.create_collection(
+                EVENTS_COLLECTION,
+                timeseries={"timeField": "timestamp", "metaField": "meta", "granularity": "hours"},
+                expireAfterSeconds=expire_after,
+            )
+        except CollectionInvalid:
+            pass  # created meanwhile by another worker
+    await db[EVENTS_COLLECTION].create_indexes(EVENT_INDEXES)
+
+
+def _periods(since: datetime, until: datetime, unit: str) -> List[datetime]:
+    start = since.replace(minute=0, second=0, microsecond=0)
+    if unit == "day":
+        start = start.replace(hour=0)
+    periods = []
+    while start < until:
+        periods.append(start)
+        start += UNITS[unit]
+    return periods
+
+
+async def rollup(db, meta: Dict[str, str], since: datetime, until: Optional[datetime] = None,
+                 unit: str = "day") -> dict:
+    """
+    Event counts of the products matching `meta` (e.g. {"sellerId": ...}) per period and type:
+    {"totals": {"view": n, ...}, "series": [{"bucket": datetime, "view": n, "favourite": n, ...}]}
+    Every period of the window is present (0 when nothing happened).
+    """
+    until = until or datetime.utcnow()
+    match = {f"meta.{field}": value for field, value in meta.items()}
+    match["timestamp"] = {"$gte": since, "$lt": until}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"bucket": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}, "type": "$meta.type"},
+            "count": {"$sum": 1},
+        }},
+    ]
+    counts = {}
+    async for doc in db[EVENTS_COLLECTION].aggregate(pipeline):
+        counts[(doc["_id"]["bucket"], doc["_id"]["type"])] = doc["count"]
+
+    series = [
+        {"bucket": period, **{event_type: counts.get((period, event_type), 0) for event_type in EVENT_TYPES}}
+        for period in _periods(since, until, unit)
+    ]
+    totals = {event_type: sum(point[event_type] for point in series) for event_type in EVENT_TYPES}
+    return {"totals": totals, "series": series}
+
+
+async def product_rollup(db, product_id: str, since: datetime, unit: str = "day") -> dict:
+    return await rollup(db, {"productId": product_id}, since, unit=unit)
+
+
+async def seller_rollup(db, seller_id: str, since: datetime, unit: str = "day") -> dict:
+    return await rollup(db, {"sellerId": seller_id}, since, unit=unit)
+
+
+async def top_products(db, event_type: str, since: datetime, limit: int = 10,
+                       seller_id: Optional[str] = None) -> List[dict]:
+    """[{"productId", "sellerId", "count"}] of the products with the most `event_type` events."""
+    match = {"meta.type": event_type, "timestamp": {"$gte": since}}
+    if seller_id:
+        match["meta.sellerId"] = seller_id
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$meta.productId", "sellerId": {"$first": "$meta.sellerId"}, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "productId": "$_id", "sellerId": 1, "count": 1}},
+    ]
+    return await db[EVENTS_COLLECTION].aggregate(pipeline, allowDiskUse=True).to_list(limit)
+
+
+async def migrate(db, batch_size: int = 1000) -> Dict[str, int]:
+    """Copies the WhatsApp clicks and the interactions into the log (run once)."""
+    await asyncio.gather(ensure_event_collections(db), trending.load_epoch(db))
+    since = datetime.utcnow() - timedelta(days=RETENTION_DAYS)  # older events would expire at once
+    copied = {"click": 0, "interactions": 0}
+
+    batch = []
+    async for click in db.whatsapp_clicks.find({"timestamp": {"$gte": since}}, {"_id": 0}).batch_size(batch_size):
+        batch.append(product_event(
+            "click", click["productId"], click.get("sellerId"), click["timestamp"],
+            productName=click.get("productName"), sellerName=click.get("sellerName"),
+        ))
+        if len(batch) >= batch_size:
+            await record(db, batch)
+            copied["click"] += len(batch)
+            batch = []
+    await record(db, batch)
+    copied["click"] += len(batch)
+
+    # interactions only know the last event of each user and product
+    seller_of = {}
+    batch = []
+    cursor = db.interactions.find({"timestamp": {"$gte": since}}, {"_id": 0}).batch_size(batch_size)
+    async for interaction in cursor:
+        batch.append(interaction)
+        if len(batch) >= batch_size:
+            copied["interactions"] += await _copy_interactions(db, batch, seller_of)
+            batch = []
+    copied["interactions"] += await _copy_interactions(db, batch, seller_of)
+    return copied
+
+
+async def _copy_interactions(db, interactions: List[dict], seller_of: Dict[str, str]) -> int:
+    missing = list({i["productId"] for i in interactions} - seller_of.keys())
+    if missing:
+        async for product in db.products.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "sellerId": 1}):
+            seller_of[product["id"]] = product.get("sellerId")
+    events = [
+        product_event(
+            i.get("interaction", "view"), i["productId"], seller_of.get(i["productId"]), i["timestamp"],
+            userId=i.get("userId"), isFavourite=i.get("isFavourite", False), rating=i.get("rating", 0),
+        )
+        for i in interactions
+    ]
+    await record(db, events)
+    return len(events)
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Product event log maintenance")
+    parser.add_argument("--migrate", action="store_true", help="copy whatsapp_clicks and interactions into the log")
+    parser.add_argument("--force", action="store_true", help="migrate even if the log already has events")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        await ensure_event_collections(db)
+        if args.migrate:
+            if not args.force and await db[EVENTS_COLLECTION].find_one({}, {"_id": 1}):
+                print(f"❌ {EVENTS_COLLECTION} contient déjà des événements (--force pour migrer quand même)")
+            else:
+                copied = await migrate(db)
+                print(f"✅ {copied['click']} clics et {copied['interactions']} interactions copiés")
+        else:
+            print(f"✅ Collection {EVENTS_COLLECTION} à jour")
+        client.close()
+
+    asyncio.run(main())
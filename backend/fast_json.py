@@ -0,0 +1,88 @@
+"""
+Fast JSON serialization for the large list endpoints.
+
+`ORJSONResponse` renders with orjson (several times faster than the standard
+json module, datetimes included) and is the default response class of the app.
+
+For lists of stored documents, building one Pydantic model per element and
+encoding it back costs more than the query itself. The documents are written
+through the models (legacy ones are migrated once by schema_migrations.py), so
+the list endpoints read them with `projection(Model)` (only the fields of the
+response model, without `_id`), add the defaults of the fields older documents
+lack with `fill_defaults` and return them with `documents_response`, skipping
+the per-element validation. `response_model` stays on the route for the
+OpenAPI schema.
+"""
+
+import typing
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        # default=str for the stray ObjectId / Decimal128 of raw documents
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _nested_model(annotation) -> Optional[Type[BaseModel]]:
+    """The model of a `Model`, `Optional[Model]` or `List[Model]` field, if any."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        nested = _nested_model(arg)
+        if nested is not None:
+            return nested
+    return None
+
+
+@lru_cache(maxsize=None)
+def projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """MongoDB projection of the fields of `model` (and of its nested models)."""
+    fields = {"_id": 0}
+    for name, field in model.model_fields.items():
+        nested = _nested_model(field.annotation)
+        if nested is None:
+            fields[name] = 1
+        else:
+            fields.update({f"{name}.{sub}": 1 for sub in projection(nested) if sub != "_id"})
+    return fields
+
+
+def fill_defaults(model: Type[BaseModel], doc: dict) -> dict:
+    """Adds the defaults of the fields missing from `doc`; ValueError if a required one is missing."""
+    for name, field in model.model_fields.items():
+        if name not in doc:
+            if field.is_required():
+                raise ValueError(f"{model.__name__}: missing field '{name}'")
+            doc[name] = field.get_default(call_default_factory=True)
+            continue
+        nested = _nested_model(field.annotation)
+        if nested is not None:
+            value = doc[name]
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, dict):
+                    fill_defaults(nested, item)
+    return doc
+
+
+def valid_documents(model: Type[BaseModel], docs: List[dict]) -> List[dict]:
+    """`fill_defaults` of every document, skipping (and logging) the ones missing a required field."""
+    valid = []
+    for doc in docs:
+        try:
+            valid.append(fill_defaults(model, doc))
+        except ValueError as e:
+            logger.warning(f"Skipping invalid document {doc.get('id')}: {e}")
+    return valid
+
+
+def documents_response(docs: List[dict]) -> ORJSONResponse:
+    return ORJSONResponse(docs)
@@ -1,26 +1,43 @@
-import firebase_admin
-from firebase_admin import credentials, auth
+# firebase_admin is imported on first use: it is slow to import and only
+# needed by the OAuth endpoints.
 import os
+import threading
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Global flag to track initialization
+# Global flags to track initialization
 _firebase_initialized = False
+_firebase_attempted = False
+_init_lock = threading.Lock()
 
 def initialize_firebase_admin():
     """
     Initialize Firebase Admin SDK
-    Should be called once at application startup
+    Called on first use (and warmed up in the background at startup);
+    a missing service account file is only reported once.
     """
-    global _firebase_initialized
+    global _firebase_attempted
+
+    if _firebase_attempted:
+        return  # no lock once done; callers during the init wait for it (from a thread)
+    with _init_lock:
+        if _firebase_attempted:
+            return
+        try:
+            _initialize()
+        finally:
+            _firebase_attempted = True
+
 
-    if _firebase_initialized:
-        logger.info("Firebase Admin SDK already initialized")
-        return
+def _initialize():
+    global _firebase_initialized
 
     try:
+        import firebase_admin
+        from firebase_admin import credentials
+
         # Path to Firebase service account JSON
         # Set FIREBASE_SERVICE_ACCOUNT_PATH in .env or use default
         service_account_path = os.getenv(
@@ -65,7 +82,9 @@ def verify_firebase_token(id_token: str) -> dict:
         ValueError: If Firebase is not initialized
         Exception: If token verification fails
     """
-    if not _firebase_initialized:
+    from firebase_admin import auth
+
+    if not is_firebase_initialized():
         raise ValueError(
             "Firebase Admin SDK is not initialized. "
             "Please ensure firebase-service-account.json is present and restart the server."
@@ -102,7 +121,9 @@ def get_user_by_uid(uid: str) -> dict:
     Returns:
         dict: User information
     """
-    if not _firebase_initialized:
+    from firebase_admin import auth
+
+    if not is_firebase_initialized():
         raise ValueError("Firebase Admin SDK is not initialized")
 
     try:
@@ -127,4 +148,5 @@ def is_firebase_initialized() -> bool:
     Returns:
         bool: True if initialized, False otherwise
     """
+    initialize_firebase_admin()
     return _firebase_initialized
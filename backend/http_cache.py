@@ -0,0 +1,112 @@
+"""
+Conditional GET for the JSON API: ETag, If-None-Match / 304 and Cache-Control.
+
+`ConditionalGetMiddleware` (ASGI) buffers the 200 JSON responses of GET
+requests under /api/, tags them with a strong ETag (hash of the body) and
+answers 304 Not Modified, without the body, when the client already holds
+that version. Handlers that know a cheaper validator can set the ETag header
+themselves; it is kept and compared the same way.
+
+Public, identical-for-everyone endpoints get a shared Cache-Control from
+CACHE_RULES; every other response is `private, no-cache` (stored by the
+client, revalidated before reuse) and varies on the identity headers.
+"""
+
+import re
+import hashlib
+from typing import List, Optional, Pattern, Tuple
+
+PREFIX = "/api/"
+
+CACHE_RULES: List[Tuple[Pattern, str]] = [
+    (re.compile(r"^/api/products/[^/]+$"), "public, max-age=60, stale-while-revalidate=300"),
+    (re.compile(r"^/api/categories$"), "public, max-age=300, stale-while-revalidate=3600"),
+    (re.compile(r"^/api/ads/active$"), "public, max-age=60, stale-while-revalidate=300"),
+    (re.compile(r"^/api/pickup-points$"), "public, max-age=300, stale-while-revalidate=3600"),
+    (re.compile(r"^/api/settings/(shipping|homepage)$"), "public, max-age=300, stale-while-revalidate=3600"),
+]
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+PRIVATE_VARY = "Authorization, X-Admin-Role, X-Seller-Id, X-Buyer-Id"
+
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as RFC 9110 prescribes for If-None-Match."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == bare:
+            return True
+    return False
+
+
+def cache_control_for(path: str) -> Optional[str]:
+    for pattern, value in CACHE_RULES:
+        if pattern.match(path):
+            return value
+    return None
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if message["status"] != 200 or not content_type.startswith(b"application/json"):
+                    passthrough = True  # errors, HTML, streams: untouched
+                    await send(message)
+                else:
+                    start = message
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._finish(scope, start, b"".join(chunks), if_none_match, send)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _finish(self, scope, start, body: bytes, if_none_match: str, send):
+        headers = [(name, value) for name, value in start.get("headers", [])]
+        existing = {name.lower() for name, _ in headers}
+
+        etag = next((value.decode("latin-1") for name, value in headers if name.lower() == b"etag"), None)
+        if etag is None:
+            etag = body_etag(body)
+            headers.append((b"etag", etag.encode("latin-1")))
+        if b"cache-control" not in existing:
+            public = cache_control_for(scope["path"])
+            headers.append((b"cache-control", (public or DEFAULT_CACHE_CONTROL).encode("latin-1")))
+            if public is None:
+                headers.append((b"vary", PRIVATE_VARY.encode("latin-1")))
+
+        if etag_matches(if_none_match, etag):
+            kept = [(name, value) for name, value in headers
+                    if name.lower() not in (b"content-length", b"content-type")]
+            await send({"type": "http.response.start", "status": 304, "headers": kept})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
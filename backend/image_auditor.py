@@ -0,0 +1,242 @@
+"""
+Accessibility audit of product image URLs (WhatsApp / Open Graph previews).
+
+- products are streamed from a cursor into a bounded queue, never loaded at once
+- HEAD requests go through one aiohttp session with a bounded connection pool,
+  CONCURRENCY workers and a per-host rate limit
+- results are cached by URL with their ETag / Last-Modified: a rerun sends
+  conditional requests and reuses the cached verdict on 304, and skips the
+  network entirely for entries younger than --recheck-after
+- the report is JSON (stats + problems)
+
+    python image_auditor.py --report image_audit.json
+    python image_auditor.py --all-images --concurrency 50 --rate 20
+
+`audit(items, ...)` takes any async iterable of (product_id, product_name, url),
+so it can be pointed at a local HTTP stub.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from pathlib import Path
+from typing import AsyncIterable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY = 20
+PER_HOST_RATE = 10.0  # requests per second
+TIMEOUT_SECONDS = 10
+WHATSAPP_MAX_MB = 8
+IMAGE_TYPES = ["image/", "jpeg", "jpg", "png", "webp", "gif"]
+
+
+class HostRateLimiter:
+    """Spaces the requests to each host by 1/rate seconds."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot: Dict[str, float] = {}
+
+    async def wait(self, host: str):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AuditCache:
+    """{url: {"etag", "last_modified", "checked_at", "result"}} persisted as JSON."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = Path(path) if path else None
+        self.entries = {}
+        if self.path and self.path.exists():
+            self.entries = json.loads(self.path.read_text())
+
+    def get(self, url: str) -> Optional[dict]:
+        return self.entries.get(url)
+
+    def put(self, url: str, result: dict, etag: Optional[str], last_modified: Optional[str]):
+        self.entries[url] = {"etag": etag, "last_modified": last_modified, "checked_at": time.time(), "result": result}
+
+    def save(self):
+        if self.path:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.entries))
+            tmp.replace(self.path)
+
+
+def static_issue(url: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(status, issue) detectable without a request."""
+    if not url or not url.strip():
+        return "error", "Image vide"
+    if url.startswith("http://"):
+        return "warning", "Image en HTTP (non sécurisé)"
+    if not url.startswith("https://"):
+        return "warning", "URL relative (sera convertie en absolue)"
+    return None
+
+
+def classify(status_code: int, content_type: str, content_length: Optional[str]) -> Tuple[str, Optional[str]]:
+    if status_code == 200:
+        if not any(img_type in content_type.lower() for img_type in IMAGE_TYPES):
+            return "error", f"Type de contenu invalide: {content_type}"
+        if content_length and content_length.isdigit():
+            size_mb = int(content_length) / (1024 * 1024)
+            if size_mb > WHATSAPP_MAX_MB:
+                return "warning", f"Image trop lourde: {size_mb:.2f}MB (max {WHATSAPP_MAX_MB}MB pour WhatsApp)"
+        return "ok", None
+    if status_code == 403:
+        return "error", "Accès refusé (403 Forbidden)"
+    if status_code == 404:
+        return "error", "Image introuvable (404 Not Found)"
+    return "error", f"Erreur HTTP {status_code}"
+
+
+async def check_url(session, url: str, cache: AuditCache, limiter: HostRateLimiter, recheck_after: float) -> dict:
+    """Verdict of one URL: {"status", "status_code", "content_type", "content_length", "issue", "cached"}."""
+    cached = cache.get(url)
+    if cached and time.time() - cached["checked_at"] < recheck_after:
+        return {**cached["result"], "cached": True}
+
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    await limiter.wait(urlparse(url).netloc)
+    try:
+        async with session.head(url, headers=headers, allow_redirects=True) as response:
+            if response.status == 304 and cached:
+                cache.put(url, cached["result"], cached.get("etag"), cached.get("last_modified"))
+                return {**cached["result"], "cached": True}
+            content_type = response.headers.get("Content-Type", "unknown")
+            content_length = response.headers.get("Content-Length")
+            status, issue = classify(response.status, content_type, content_length)
+            result = {
+                "status": status, "status_code": response.status, "content_type": content_type,
+                "content_length": int(content_length) if content_length and content_length.isdigit() else None,
+                "issue": issue,
+            }
+            if response.status == 200:
+                cache.put(url, result, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return {**result, "cached": False}
+    except asyncio.TimeoutError:
+        issue = "Timeout - Image trop lente à charger"
+    except aiohttp.ClientConnectorError:
+        issue = "Impossible de se connecter au serveur"
+    except Exception as e:
+        issue = f"Erreur: {str(e)}"
+    return {"status": "error", "status_code": None, "content_type": None, "content_length": None,
+            "issue": issue, "cached": False}
+
+
+async def audit(items: AsyncIterable, cache: Optional[AuditCache] = None, concurrency: int = CONCURRENCY,
+                per_host_rate: float = PER_HOST_RATE, recheck_after: float = 0) -> dict:
+    """Checks every (product_id, product_name, url) of `items`; returns the report."""
+    cache = cache or AuditCache(None)
+    limiter = HostRateLimiter(per_host_rate)
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+    stats = {"ok": 0, "warning": 0, "error": 0, "cached": 0, "checked": 0}
+    problems = []
+
+    def record(product_id, product_name, url, result):
+        stats[result["status"]] += 1
+        stats["checked"] += 1
+        stats["cached"] += 1 if result.get("cached") else 0
+        if result["status"] != "ok":
+            problems.append({"product_id": product_id, "product_name": product_name, "url": url, **result})
+
+    async def worker(session):
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                product_id, product_name, url = item
+                result = await check_url(session, url, cache, limiter, recheck_after)
+                issue = static_issue(url)
+                if issue and result["status"] == "ok":
+                    result = {**result, "status": issue[0], "issue": issue[1]}
+                record(product_id, product_name, url, result)
+            finally:
+                queue.task_done()
+
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT_SECONDS)
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+        async for product_id, product_name, url in items:
+            if not url or not url.startswith("http"):  # nothing to request
+                status, issue = static_issue(url)
+                record(product_id, product_name, url, {"status": status, "issue": issue, "status_code": None,
+                                                       "content_type": None, "content_length": None})
+                continue
+            await queue.put((product_id, product_name, url))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    cache.save()
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "duration_seconds": round(time.perf_counter() - start, 2),
+        "stats": stats,
+        "problems": problems,
+    }
+
+
+async def product_images(db, all_images: bool = False, batch_size: int = 500):
+    """Streams (product_id, product_name, url) from db.products."""
+    cursor = db.products.find({}, {"_id": 0, "id": 1, "name": 1, "images": 1}).batch_size(batch_size)
+    async for product in cursor:
+        images = product.get("images") or [None]
+        for url in images if all_images else images[:1]:
+            yield product.get("id", "N/A"), product.get("name", "Sans nom"), url
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Audit the accessibility of product images")
+    parser.add_argument("--report", default="image_audit.json", help="JSON report path")
+    parser.add_argument("--cache", default=str(Path(__file__).parent / ".image_audit_cache.json"))
+    parser.add_argument("--all-images", action="store_true", help="check every image, not only the first one")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=PER_HOST_RATE, help="requests per second and host")
+    parser.add_argument("--recheck-after", type=float, default=0,
+                        help="seconds during which a cached verdict is reused without any request")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        report = await audit(
+            product_images(db, args.all_images), AuditCache(args.cache),
+            args.concurrency, args.rate, args.recheck_after,
+        )
+        Path(args.report).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        stats = report["stats"]
+        print(f"✅ {stats['checked']} images vérifiées en {report['duration_seconds']}s "
+              f"({stats['cached']} depuis le cache): {stats['ok']} ok, {stats['warning']} avertissements, "
+              f"{stats['error']} erreurs")
+        print(f"   Rapport: {args.report}")
+        client.close()
+
+    asyncio.run(main())
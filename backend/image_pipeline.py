@@ -0,0 +1,358 @@
+"""
+Responsive variants of the product images.
+
+Sellers upload originals straight to S3 (presigned URLs), at whatever size the
+phone produced. This worker picks the products whose images changed
+(`imageVariantsPending`, set by the create/update endpoints) and, in a process
+pool, generates with Pillow:
+- a square thumbnail and 400/800/1200px wide variants, in WebP and in AVIF
+  when the Pillow build supports it (never upscaled)
+- a 1200x630 JPEG for Open Graph previews of the first image (WhatsApp and
+  Facebook crawlers do not all accept WebP)
+
+The URLs are stored on the product, next to `images`:
+    imageVariants: [{"source": url, "thumbnail": {"webp": url, "avif": url},
+                     "sizes": {"400": {"webp": url, ...}, ...}}, ...]
+                   ({"source": url, "skipped": true} for videos, undecodable and oversized files)
+    ogImage: url
+
+A product whose processing fails is retried with an exponential backoff
+(`imageVariantsRetryAt`, `imageVariantsAttempts`) and given up on after
+IMAGE_VARIANTS_MAX_ATTEMPTS failures (pending flag cleared, attempts kept);
+download and storage errors fail the product, only undecodable images are
+skipped.
+
+Storage is S3 (IMAGE_STORAGE=s3, default) or a local directory standing in for
+it in development (IMAGE_STORAGE=local, IMAGE_LOCAL_ROOT, IMAGE_LOCAL_BASE_URL).
+
+    python image_pipeline.py --watch        # process pending products continuously
+    python image_pipeline.py --all          # backfill products without variants
+    python image_pipeline.py --product ID
+"""
+
+import os
+import io
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (300, 300)
+WIDTHS = (400, 800, 1200)
+OG_SIZE = (1200, 630)
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+AVIF_QUALITY = int(os.getenv("IMAGE_AVIF_QUALITY", "60"))
+OG_JPEG_QUALITY = 85
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".webm", ".mkv", ".flv", ".wmv")
+MAX_SOURCE_BYTES = 30 * 1024 * 1024
+MAX_ATTEMPTS = int(os.getenv("IMAGE_VARIANTS_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = 60  # doubled after each failure
+
+CONTENT_TYPES = {"webp": "image/webp", "avif": "image/avif", "jpg": "image/jpeg"}
+
+
+class UnusableImage(ValueError):
+    """Source that will never render (too large); recorded as skipped, not retried."""
+
+
+def _is_unusable(error: Exception) -> bool:
+    from PIL import Image, UnidentifiedImageError
+    return isinstance(error, (UnusableImage, UnidentifiedImageError, Image.DecompressionBombError))
+
+
+# --- Rendering (runs in the worker processes) ---
+
+def _output_formats() -> List[str]:
+    from PIL import Image
+    try:
+        import pillow_avif  # noqa: F401  (plugin for Pillow builds without AVIF)
+    except ImportError:
+        pass
+    Image.init()
+    return ["webp", "avif"] if "AVIF" in Image.SAVE else ["webp"]
+
+
+def _encode(image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    elif fmt == "avif":
+        image.save(buffer, "AVIF", quality=AVIF_QUALITY)
+    else:
+        image.convert("RGB").save(buffer, "JPEG", quality=OG_JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_variants(data: bytes, with_og: bool) -> Dict[str, bytes]:
+    """{"thumbnail.webp": bytes, "w400.avif": bytes, ..., "og.jpg": bytes} of one source image."""
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)  # phone photos are often stored rotated
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    outputs = {}
+    formats = _output_formats()
+    thumbnail = ImageOps.fit(image, THUMBNAIL_SIZE, Image.LANCZOS)
+    for fmt in formats:
+        outputs[f"thumbnail.{fmt}"] = _encode(thumbnail, fmt)
+
+    for width in WIDTHS:
+        if width > image.width and width != WIDTHS[0]:
+            break  # no upscaling; the smallest size is always produced
+        resized = image if width >= image.width else image.resize(
+            (width, round(image.height * width / image.width)), Image.LANCZOS
+        )
+        for fmt in formats:
+            outputs[f"w{width}.{fmt}"] = _encode(resized, fmt)
+
+    if with_og:
+        outputs["og.jpg"] = _encode(ImageOps.fit(image, OG_SIZE, Image.LANCZOS, centering=(0.5, 0.4)), "jpg")
+    return outputs
+
+
+# --- Storage ---
+
+class S3Storage:
+    def __init__(self):
+        import s3_storage
+        self.s3 = s3_storage
+        self.bucket, self.region = s3_storage.bucket_settings()
+        self.client = s3_storage.get_s3_client()
+
+    def key_of(self, url: str) -> Optional[str]:
+        parsed = urlparse(url)
+        if parsed.netloc == f"{self.bucket}.s3.{self.region}.amazonaws.com":
+            return parsed.path.lstrip("/")
+        return None
+
+    def read(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def write(self, key: str, data: bytes, content_type: str) -> str:
+        self.client.put_object(
+            Bucket=self.bucket, Key=key, Body=data, ContentType=content_type,
+            CacheControl="public, max-age=31536000, immutable",
+        )
+        return self.s3.public_url(key)
+
+
+class LocalStorage:
+    """Directory standing in for the bucket (development, tests)."""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def key_of(self, url: str) -> Optional[str]:
+        if url.startswith(self.base_url + "/"):
+            return url[len(self.base_url) + 1:]
+        return None
+
+    def read(self, key: str) -> bytes:
+        return (self.root / key).read_bytes()
+
+    def write(self, key: str, data: bytes, content_type: str) -> str:
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return f"{self.base_url}/{key}"
+
+
+def storage_from_env():
+    if os.getenv("IMAGE_STORAGE", "s3") == "local":
+        return LocalStorage(
+            os.getenv("IMAGE_LOCAL_ROOT", str(Path(__file__).parent / "local_uploads")),
+            os.getenv("IMAGE_LOCAL_BASE_URL", "http://localhost:8001/uploads"),
+        )
+    return S3Storage()
+
+
+def _download(storage, url: str) -> bytes:
+    key = storage.key_of(url)
+    if key is not None:
+        return storage.read(key)
+    import requests  # images hosted elsewhere (older uploads)
+    response = requests.get(url, timeout=20)
+    response.raise_for_status()
+    if len(response.content) > MAX_SOURCE_BYTES:
+        raise UnusableImage("source image too large")
+    return response.content
+
+
+def _variant_prefix(storage, url: str) -> str:
+    key = storage.key_of(url) or urlparse(url).path.lstrip("/")
+    return f"variants/{key.rsplit('.', 1)[0]}"
+
+
+# --- Worker ---
+
+class ImagePipeline:
+    def __init__(self, db, storage=None, processes: Optional[int] = None):
+        self.db = db
+        self.storage = storage or storage_from_env()
+        processes = processes or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=processes)
+        self.concurrency = processes * 2
+
+    async def _process_image(self, url: str, with_og: bool) -> Tuple[dict, Optional[str]]:
+        loop = asyncio.get_running_loop()
+        data = await asyncio.to_thread(_download, self.storage, url)
+        outputs = await loop.run_in_executor(self.pool, render_variants, data, with_og)
+
+        prefix = _variant_prefix(self.storage, url)
+        names = list(outputs)
+        urls = await asyncio.gather(*(
+            asyncio.to_thread(self.storage.write, f"{prefix}/{name}", outputs[name], CONTENT_TYPES[name.rsplit(".", 1)[1]])
+            for name in names
+        ))
+        by_name = dict(zip(names, urls))
+
+        entry = {"source": url, "thumbnail": {}, "sizes": {}}
+        for name, variant_url in by_name.items():
+            label, fmt = name.rsplit(".", 1)
+            if label == "thumbnail":
+                entry["thumbnail"][fmt] = variant_url
+            elif label.startswith("w"):
+                entry["sizes"].setdefault(label[1:], {})[fmt] = variant_url
+        return entry, by_name.get("og.jpg")
+
+    async def process_product(self, product: dict) -> bool:
+        """Generates the missing variants of a product. Returns False if its images changed meanwhile."""
+        images = product.get("images") or []
+        done = {entry["source"]: entry for entry in product.get("imageVariants") or []}
+        og_image = product.get("ogImage") if images and images[0] in done else None
+
+        async def variant(position: int, url: str) -> Tuple[dict, Optional[str]]:
+            if url in done:
+                return done[url], None
+            # Recorded as skipped so that the product is not picked up again
+            if not url or url.lower().split("?")[0].endswith(VIDEO_EXTENSIONS):
+                return {"source": url, "skipped": True}, None
+            try:
+                return await self._process_image(url, with_og=position == 0)
+            except Exception as e:
+                if not _is_unusable(e):
+                    raise  # unreachable URL, S3 error...: the product is retried (_record_failure)
+                logger.warning(f"Image {url} of product {product['id']} skipped: {e}")
+                return {"source": url, "skipped": True}, None
+
+        results = await asyncio.gather(*(variant(position, url) for position, url in enumerate(images)))
+        variants = [entry for entry, _ in results]
+        og_image = next((og for _, og in results if og), og_image)
+
+        result = await self.db.products.update_one(
+            {"id": product["id"], "images": images},  # unchanged since read
+            {
+                "$set": {"imageVariants": variants, "ogImage": og_image},
+                "$unset": {"imageVariantsPending": "", "imageVariantsAttempts": "", "imageVariantsRetryAt": ""},
+            },
+        )
+        return result.matched_count == 1
+
+    async def _record_failure(self, product: dict, error: Exception):
+        attempts = product.get("imageVariantsAttempts", 0) + 1
+        update = {"$set": {"imageVariantsAttempts": attempts}}
+        if attempts >= MAX_ATTEMPTS:
+            logger.error(f"Image variants of product {product['id']} given up after {attempts} attempts: {error}")
+            update["$unset"] = {"imageVariantsPending": "", "imageVariantsRetryAt": ""}
+        else:
+            logger.warning(f"Image variants of product {product['id']} failed (attempt {attempts}): {error}")
+            retry_in = timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            update["$set"]["imageVariantsRetryAt"] = datetime.utcnow() + retry_in
+        # A product whose images changed meanwhile starts over (attempts reset by the update endpoint)
+        await self.db.products.update_one({"id": product["id"], "images": product.get("images")}, update)
+
+    async def run_once(self, query: dict, limit: int = 100) -> int:
+        products = await self.db.products.find(
+            query, {"_id": 0, "id": 1, "images": 1, "imageVariants": 1, "ogImage": 1, "imageVariantsAttempts": 1}
+        ).to_list(limit)
+        # Keep the process pool busy: several products in flight
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def process(product):
+            async with semaphore:
+                try:
+                    await self.process_product(product)
+                except Exception as e:
+                    try:
+                        await self._record_failure(product, e)
+                    except Exception as record_error:
+                        logger.error(f"Failure of product {product['id']} not recorded: {record_error}")
+
+        await asyncio.gather(*(process(product) for product in products))
+        return len(products)
+
+    async def watch(self, interval: float = 10.0):
+        while True:
+            try:
+                processed = await self.run_once(pending_query())
+            except Exception as e:  # e.g. MongoDB unreachable: retry at the next pass
+                logger.error(f"Image variants pass failed: {e}")
+                processed = 0
+            if processed:
+                logger.info(f"Image variants generated for {processed} products")
+            else:
+                await asyncio.sleep(interval)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def pending_query() -> dict:
+    """Products waiting for variants, except those backing off after a failure."""
+    return {"imageVariantsPending": True, "imageVariantsRetryAt": {"$not": {"$gt": datetime.utcnow()}}}
+
+
+def stale_query() -> dict:
+    """
+    Products whose variants do not match their current images (backfill), except those
+    backing off or given up on: failing products would otherwise be picked at every pass.
+    """
+    return {
+        "$expr": {"$ne": [{"$ifNull": ["$images", []]}, {"$ifNull": ["$imageVariants.source", []]}]},
+        "imageVariantsRetryAt": {"$not": {"$gt": datetime.utcnow()}},
+        "imageVariantsAttempts": {"$not": {"$gte": MAX_ATTEMPTS}},
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Generate the responsive variants of product images")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--watch", action="store_true", help="process pending products continuously")
+    group.add_argument("--all", action="store_true", help="backfill every product without up-to-date variants")
+    group.add_argument("--product", help="process one product")
+    parser.add_argument("--processes", type=int, help="image processes (default: CPU count)")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        pipeline = ImagePipeline(client[os.environ['DB_NAME']], processes=args.processes)
+        try:
+            if args.watch:
+                await pipeline.watch()
+            elif args.product:
+                await pipeline.run_once({"id": args.product}, limit=1)
+                print(f"✅ Variantes générées pour {args.product}")
+            else:
+                total = 0
+                while processed := await pipeline.run_once(stale_query()):
+                    total += processed
+                print(f"✅ Variantes générées pour {total} produits")
+        finally:
+            pipeline.close()
+            client.close()
+
+    asyncio.run(main())
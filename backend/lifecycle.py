@@ -0,0 +1,129 @@
+"""
+Application lifecycle: cache warm-up, readiness and graceful drain.
+
+- Warmers registered with `@warmer` run concurrently once MongoDB answers,
+  before the worker is reported ready; a failing warmer is logged, not fatal.
+  `@background_warmer` ones (e.g. slow SDK imports) start once the worker is
+  ready, so they do not delay the first request after a cold start.
+- `@periodic(seconds)` tasks (e.g. in-memory ranking reloads) run every
+  `seconds` once the worker is ready, until shutdown.
+- `InFlightMiddleware` counts the HTTP requests being handled (including their
+  background tasks, which run inside the ASGI call).
+- On shutdown the worker stops being ready and waits up to SHUTDOWN_DRAIN_SECONDS
+  for in-flight requests before the Mongo client is closed, so that requests
+  caught by a restart finish instead of failing on a closed client.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+
+_warmers: List[Callable[[], Awaitable]] = []
+_background_warmers: List[Callable[[], Awaitable]] = []
+_periodic: List[Tuple[float, Callable[[], Awaitable]]] = []
+_background_tasks = set()
+
+
+class _State:
+    ready = False
+    draining = False
+    in_flight = 0
+    started_at = None
+
+
+state = _State()
+
+
+def warmer(func: Callable[[], Awaitable]):
+    """Registers a coroutine function to run at startup."""
+    _warmers.append(func)
+    return func
+
+
+def background_warmer(func: Callable[[], Awaitable]):
+    """Registers a coroutine function to run in the background once the worker is ready."""
+    _background_warmers.append(func)
+    return func
+
+
+def periodic(seconds: float):
+    """Registers a coroutine function to run every `seconds` once the worker is ready."""
+    def register(func: Callable[[], Awaitable]):
+        _periodic.append((seconds, func))
+        return func
+    return register
+
+
+async def _repeat(func: Callable[[], Awaitable], seconds: float):
+    while True:
+        await asyncio.sleep(seconds)
+        try:
+            await func()
+        except Exception as e:
+            logger.warning(f"Periodic task {func.__name__} failed: {e}")
+
+
+def _start(coroutine):
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _run(warmers: List[Callable[[], Awaitable]], label: str):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(func() for func in warmers), return_exceptions=True)
+    for func, result in zip(warmers, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Warm-up {func.__name__} failed: {result}")
+    logger.info(f"{label} done in {time.perf_counter() - start:.2f}s ({len(warmers)} tasks)")
+
+
+async def warm_up():
+    await _run(_warmers, "Warm-up")
+
+
+def start_background_warm_up():
+    if _background_warmers:
+        _start(_run(_background_warmers, "Background warm-up"))
+    for seconds, func in _periodic:
+        _start(_repeat(func, seconds))
+
+
+def mark_ready():
+    state.ready = True
+    state.draining = False
+    state.started_at = time.time()
+
+
+async def drain(timeout: float = DRAIN_SECONDS):
+    """Stops reporting ready, then waits for the in-flight requests to complete."""
+    state.ready = False
+    state.draining = True
+    for task in list(_background_tasks):
+        task.cancel()
+    deadline = time.monotonic() + timeout
+    while state.in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    if state.in_flight:
+        logger.warning(f"Shutdown with {state.in_flight} requests still in flight")
+
+
+class InFlightMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            state.in_flight -= 1
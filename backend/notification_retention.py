@@ -0,0 +1,166 @@
+"""
+Retention of db.notifications: keeps the per-user working set small.
+
+- read notifications expire through a TTL index after NOTIFICATION_READ_TTL_DAYS
+- repeated notifications of the same group (e.g. `new_message` for one
+  conversation) are collapsed into a single document carrying a `count`,
+  at write time (push_grouped_notification) and for the backlog (compact_notifications)
+- each feed is capped to NOTIFICATION_FEED_MAX documents (trim_notification_feeds)
+
+Run the maintenance jobs as a script: python notification_retention.py
+"""
+
+import os
+import logging
+from pathlib import Path
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+import unread_counters
+
+logger = logging.getLogger(__name__)
+
+READ_TTL_DAYS = int(os.getenv("NOTIFICATION_READ_TTL_DAYS", "30"))
+FEED_MAX = int(os.getenv("NOTIFICATION_FEED_MAX", "200"))
+
+TTL_INDEX_NAME = "read_notifications_ttl"
+
+
+async def ensure_notification_indexes(db):
+    """Creates the TTL index of read notifications, or updates its delay if it changed."""
+    expire_after = READ_TTL_DAYS * 24 * 3600
+    try:
+        await db.notifications.create_index(
+            [("created_at", ASCENDING)],
+            name=TTL_INDEX_NAME,
+            expireAfterSeconds=expire_after,
+            partialFilterExpression={"read": True},
+        )
+    except OperationFailure:
+        # Index exists with another expireAfterSeconds
+        await db.command({
+            "collMod": "notifications",
+            "index": {"name": TTL_INDEX_NAME, "expireAfterSeconds": expire_after},
+        })
+
+
+async def push_grouped_notification(db, notification: dict, group_key: str) -> bool:
+    """
+    Inserts `notification`, or folds it into the unread notification of the same
+    group (recipient, type, group_key) if there is one.
+    Returns True when a new unread notification was created.
+    """
+    try:
+        return await _fold_notification(db, notification, group_key)
+    except DuplicateKeyError:
+        # A concurrent first event created the group (unique index): fold into it
+        return await _fold_notification(db, notification, group_key)
+
+
+async def _fold_notification(db, notification: dict, group_key: str) -> bool:
+    previous = await db.notifications.find_one_and_update(
+        {
+            "recipient_id": notification["recipient_id"],
+            "recipient_type": notification["recipient_type"],
+            "type": notification["type"],
+            "group_key": group_key,
+            "read": False,
+        },
+        {
+            "$set": {
+                "title": notification["title"],
+                "message": notification["message"],
+                "link": notification.get("link"),
+                "created_at": notification["created_at"],
+            },
+            "$inc": {"count": 1},
+            "$setOnInsert": {"id": notification["id"]},
+        },
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+    return previous is None
+
+
+async def compact_notifications(db) -> int:
+    """
+    Collapses groups of notifications sharing (recipient, type, group_key, read)
+    into their most recent document. Returns the number of documents removed.
+    """
+    pipeline = [
+        {"$match": {"group_key": {"$ne": None}}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {
+            "_id": {
+                "recipient_id": "$recipient_id",
+                "recipient_type": "$recipient_type",
+                "type": "$type",
+                "group_key": "$group_key",
+                "read": "$read",
+            },
+            "keep": {"$first": "$_id"},
+            "ids": {"$push": "$_id"},
+            "total": {"$sum": {"$ifNull": ["$count", 1]}},
+            "docs": {"$sum": 1},
+        }},
+        {"$match": {"docs": {"$gt": 1}}},
+    ]
+    removed = 0
+    async for group in db.notifications.aggregate(pipeline, allowDiskUse=True):
+        duplicates = [_id for _id in group["ids"] if _id != group["keep"]]
+        await db.notifications.update_one({"_id": group["keep"]}, {"$set": {"count": group["total"]}})
+        result = await db.notifications.delete_many({"_id": {"$in": duplicates}})
+        removed += result.deleted_count
+        if not group["_id"]["read"]:
+            await unread_counters.decrement(
+                db, group["_id"]["recipient_id"], group["_id"]["recipient_type"],
+                "notifications", result.deleted_count
+            )
+    return removed
+
+
+async def trim_notification_feeds(db, max_per_user: int = FEED_MAX) -> int:
+    """Deletes the oldest notifications of every feed above `max_per_user`."""
+    oversized = db.notifications.aggregate([
+        {"$group": {"_id": {"id": "$recipient_id", "type": "$recipient_type"}, "docs": {"$sum": 1}}},
+        {"$match": {"docs": {"$gt": max_per_user}}},
+    ], allowDiskUse=True)
+
+    removed = 0
+    async for feed in oversized:
+        user_id, user_type = feed["_id"]["id"], feed["_id"]["type"]
+        stale_cursor = db.notifications.find(
+            {"recipient_id": user_id, "recipient_type": user_type},
+            {"_id": 1, "read": 1},
+        ).sort("created_at", -1).skip(max_per_user)
+        stale = await stale_cursor.to_list(None)
+
+        result = await db.notifications.delete_many({"_id": {"$in": [n["_id"] for n in stale]}})
+        removed += result.deleted_count
+        unread = sum(1 for n in stale if not n.get("read"))
+        await unread_counters.decrement(db, user_id, user_type, "notifications", unread)
+    return removed
+
+
+async def run_retention(db) -> dict:
+    await ensure_notification_indexes(db)
+    compacted = await compact_notifications(db)
+    trimmed = await trim_notification_feeds(db)
+    logger.info(f"Notification retention: {compacted} compacted, {trimmed} trimmed")
+    return {"compacted": compacted, "trimmed": trimmed}
+
+
+if __name__ == "__main__":
+    import asyncio
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        result = await run_retention(client[os.environ['DB_NAME']])
+        print(f"✅ Notifications compactées: {result['compacted']}, supprimées (plafond): {result['trimmed']}")
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Bounded, TTL'd in-process cache of seller, buyer and admin documents keyed by id.
+
+Used by the enrichment paths of server.py (checkout, orders, messages, products)
+which otherwise re-fetch the same profiles for every item. Write endpoints
+must call `profiles.invalidate(kind, id)` after modifying or deleting a profile;
+the TTL bounds staleness across workers.
+
+Credentials (password hashes, admin access codes, reset tokens) are projected
+out and never held in memory: authentication paths must keep reading from
+MongoDB directly.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+# kind -> (collection name, extra filter)
+PROFILE_KINDS = {
+    "seller": ("sellers", {}),
+    "buyer": ("users", {"type": "buyer"}),
+    "admin": ("admins", {}),
+}
+
+# Never cached
+SECRET_FIELDS = ("password", "accessCode", "reset_token", "reset_token_expiry")
+PROJECTION = {"_id": 0, **{field: 0 for field in SECRET_FIELDS}}
+
+
+class ProfileCache:
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # {(kind, id): (expires_at, doc)}
+
+    def _lookup(self, key) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key, doc: dict):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, doc)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, db, kind: str, profile_id: str) -> Optional[dict]:
+        """Returns a copy of the profile, or None if it does not exist."""
+        if not profile_id:
+            return None
+        return (await self.get_many(db, kind, [profile_id])).get(profile_id)
+
+    async def get_many(self, db, kind: str, profile_ids: Iterable[str]) -> Dict[str, dict]:
+        """Returns {id: profile} for the ids that exist, fetching all misses in one query."""
+        collection_name, extra_filter = PROFILE_KINDS[kind]
+        found = {}
+        missing = []
+        for profile_id in dict.fromkeys(profile_ids):
+            if not profile_id:
+                continue
+            doc = self._lookup((kind, profile_id))
+            if doc is None:
+                missing.append(profile_id)
+            else:
+                found[profile_id] = dict(doc)
+
+        if missing:
+            cursor = db[collection_name].find({"id": {"$in": missing}, **extra_filter}, PROJECTION)
+            async for doc in cursor:
+                self._store((kind, doc["id"]), doc)
+                found[doc["id"]] = dict(doc)
+        return found
+
+    def invalidate(self, kind: str, profile_id: str):
+        self._entries.pop((kind, profile_id), None)
+
+    def invalidate_many(self, kind: str, profile_ids: Iterable[str]):
+        for profile_id in profile_ids:
+            self.invalidate(kind, profile_id)
+
+    def clear(self):
+        self._entries.clear()
+
+
+profiles = ProfileCache(
+    max_entries=int(os.getenv("PROFILE_CACHE_SIZE", "5000")),
+    ttl_seconds=float(os.getenv("PROFILE_CACHE_TTL", "60")),
+)
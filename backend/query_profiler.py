@@ -0,0 +1,184 @@
+"""
+Attributes MongoDB time to API routes.
+
+- `listener` is a pymongo CommandListener registered on the Motor client; it
+  records round-trips, DB time and returned documents in the stats of the
+  current request (a ContextVar, propagated by Motor to its executor threads).
+- `QueryProfilerMiddleware` (ASGI) opens those stats for each request, adds a
+  Server-Timing header, aggregates per-route totals and flags N+1 patterns:
+  more than N1_THRESHOLD commands of the same shape in one request.
+- `render_metrics()` exposes the totals in the Prometheus text format.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+N1_THRESHOLD = int(os.getenv("QUERY_PROFILER_N1_THRESHOLD", "5"))
+
+
+class RequestStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.db_calls = 0
+        self.db_time = 0.0  # seconds
+        self.docs_returned = 0
+        self.shapes = Counter()
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("query_profiler_stats", default=None)
+
+
+def _command_shape(command_name: str, command) -> Optional[str]:
+    """'find products {id}'-like signature of a command, ignoring the values."""
+    if command_name in ("getMore", "killCursors", "endSessions"):
+        return None
+    collection = command.get(command_name)
+    if command_name == "find":
+        keys = command.get("filter", {}).keys()
+    elif command_name == "aggregate":
+        first_stage = (command.get("pipeline") or [{}])[0]
+        keys = first_stage.get("$match", {}).keys()
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        keys = statements[0].get("q", {}).keys()
+    elif command_name in ("count", "findAndModify"):
+        keys = (command.get("query") or {}).keys()
+    else:
+        keys = ()
+    return f"{command_name} {collection} {{{','.join(sorted(keys))}}}"
+
+
+def _returned_docs(command_name: str, reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if command_name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    return 0
+
+
+class QueryProfilerListener(monitoring.CommandListener):
+    def started(self, event):
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        shape = _command_shape(event.command_name, event.command)
+        if shape:
+            with stats.lock:
+                stats.shapes[shape] += 1
+
+    def succeeded(self, event):
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        with stats.lock:
+            stats.db_calls += 1
+            stats.db_time += event.duration_micros / 1e6
+            stats.docs_returned += _returned_docs(event.command_name, event.reply)
+
+    def failed(self, event):
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        with stats.lock:
+            stats.db_calls += 1
+            stats.db_time += event.duration_micros / 1e6
+
+
+listener = QueryProfilerListener()
+
+
+class RouteMetrics:
+    __slots__ = ("requests", "latency", "db_calls", "db_time", "docs_returned", "n_plus_one")
+
+    def __init__(self):
+        self.requests = 0
+        self.latency = 0.0
+        self.db_calls = 0
+        self.db_time = 0.0
+        self.docs_returned = 0
+        self.n_plus_one = 0
+
+
+_route_metrics = {}  # {(method, route): RouteMetrics}
+
+
+def _record(method: str, route: str, stats: RequestStats, latency: float):
+    metrics = _route_metrics.get((method, route))
+    if metrics is None:
+        metrics = _route_metrics[(method, route)] = RouteMetrics()
+    metrics.requests += 1
+    metrics.latency += latency
+    metrics.db_calls += stats.db_calls
+    metrics.db_time += stats.db_time
+    metrics.docs_returned += stats.docs_returned
+
+    repeated = {shape: n for shape, n in stats.shapes.items() if n > N1_THRESHOLD}
+    if repeated:
+        metrics.n_plus_one += 1
+        logger.warning(f"N+1 queries on {method} {route}: {repeated}")
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                server_timing = (
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_calls} queries, {stats.docs_returned} docs", '
+                    f'total;dur={total_ms:.1f}'
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", server_timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            _record(scope["method"], route_path, stats, time.perf_counter() - start)
+
+
+def _labels(method: str, route: str) -> str:
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}"'
+
+
+def render_metrics() -> str:
+    """Per-route totals in the Prometheus text exposition format."""
+    series = [
+        ("nengoo_http_requests_total", "counter", "Requests handled", "requests"),
+        ("nengoo_http_request_duration_seconds_total", "counter", "Total request latency", "latency"),
+        ("nengoo_db_commands_total", "counter", "MongoDB round-trips", "db_calls"),
+        ("nengoo_db_duration_seconds_total", "counter", "Time spent in MongoDB", "db_time"),
+        ("nengoo_db_documents_returned_total", "counter", "Documents returned by MongoDB", "docs_returned"),
+        ("nengoo_db_n_plus_one_total", "counter", "Requests with repeated same-shape queries", "n_plus_one"),
+    ]
+    lines = []
+    items = sorted(_route_metrics.items())
+    for name, metric_type, help_text, attribute in series:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for (method, route), metrics in items:
+            lines.append(f"{name}{{{_labels(method, route)}}} {getattr(metrics, attribute)}")
+    return "\n".join(lines) + "\n"
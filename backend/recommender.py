@@ -0,0 +1,285 @@
+"""
+Item-item recommendations ("related products") from co-views and co-purchases.
+
+A basket is what one user touched during one UTC day:
+- product events of the log (event_store.py): view (1), rate (1, 2 if >= 4),
+  favourite (2)
+- order lines (3), grouped by buyer and order day since orders are split per seller
+Each product keeps its highest weight in the basket (capped to MAX_BASKET_SIZE
+products), and every pair of products of a basket co-occurs with the smaller
+weight of the two.
+
+The co-occurrence matrix is sparse and lives in MongoDB, accumulated
+incrementally:
+    recommender_items  {_id: productId, w: total weight}
+    recommender_pairs  {_id: "a|b", a, b, w}  (both directions)
+Each run counts the events received since the previous one
+(`recommender_state.receivedUntil`; `receivedAt`, else the event time, for
+events and the order date for orders). Offline events arrive up to
+event_ingest.MAX_EVENT_AGE late, into baskets already counted: the baskets
+touched by new events are rebuilt with and without them, and the difference
+of their pair counts (pandas self-join of the (basket, product) table, i.e.
+a COO sparse product) is `$inc`ed. Then the neighbours of the products it
+touched are recomputed:
+    similarity(a, b) = w(a, b) / sqrt(w(a) * w(b))
+    product_related  {_id: productId, related: [{productId, score}], updatedAt}
+The API reads one product_related document per request.
+
+    python recommender.py            # count the new events (cron, e.g. hourly)
+    python recommender.py --watch    # same, in a loop
+    python recommender.py --rebuild  # forget the matrix and start over
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne, ReplaceOne
+
+import event_store
+import event_ingest
+
+logger = logging.getLogger(__name__)
+
+TOP_K = int(os.getenv("RECOMMENDER_TOP_K", "20"))
+BOOTSTRAP_DAYS = int(os.getenv("RECOMMENDER_BOOTSTRAP_DAYS", "90"))
+CHUNK_DAYS = 7  # days loaded in memory at once
+MAX_BASKET_SIZE = 50  # pairs grow quadratically with the basket
+CANDIDATES = 200  # strongest co-occurrences considered per product
+MIN_SCORE = 0.01
+
+EVENT_WEIGHTS = {"view": 1.0, "favourite": 2.0, "rate": 1.0}
+HIGH_RATING_WEIGHT = 2.0
+PURCHASE_WEIGHT = 3.0
+# Oldest event time still accepted by the ingest (older client timestamps are clamped)
+MAX_LATENESS = event_ingest.MAX_EVENT_AGE + event_ingest.MAX_CLOCK_SKEW
+
+STATE_ID = "item_item"
+
+
+def _day(timestamp: datetime) -> datetime:
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def load_rows(db, start: datetime, end: datetime) -> pd.DataFrame:
+    """
+    (basket, productId, weight, received) rows of the events and orders received before
+    `end` whose basket may have received something in [start, end).
+    """
+    since = _day(start - MAX_LATENESS)
+    rows = []
+    events = db[event_store.EVENTS_COLLECTION].find(
+        {"meta.type": {"$in": list(EVENT_WEIGHTS)}, "timestamp": {"$gte": since, "$lt": end}, "userId": {"$ne": None}},
+        {"_id": 0, "timestamp": 1, "receivedAt": 1, "meta": 1, "userId": 1, "rating": 1, "isFavourite": 1},
+    ).batch_size(5000)
+    async for event in events:
+        kind = event["meta"]["type"]
+        if kind == "favourite" and not event.get("isFavourite", True):
+            continue
+        weight = HIGH_RATING_WEIGHT if kind == "rate" and event.get("rating", 0) >= 4 else EVENT_WEIGHTS[kind]
+        rows.append((f"{event['userId']}:{_day(event['timestamp']).date()}", event["meta"]["productId"], weight,
+                     event.get("receivedAt") or event["timestamp"]))
+
+    orders = db.orders.find(
+        {"orderedDate": {"$gte": since, "$lt": end}, "status": {"$ne": "cancelled"}},
+        {"_id": 0, "buyerId": 1, "orderedDate": 1, "products.productId": 1},
+    ).batch_size(5000)
+    async for order in orders:
+        basket = f"{order['buyerId']}:{_day(order['orderedDate']).date()}"
+        rows.extend((basket, line["productId"], PURCHASE_WEIGHT, order["orderedDate"]) for line in order.get("products", []))
+
+    rows = pd.DataFrame(rows, columns=["basket", "productId", "weight", "received"])
+    return rows[rows["received"] < end]
+
+
+def to_baskets(rows: pd.DataFrame) -> pd.DataFrame:
+    """(basket, productId, weight): highest weight per product, MAX_BASKET_SIZE products per basket."""
+    if rows.empty:
+        return pd.DataFrame(columns=["basket", "productId", "weight"])
+    baskets = rows.groupby(["basket", "productId"], as_index=False)["weight"].max()
+    return baskets.sort_values("weight", ascending=False).groupby("basket").head(MAX_BASKET_SIZE)
+
+
+def changed_baskets(rows: pd.DataFrame, start: datetime, counted_from: Optional[datetime] = None):
+    """
+    (before, after) baskets touched by the rows received from `start` on: without and with them.
+    Rows received before `counted_from` (start of the matrix) are ignored.
+    """
+    if counted_from is not None:
+        rows = rows[rows["received"] >= counted_from]
+    touched = rows.loc[rows["received"] >= start, "basket"].unique()
+    rows = rows[rows["basket"].isin(touched)]
+    return to_baskets(rows[rows["received"] < start]), to_baskets(rows)
+
+
+def co_occurrences(baskets: pd.DataFrame) -> pd.DataFrame:
+    """(a, b, w) sparse co-occurrence entries of the baskets, both directions, a != b."""
+    pairs = baskets.merge(baskets, on="basket", suffixes=("_a", "_b"))
+    pairs = pairs[pairs["productId_a"] != pairs["productId_b"]]
+    pairs = pairs.assign(w=np.minimum(pairs["weight_a"].to_numpy(), pairs["weight_b"].to_numpy()))
+    return (
+        pairs.groupby(["productId_a", "productId_b"], as_index=False)["w"].sum()
+        .rename(columns={"productId_a": "a", "productId_b": "b"})
+    )
+
+
+async def _bulk(collection, operations: List, batch_size: int = 5000):
+    for i in range(0, len(operations), batch_size):
+        await collection.bulk_write(operations[i:i + batch_size], ordered=False)
+
+
+def _difference(after: pd.Series, before: pd.Series) -> pd.Series:
+    delta = after.sub(before, fill_value=0)
+    return delta[delta != 0]
+
+
+def matrix_delta(after: pd.DataFrame, before: Optional[pd.DataFrame] = None) -> Tuple[pd.Series, pd.DataFrame]:
+    """(item weights, (a, b, w) pairs) to add to the matrix to replace `before` baskets by `after` ones."""
+    if before is None:
+        before = after.iloc[0:0]
+    item_weights = _difference(after.groupby("productId")["weight"].sum(), before.groupby("productId")["weight"].sum())
+    pairs = _difference(
+        co_occurrences(after).set_index(["a", "b"])["w"],
+        co_occurrences(before).set_index(["a", "b"])["w"],
+    ).reset_index()
+    return item_weights, pairs
+
+
+async def accumulate(db, after: pd.DataFrame, before: Optional[pd.DataFrame] = None) -> set:
+    """
+    Replaces the contribution of `before` baskets by that of `after` ones in the stored
+    matrix (adds `after` alone when new); returns the products whose neighbours changed.
+    """
+    if after.empty:
+        return set()
+    item_weights, pairs = matrix_delta(after, before)
+
+    await _bulk(db.recommender_items, [
+        UpdateOne({"_id": product_id}, {"$inc": {"w": float(weight)}}, upsert=True)
+        for product_id, weight in item_weights.items()
+    ])
+    await _bulk(db.recommender_pairs, [
+        UpdateOne({"_id": f"{a}|{b}"}, {"$inc": {"w": float(w)}, "$setOnInsert": {"a": a, "b": b}}, upsert=True)
+        for a, b, w in pairs.itertuples(index=False)
+    ])
+    return set(pairs["a"])
+
+
+async def refresh_neighbours(db, product_ids: Iterable[str], top_k: int = TOP_K, chunk: int = 500) -> int:
+    """Recomputes product_related for `product_ids`; returns the number of documents written."""
+    product_ids = list(product_ids)
+    written = 0
+    for i in range(0, len(product_ids), chunk):
+        ids = product_ids[i:i + chunk]
+        rows = []
+        pipeline = [
+            {"$match": {"a": {"$in": ids}}},
+            {"$group": {"_id": "$a", "top": {"$topN": {"n": CANDIDATES, "sortBy": {"w": -1}, "output": ["$b", "$w"]}}}},
+        ]
+        async for group in db.recommender_pairs.aggregate(pipeline, allowDiskUse=True):
+            rows.extend((group["_id"], b, w) for b, w in group["top"])
+        if not rows:
+            continue
+        pairs = pd.DataFrame(rows, columns=["a", "b", "w"])
+
+        involved = list(set(pairs["a"]) | set(pairs["b"]))
+        weights = {doc["_id"]: doc["w"] async for doc in db.recommender_items.find({"_id": {"$in": involved}})}
+        w_a = pairs["a"].map(weights).fillna(0).to_numpy()
+        w_b = pairs["b"].map(weights).fillna(0).to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pairs["score"] = np.where(w_a * w_b > 0, pairs["w"].to_numpy() / np.sqrt(w_a * w_b), 0.0)
+        pairs = pairs[pairs["score"] >= MIN_SCORE]
+        top = pairs.sort_values("score", ascending=False).groupby("a").head(top_k)
+
+        now = datetime.utcnow()
+        operations = [
+            ReplaceOne(
+                {"_id": product_id},
+                {"related": [{"productId": b, "score": round(float(s), 4)} for b, s in zip(group["b"], group["score"])],
+                 "updatedAt": now},
+                upsert=True,
+            )
+            for product_id, group in top.groupby("a", sort=False)
+        ]
+        await _bulk(db.product_related, operations)
+        written += len(operations)
+    return written
+
+
+async def run(db, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Counts the events received since the last run, CHUNK_DAYS of reception at a time."""
+    end = now or datetime.utcnow()
+    state = await db.recommender_state.find_one({"_id": STATE_ID}) or {}
+    if not state:
+        state = {"countedFrom": end - timedelta(days=BOOTSTRAP_DAYS)}
+        await db.recommender_state.update_one({"_id": STATE_ID}, {"$set": state}, upsert=True)
+    # processedUntil: checkpoint of the former day by day runs
+    start = state.get("receivedUntil") or state.get("processedUntil") or state["countedFrom"]
+    summary = {"days": 0, "baskets": 0, "products": 0}
+
+    touched = set()
+    while start < end:
+        chunk_end = min(start + timedelta(days=CHUNK_DAYS), end)
+        rows = await load_rows(db, start, chunk_end)
+        before, after = changed_baskets(rows, start, state.get("countedFrom"))
+        touched |= await accumulate(db, after, before)
+        # The checkpoint follows the increments: a crash in between re-counts at most one chunk
+        await db.recommender_state.update_one(
+            {"_id": STATE_ID}, {"$set": {"receivedUntil": chunk_end, "updatedAt": datetime.utcnow()}}, upsert=True
+        )
+        summary["days"] += (chunk_end - start).days
+        summary["baskets"] += after["basket"].nunique()
+        start = chunk_end
+
+    summary["products"] = await refresh_neighbours(db, touched)
+    return summary
+
+
+async def rebuild(db):
+    await asyncio.gather(
+        db.recommender_items.drop(), db.recommender_pairs.drop(),
+        db.recommender_state.delete_one({"_id": STATE_ID}),
+    )
+    return await run(db)
+
+
+async def related_ids(db, product_id: str) -> List[str]:
+    doc = await db.product_related.find_one({"_id": product_id}, {"related.productId": 1})
+    return [entry["productId"] for entry in doc["related"]] if doc else []
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Compute the related products")
+    parser.add_argument("--watch", action="store_true", help="run again every --interval seconds")
+    parser.add_argument("--interval", type=float, default=3600)
+    parser.add_argument("--rebuild", action="store_true", help="drop the matrix and recompute from scratch")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        try:
+            summary = await (rebuild(db) if args.rebuild else run(db))
+            print(f"✅ {summary['days']} jours, {summary['baskets']} paniers, "
+                  f"{summary['products']} produits recalculés")
+            while args.watch:
+                await asyncio.sleep(args.interval)
+                summary = await run(db)
+                if summary["days"]:
+                    logger.info(f"Related products refreshed: {summary}")
+        finally:
+            client.close()
+
+    asyncio.run(main())
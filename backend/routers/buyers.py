@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 import uuid
+import asyncio
 import bcrypt
 
 from server import db, hash_password, verify_password, Buyer
@@ -68,7 +69,8 @@ async def buyer_oauth_login(oauth_data: BuyerOAuthLoginRequest):
     Verifies Firebase token and creates/logs in buyer account
     """
     # Check if Firebase is initialized
-    if not is_firebase_initialized():
+    # The first call initializes the SDK (lock held for the whole init): off the event loop
+    if not await asyncio.to_thread(is_firebase_initialized):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="OAuth authentication is not available. Please contact support."
@@ -76,7 +78,7 @@ async def buyer_oauth_login(oauth_data: BuyerOAuthLoginRequest):
 
     try:
         # Verify Firebase token
-        decoded_token = verify_firebase_token(oauth_data.idToken)
+        decoded_token = await asyncio.to_thread(verify_firebase_token, oauth_data.idToken)
 
         # Extract user information from token
         firebase_uid = decoded_token.get('uid')
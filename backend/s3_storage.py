@@ -0,0 +1,104 @@
+"""
+S3 uploads: one lazily built boto3 client per process and presigned URL helpers.
+
+Creating a boto3 client costs tens of milliseconds (and the first one imports
+boto3), so the client is built on first use and reused; boto3 clients are
+thread-safe. Signing is local CPU work but the batch helpers still run it in a
+worker thread to keep the event loop free.
+
+Requires AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION and S3_BUCKET_NAME.
+"""
+
+import os
+import uuid
+import asyncio
+import threading
+from typing import List, Optional, Tuple
+
+PRESIGNED_EXPIRES_IN = 3600  # 1 hour
+DEFAULT_MAX_UPLOAD_SIZE = int(os.getenv("S3_MAX_UPLOAD_SIZE", str(10 * 1024 * 1024)))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class S3NotConfigured(Exception):
+    pass
+
+
+def bucket_settings() -> Tuple[str, str]:
+    """(bucket name, region), or raises S3NotConfigured."""
+    required = [os.environ.get(name) for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_REGION", "S3_BUCKET_NAME")]
+    if not all(required):
+        raise S3NotConfigured("AWS S3 environment variables not configured.")
+    return os.environ["S3_BUCKET_NAME"], os.environ["AWS_REGION"]
+
+
+def get_s3_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import boto3
+                from botocore.config import Config
+
+                bucket_settings()
+                _client = boto3.client(
+                    "s3",
+                    aws_access_key_id=os.environ["AWS_ACCESS_KEY_ID"],
+                    aws_secret_access_key=os.environ["AWS_SECRET_ACCESS_KEY"],
+                    region_name=os.environ["AWS_REGION"],
+                    config=Config(signature_version='s3v4'),
+                )
+    return _client
+
+
+def new_object_key(file_name: str) -> str:
+    return f"uploads/{uuid.uuid4()}-{file_name}"
+
+
+def public_url(object_key: str) -> str:
+    bucket_name, region = bucket_settings()
+    return f"https://{bucket_name}.s3.{region}.amazonaws.com/{object_key}"
+
+
+def presign_put(file_name: str, file_type: str) -> dict:
+    """{"uploadUrl", "publicUrl"} for a PUT of the file with this Content-Type."""
+    bucket_name, _ = bucket_settings()
+    object_key = new_object_key(file_name)
+    upload_url = get_s3_client().generate_presigned_url(
+        'put_object',
+        Params={'Bucket': bucket_name, 'Key': object_key, 'ContentType': file_type},
+        ExpiresIn=PRESIGNED_EXPIRES_IN,
+    )
+    return {"uploadUrl": upload_url, "publicUrl": public_url(object_key)}
+
+
+def presign_post(file_name: str, file_type: str, max_size: Optional[int] = None) -> dict:
+    """
+    {"uploadUrl", "publicUrl", "fields"} of a browser form POST; unlike a PUT URL,
+    S3 enforces the Content-Type and the maximum size of the upload.
+    """
+    bucket_name, _ = bucket_settings()
+    object_key = new_object_key(file_name)
+    post = get_s3_client().generate_presigned_post(
+        bucket_name,
+        object_key,
+        Fields={"Content-Type": file_type},
+        Conditions=[
+            {"Content-Type": file_type},
+            ["content-length-range", 1, max_size or DEFAULT_MAX_UPLOAD_SIZE],
+        ],
+        ExpiresIn=PRESIGNED_EXPIRES_IN,
+    )
+    return {"uploadUrl": post["url"], "publicUrl": public_url(object_key), "fields": post["fields"]}
+
+
+async def presign_many(files: List[Tuple[str, str]], method: str = "put", max_size: Optional[int] = None) -> List[dict]:
+    """Signs every (file name, content type) in one worker thread call."""
+    def sign_all():
+        if method == "post":
+            return [presign_post(name, file_type, max_size) for name, file_type in files]
+        return [presign_put(name, file_type) for name, file_type in files]
+
+    return await asyncio.to_thread(sign_all)
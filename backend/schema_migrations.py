@@ -0,0 +1,203 @@
+"""
+One-time schema migrations of the stored documents.
+
+The list endpoints of server.py trust the documents they read: they are
+written through the Pydantic models and returned with `fast_json.projection`
+/ `fill_defaults`, without validating each one. Documents that predate a
+required field (or were inserted by init_database.py) are brought to the
+current models here, once, instead of being patched on every read.
+
+Applied migrations are recorded in `db.schema_migrations`
+({_id: name, appliedAt, modified}). `migrate` runs at startup, before the
+indexes are built and before the worker is ready; a failing migration fails
+the boot. The migrations are idempotent, so workers starting together are
+harmless. `check` validates whole collections against their models with one
+TypeAdapter per batch and reports the documents that still do not match.
+
+    python schema_migrations.py           # apply the pending migrations
+    python schema_migrations.py --check   # validate the stored documents
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pymongo.errors import OperationFailure
+
+import fast_json
+import click_analytics
+import db_indexes
+import notification_retention
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS: List[Tuple[str, Callable[..., Awaitable[int]]]] = []
+
+
+def migration(name: str):
+    """Registers `fn(db) -> modified count` under `name`; never rename an applied one."""
+    def register(fn):
+        MIGRATIONS.append((name, fn))
+        return fn
+    return register
+
+
+@migration("sellers_region_address")
+async def sellers_region_address(db) -> int:
+    # Sellers created before region / address were required
+    result = await db.sellers.update_many(
+        {"$or": [{"region": {"$exists": False}}, {"address": {"$exists": False}}]},
+        [{"$set": {
+            "region": {"$ifNull": ["$region", {"$ifNull": ["$city", "Non spécifié"]}]},
+            "address": {"$ifNull": ["$address", "Non spécifié"]},
+        }}],
+    )
+    return result.modified_count
+
+
+@migration("admins_type")
+async def admins_type(db) -> int:
+    result = await db.admins.update_many({"type": {"$exists": False}}, {"$set": {"type": "admin"}})
+    return result.modified_count
+
+
+@migration(click_analytics.LEGACY_BACKFILL_MIGRATION)
+async def whatsapp_click_buckets_backfill(db) -> int:
+    # Before the TTL index of whatsapp_clicks exists (click_analytics.ensure_click_indexes)
+    return await click_analytics.backfill_legacy_clicks(db)
+
+
+@migration("unique_notification_groups")
+async def unique_notification_groups(db) -> int:
+    # Duplicates created by concurrent upserts block the unique index: merge them first
+    merged = await notification_retention.compact_notifications(db)
+    try:
+        await db.notifications.drop_index("recipient_id_1_type_1_group_key_1")
+    except OperationFailure:
+        pass  # never built
+    await db.notifications.create_indexes([db_indexes.NOTIFICATION_GROUP_KEY])
+    return merged
+
+
+async def _merge_duplicate_conversations(db) -> int:
+    """Folds the conversations sharing (buyer, seller, product) into the oldest one."""
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": {"buyer_id": "$buyer_id", "seller_id": "$seller_id", "product_id": "$product_id"},
+            "conversations": {"$push": "$$ROOT"},
+        }},
+        {"$match": {"conversations.1": {"$exists": True}}},
+    ]
+    merged = 0
+    async for group in db.conversations.aggregate(pipeline, allowDiskUse=True):
+        keep, *duplicates = group["conversations"]
+        latest = max(group["conversations"], key=lambda c: c.get("last_message_timestamp") or datetime.min)
+        await db.messages.update_many(
+            {"conversation_id": {"$in": [c["id"] for c in duplicates]}}, {"$set": {"conversation_id": keep["id"]}}
+        )
+        await db.conversations.update_one({"_id": keep["_id"]}, {"$set": {
+            "last_message_timestamp": latest.get("last_message_timestamp"),
+            "last_message_preview": latest.get("last_message_preview"),
+            **{f"{side}_unread": any(c.get(f"{side}_unread") for c in group["conversations"])
+               for side in ("buyer", "seller")},
+            **{f"{side}_unread_count": sum(c.get(f"{side}_unread_count", 0) for c in group["conversations"])
+               for side in ("buyer", "seller")},
+        }})
+        await db.conversations.delete_many({"_id": {"$in": [c["_id"] for c in duplicates]}})
+        merged += len(duplicates)
+    return merged
+
+
+@migration("unique_conversation_keys")
+async def unique_conversation_keys(db) -> int:
+    # Same as unique_notification_groups, for the conversation created by a buyer's first message
+    merged = await _merge_duplicate_conversations(db)
+    try:
+        await db.conversations.drop_index("buyer_id_1_seller_id_1_product_id_1")
+    except OperationFailure:
+        pass  # never built
+    await db.conversations.create_indexes([db_indexes.CONVERSATION_KEY])
+    return merged
+
+
+async def migrate(db) -> Dict[str, int]:
+    """Applies the pending migrations in order; returns {name: modified documents}."""
+    applied = {doc["_id"] async for doc in db.schema_migrations.find({}, {"_id": 1})}
+    results = {}
+    for name, fn in MIGRATIONS:
+        if name in applied:
+            continue
+        results[name] = await fn(db)
+        await db.schema_migrations.update_one(
+            {"_id": name},
+            {"$set": {"appliedAt": datetime.utcnow(), "modified": results[name]}},
+            upsert=True,
+        )
+        logger.info(f"Schema migration {name}: {results[name]} documents")
+    return results
+
+
+async def check(db, models: Dict[str, Type[BaseModel]], batch_size: int = 1000) -> Dict[str, List[Tuple[str, str]]]:
+    """{collection: [(document id, first error)]} of the documents that do not validate against their model."""
+    invalid = {}
+    for collection, model in models.items():
+        adapter = TypeAdapter(List[model])
+        invalid[collection] = []
+        cursor = db[collection].find({}, fast_json.projection(model)).batch_size(batch_size)
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                invalid[collection] += _invalid(adapter, batch)
+                batch = []
+        invalid[collection] += _invalid(adapter, batch)
+    return invalid
+
+
+def _invalid(adapter: TypeAdapter, docs: List[dict]) -> List[Tuple[str, str]]:
+    try:
+        adapter.validate_python(docs)
+        return []
+    except ValidationError as e:
+        errors = {}
+        for error in e.errors():
+            index = error["loc"][0]
+            errors.setdefault(index, f"{'.'.join(map(str, error['loc'][1:]))}: {error['msg']}")
+        return [(docs[index].get("id", "?"), message) for index, message in errors.items()]
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Stored documents schema migrations")
+    parser.add_argument("--check", action="store_true", help="validate the stored documents against the models")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        if args.check:
+            import server
+            invalid = await check(db, server.TRUSTED_COLLECTIONS)
+            for collection, documents in invalid.items():
+                print(f"{'✅' if not documents else '❌'} {collection}: {len(documents)} documents invalides")
+                for doc_id, message in documents[:20]:
+                    print(f"   {doc_id}: {message}")
+        else:
+            results = await migrate(db)
+            for name, modified in results.items():
+                print(f"✅ {name}: {modified} documents modifiés")
+            if not results:
+                print("✅ Aucune migration en attente")
+        client.close()
+
+    asyncio.run(main())
@@ -1,22 +1,26 @@
-from fastapi import FastAPI, APIRouter, HTTPException, status, Header, Depends, BackgroundTasks
-from fastapi.responses import HTMLResponse, Response
+from fastapi import FastAPI, APIRouter, HTTPException, status, Header, Depends, BackgroundTasks, Query
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
 from pydantic import EmailStr
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
+import asyncio
 import logging
 import re
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from typing import Annotated, Dict, List, Literal, Optional, Union, Any
 import uuid
+import base64
 from datetime import datetime, timedelta
 from enum import Enum
 import bcrypt
-import boto3
-from botocore.exceptions import ClientError
+import hmac
 import html
 
 ROOT_DIR = Path(__file__).parent
@@ -24,9 +28,25 @@ load_dotenv(ROOT_DIR / '.env')
 
 # Import Firebase Admin configuration
 from firebase_admin_config import initialize_firebase_admin
-
-# Initialize Firebase Admin SDK
-initialize_firebase_admin()
+import unread_counters
+import notification_retention
+import click_analytics
+import event_ingest
+import event_store
+import recommender
+import trending
+import catalog_facets
+import catalog_stats
+import http_cache
+import compression
+import fast_json
+import schema_migrations
+from profile_cache import profiles
+import db_indexes
+import query_profiler
+import db_pool
+import lifecycle
+import s3_storage
 
 # --- Email Configuration ---
 # Add these variables to your .env file
@@ -40,19 +60,67 @@ conf = ConnectionConfig(
     MAIL_SSL_TLS=os.getenv("SMTP_SECURE", "False").lower() == "true",
     USE_CREDENTIALS=os.getenv("USE_CREDENTIALS", "True").lower() == "true",
     VALIDATE_CERTS=os.getenv("VALIDATE_CERTS", "True").lower() == "true",
+    SUPPRESS_SEND=os.getenv("SUPPRESS_SEND", "False").lower() == "true",  # e.g. for benchmarks
     TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
 )
 
-fm = FastMail(conf)
+_mailer: Optional[FastMail] = None
+
+def get_mailer() -> FastMail:
+    """FastMail client, created on the first email sent."""
+    global _mailer
+    if _mailer is None:
+        _mailer = FastMail(conf)
+    return _mailer
+
+async def send_email(message: MessageSchema, template_name: str):
+    await get_mailer().send_message(message, template_name=template_name)
 
 # --- App and DB Setup ---
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+query_profiling = os.getenv("QUERY_PROFILING", "True").lower() == "true"
+mongo_options = db_pool.client_options()
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[db_pool.pool_monitor] + ([query_profiler.listener] if query_profiling else []),
+    **mongo_options,
+)
 db = client[os.environ['DB_NAME']]
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail the boot (and let the platform restart us) rather than serve without Mongo
+    await db_pool.wait_for_mongo(client)
+    # Legacy documents are migrated once, before the indexes and before serving: the
+    # list endpoints read them without validation, so a failed migration fails the boot
+    await schema_migrations.migrate(db)
+    startup_tasks = [lifecycle.warm_up()]
+    if os.getenv("ENSURE_INDEXES_ON_STARTUP", "True").lower() == "true":
+        startup_tasks.append(db_indexes.ensure_indexes(db))
+    await asyncio.gather(*startup_tasks)
+    lifecycle.mark_ready()
+    lifecycle.start_background_warm_up()
+    yield
+    await lifecycle.drain()
+    client.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=fast_json.ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
+app.add_middleware(lifecycle.InFlightMiddleware)
+
+if query_profiling:
+    # Server-Timing header and per-route Mongo metrics (see /metrics)
+    app.add_middleware(query_profiler.QueryProfilerMiddleware)
+
+# ETag / 304 and Cache-Control on the JSON GET endpoints
+app.add_middleware(http_cache.ConditionalGetMiddleware)
+
+# Brotli / gzip above COMPRESSION_MIN_BYTES (outside the ETag middleware: weak ETag when compressed)
+app.add_middleware(compression.CompressionMiddleware)
+
 
 origins = [
     "https://www.nengoo.com",
@@ -85,6 +153,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Prev-Cursor", "X-Next-Cursor"],
 )
 
 # --- Utility Functions ---
@@ -98,17 +167,6 @@ def normalize_whatsapp(whatsapp: str) -> str:
         return ""
     return whatsapp.replace(" ", "").replace("-", "").strip()
 
-def migrate_seller_data(seller_data: dict) -> dict:
-    """
-    Migrates legacy seller data to match current schema.
-    Adds default values for missing required fields.
-    """
-    if "region" not in seller_data:
-        seller_data["region"] = seller_data.get("city", "Non spécifié")
-    if "address" not in seller_data:
-        seller_data["address"] = "Non spécifié"
-    return seller_data
-
 # --- Security (Mock Authorization) ---
 
 async def get_user_id_from_request(
@@ -183,6 +241,15 @@ async def seller_or_moderator_or_higher_required(seller_id: Optional[str] = Depe
             detail="Seller, Moderator, Admin, or Super admin privileges required."
         )
 
+async def seller_self_or_admin_required(
+    seller_id: str,
+    current_seller_id: Optional[str] = Depends(get_current_seller_optional),
+    role: Optional[str] = Depends(get_current_admin_role)
+):
+    if role in ["super_admin", "admin"] or current_seller_id == seller_id:
+        return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view these analytics.")
+
 async def product_owner_or_moderator_required(
     product_id: str,
     seller_id: Optional[str] = Depends(get_current_seller_optional),
@@ -286,6 +353,9 @@ class Product(BaseModel):
     views: int = 0
     favorites: int = 0
     tags: List[str] = []
+    # Filled by image_pipeline.py after upload
+    imageVariants: List[Dict[str, Any]] = []
+    ogImage: Optional[str] = None
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
 
@@ -553,6 +623,16 @@ class PresignedUrlResponse(BaseModel):
     uploadUrl: str
     publicUrl: str
 
+class PresignedUrlBatchRequest(BaseModel):
+    files: List[PresignedUrlRequest] = Field(..., min_length=1, max_length=20)
+    method: Literal["put", "post"] = "put"
+    maxSize: Optional[int] = Field(None, gt=0, description="Taille maximale en octets (method=post)")
+
+class PresignedUploadResponse(BaseModel):
+    uploadUrl: str
+    publicUrl: str
+    fields: Optional[Dict[str, str]] = None  # form fields of a POST upload
+
 class Buyer(BaseModel):
     id: str
     whatsapp: str
@@ -638,6 +718,8 @@ class Notification(BaseModel):
     link: Optional[str] = None
     read: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    count: int = 1  # Number of events collapsed into this notification
+    group_key: Optional[str] = None
 
 class NotificationCreate(BaseModel):
     recipient_id: str
@@ -656,6 +738,19 @@ class Conversation(BaseModel):
     last_message_preview: str
     seller_unread: bool = False
     buyer_unread: bool = False
+    seller_unread_count: int = 0
+    buyer_unread_count: int = 0
+
+# Collections read without per-document validation, and their models
+# (python schema_migrations.py --check)
+TRUSTED_COLLECTIONS = {
+    "products": Product,
+    "sellers": Seller,
+    "admins": Admin,
+    "pickupPoints": PickupPoint,
+    "notifications": Notification,
+    "conversations": Conversation,
+}
 
 class BulkDeleteRequest(BaseModel):
     ids: List[str]
@@ -710,31 +805,135 @@ class WhatsAppClickCreate(BaseModel):
     sellerId: str
     sellerName: str
 
+class AnalyticsEventBase(BaseModel):
+    eventId: str = Field(..., min_length=1, max_length=64)  # generated by the client, idempotency key
+    clientTimestamp: Optional[datetime] = None
+
+class ViewEvent(AnalyticsEventBase):
+    type: Literal["view"]
+    productId: str
+
+class ClickEvent(AnalyticsEventBase):
+    type: Literal["click"]
+    productId: str
+    productName: str
+    sellerId: str
+    sellerName: str
+
+class FavouriteEvent(AnalyticsEventBase):
+    type: Literal["favourite"]
+    productId: str
+    isFavourite: bool = True
+
+class SearchEvent(AnalyticsEventBase):
+    type: Literal["search"]
+    query: str = Field(..., max_length=200)
+    category: Optional[str] = None
+    resultsCount: Optional[int] = Field(None, ge=0)
+
+AnalyticsEvent = Annotated[Union[ViewEvent, ClickEvent, FavouriteEvent, SearchEvent], Field(discriminator="type")]
+
+class AnalyticsEventBatch(BaseModel):
+    events: List[AnalyticsEvent] = Field(..., min_length=1, max_length=500)
+
+class AnalyticsEventRejection(BaseModel):
+    eventId: str
+    reason: str
+
+class AnalyticsEventBatchResult(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: List[AnalyticsEventRejection] = []
+
 # --- Auth Endpoints (Forgot Password) ---
 
+@api_router.post("/analytics/events", response_model=AnalyticsEventBatchResult)
+async def ingest_analytics_events(
+    batch: AnalyticsEventBatch,
+    user_id: Optional[str] = Depends(get_user_id_from_request)
+):
+    """
+    Batch of views, WhatsApp clicks, favourites and searches queued by the app.
+    Resending a batch is safe: events already received (same eventId) are counted as duplicates.
+    """
+    return await event_ingest.ingest(db, [event.dict() for event in batch.events], user_id)
+
 @api_router.post("/analytics/whatsapp-click", status_code=status.HTTP_201_CREATED)
 async def record_whatsapp_click(click_data: WhatsAppClickCreate):
     new_click = WhatsAppClick(**click_data.dict())
-    await db.whatsapp_clicks.insert_one(new_click.dict())
+    await click_analytics.record_click(db, new_click.dict())
     return {"message": "Click recorded"}
 
 @api_router.get("/analytics/whatsapp-clicks", dependencies=[Depends(admin_or_higher_required)])
-async def get_whatsapp_clicks_analytics():
-    pipeline = [
-        {
-            "$group": {
-                "_id": "$productId",
-                "productName": { "$first": "$productName" },
-                "sellerName": { "$first": "$sellerName" },
-                "clickCount": { "$sum": 1 },
-                "lastClick": { "$max": "$timestamp" }
-            }
-        },
-        { "$sort": { "clickCount": -1 } }
-    ]
-    clicks_cursor = db.whatsapp_clicks.aggregate(pipeline)
-    clicks = await clicks_cursor.to_list(1000)
-    return clicks
+async def get_whatsapp_clicks_analytics(days: Optional[int] = Query(None, ge=1, le=3650)):
+    # Daily buckets: cost follows the number of clicked products, not the click history
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    return await click_analytics.top_products(db, since=since, limit=1000)
+
+@api_router.get("/analytics/whatsapp-clicks/top", dependencies=[Depends(admin_or_higher_required)])
+async def get_top_whatsapp_clicked_products(
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(10, ge=1, le=100),
+):
+    since = datetime.utcnow() - timedelta(days=days)
+    return await click_analytics.top_products(db, since=since, limit=limit)
+
+@api_router.get("/analytics/whatsapp-clicks/sellers/{seller_id}/trend", dependencies=[Depends(seller_self_or_admin_required)])
+async def get_seller_whatsapp_clicks_trend(
+    seller_id: str,
+    days: int = Query(30, ge=1, le=365),
+    granularity: Literal["hour", "day"] = "day",
+):
+    if granularity == "hour" and days > click_analytics.HOURLY_TTL_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Hourly buckets are kept {click_analytics.HOURLY_TTL_DAYS} days.",
+        )
+    since = datetime.utcnow() - timedelta(days=days)
+    series = await click_analytics.seller_trend(db, seller_id, since, granularity=granularity)
+    return {
+        "sellerId": seller_id,
+        "granularity": granularity,
+        "totalClicks": sum(point["clicks"] for point in series),
+        "series": series,
+    }
+
+# Rollups of the product event log (views, favourites, ratings, clicks)
+@api_router.get("/analytics/sellers/{seller_id}/events", dependencies=[Depends(seller_self_or_admin_required)])
+async def get_seller_event_rollup(
+    seller_id: str,
+    days: int = Query(30, ge=1, le=365),
+    unit: Literal["hour", "day"] = "day",
+):
+    if unit == "hour" and days > 31:
+        raise HTTPException(status_code=400, detail="Hourly rollups are limited to 31 days.")
+    since = datetime.utcnow() - timedelta(days=days)
+    rollup, top_viewed = await asyncio.gather(
+        event_store.seller_rollup(db, seller_id, since, unit=unit),
+        event_store.top_products(db, "view", since, limit=5, seller_id=seller_id),
+    )
+    return {"sellerId": seller_id, "unit": unit, **rollup, "topViewed": top_viewed}
+
+@api_router.get("/analytics/products/{product_id}/events", dependencies=[Depends(product_owner_or_moderator_required)])
+async def get_product_event_rollup(
+    product_id: str,
+    days: int = Query(30, ge=1, le=365),
+    unit: Literal["hour", "day"] = "day",
+):
+    if unit == "hour" and days > 31:
+        raise HTTPException(status_code=400, detail="Hourly rollups are limited to 31 days.")
+    since = datetime.utcnow() - timedelta(days=days)
+    rollup = await event_store.product_rollup(db, product_id, since, unit=unit)
+    return {"productId": product_id, "unit": unit, **rollup}
+
+@api_router.get("/analytics/events/top", dependencies=[Depends(admin_or_higher_required)])
+async def get_top_products_by_event(
+    type: Literal["view", "favourite", "rate", "click"] = "view",
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(10, ge=1, le=100),
+):
+    since = datetime.utcnow() - timedelta(days=days)
+    return await event_store.top_products(db, type, since, limit=limit)
 
 @api_router.post("/auth/forgot-password", status_code=status.HTTP_200_OK)
 async def forgot_password(request: ForgotPasswordRequest, background_tasks: BackgroundTasks):
@@ -776,7 +975,7 @@ async def forgot_password(request: ForgotPasswordRequest, background_tasks: Back
         },
         subtype="html"
     )
-    background_tasks.add_task(fm.send_message, message, template_name="reset_password.html")
+    background_tasks.add_task(send_email, message, template_name="reset_password.html")
 
     return {"message": "If an account exists with this email, a password reset link has been sent."}
 
@@ -815,48 +1014,90 @@ class MessageCreate(BaseModel):
     message: str
     product_id: Optional[str] = None # Needed to create a new conversation
 
+async def notify_new_message(new_message: Message, sender: Optional[dict], receiver: Optional[dict]):
+    """In-app notification and email for the receiver of a message (runs after the response)."""
+    sender = sender or {}
+    sender_name = sender.get('name') if new_message.sender_type == 'buyer' else sender.get('businessName')
+    conversation_id = new_message.conversation_id
+    notif_link = f"/seller/dashboard/messages/{conversation_id}" if new_message.receiver_type == 'seller' else f"/profile/messages"
+
+    new_notification = Notification(
+        recipient_id=new_message.receiver_id,
+        recipient_type=new_message.receiver_type,
+        type='new_message',
+        title=f"Nouveau message de {sender_name or 'Nengoo'}",
+        message=new_message.message[:50] + "..." if len(new_message.message) > 50 else new_message.message,
+        link=notif_link,
+        group_key=conversation_id
+    )
+    # Successive messages of a conversation share one unread notification
+    if await notification_retention.push_grouped_notification(db, new_notification.dict(), conversation_id):
+        await unread_counters.increment(db, new_message.receiver_id, new_message.receiver_type, "notifications")
+
+    # Send email notification to seller
+    if new_message.receiver_type == 'seller' and receiver and receiver.get("email") and sender:
+        email_message = MessageSchema(
+            subject=f"Nouveau message de {sender_name} sur Nengoo",
+            recipients=[receiver["email"]],
+            template_body={
+                "seller_name": receiver.get("businessName"),
+                "buyer_name": sender_name,
+                "message_content": new_message.message,
+                "conversation_url": f"https://www.nengoo.com/seller/dashboard/messages/{conversation_id}"
+            },
+            subtype="html"
+        )
+        await send_email(email_message, template_name="new_message_seller.html")
+
 @api_router.post("/messages", response_model=Message)
 async def create_message(message_data: MessageCreate, background_tasks: BackgroundTasks, sender_id: str = Header(...), sender_type: str = Header(...)):
     if sender_type not in ['buyer', 'seller']:
         raise HTTPException(status_code=400, detail="Invalid sender_type")
 
     receiver_type = 'seller' if sender_type == 'buyer' else 'buyer'
-    
-    # Find conversation or create new one
-    conversation = await db.conversations.find_one({
-        "$or": [
-            {"buyer_id": sender_id, "seller_id": message_data.receiver_id, "product_id": message_data.product_id},
-            {"buyer_id": message_data.receiver_id, "seller_id": sender_id, "product_id": message_data.product_id}
-        ]
-    })
+    now = datetime.utcnow()
+
+    # Only a buyer writing from a product page may open a new conversation
+    can_create = sender_type == 'buyer' and bool(message_data.product_id)
+    conversation_query = {
+        f"{sender_type}_id": sender_id,
+        f"{receiver_type}_id": message_data.receiver_id,
+        "product_id": message_data.product_id
+    }
+    conversation_update = {
+        "$set": {
+            "last_message_timestamp": now,
+            "last_message_preview": message_data.message,
+            f"{receiver_type}_unread": True
+        },
+        "$inc": {f"{receiver_type}_unread_count": 1}
+    }
+    if can_create:
+        conversation_update["$setOnInsert"] = {
+            "id": f"conv_{str(uuid.uuid4())[:8]}",
+            f"{sender_type}_unread": False,
+            f"{sender_type}_unread_count": 0
+        }
 
-    if not conversation:
-        if sender_type == 'buyer' and message_data.product_id:
-            conversation_id = f"conv_{str(uuid.uuid4())[:8]}"
-            new_conv = Conversation(
-                id=conversation_id,
-                buyer_id=sender_id,
-                seller_id=message_data.receiver_id,
-                product_id=message_data.product_id,
-                last_message_preview=message_data.message,
-                seller_unread=True
+    async def upsert_conversation():
+        try:
+            return await db.conversations.find_one_and_update(
+                conversation_query, conversation_update, upsert=can_create, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # A concurrent first message created it (unique conversation_key): update that one
+            return await db.conversations.find_one_and_update(
+                conversation_query, conversation_update, return_document=ReturnDocument.AFTER
             )
-            await db.conversations.insert_one(new_conv.dict())
-            conversation = new_conv.dict()
-        else:
-            raise HTTPException(status_code=400, detail="Conversation does not exist. A buyer must initiate a conversation from a product page.")
-    else:
-        # Update conversation
-        update_data = {
-            "last_message_timestamp": datetime.utcnow(),
-            "last_message_preview": message_data.message
-        }
-        if sender_type == 'buyer':
-            update_data['seller_unread'] = True
-        else:
-            update_data['buyer_unread'] = True
-        await db.conversations.update_one({"id": conversation["id"]}, {"$set": update_data})
 
+    # Profiles and conversation upsert in a single concurrent round-trip
+    sender, receiver, conversation = await asyncio.gather(
+        profiles.get(db, sender_type, sender_id),
+        profiles.get(db, receiver_type, message_data.receiver_id),
+        upsert_conversation(),
+    )
+    if not conversation:
+        raise HTTPException(status_code=400, detail="Conversation does not exist. A buyer must initiate a conversation from a product page.")
 
     new_message = Message(
         conversation_id=conversation["id"],
@@ -864,42 +1105,15 @@ async def create_message(message_data: MessageCreate, background_tasks: Backgrou
         receiver_id=message_data.receiver_id,
         sender_type=sender_type,
         receiver_type=receiver_type,
-        message=message_data.message
+        message=message_data.message,
+        timestamp=now
     )
-    await db.messages.insert_one(new_message.dict())
-
-    # Create in-app notification for receiver
-    notif_title = f"Nouveau message de {buyer.get('name')}" if sender_type == 'buyer' else f"Nouveau message de {seller.get('businessName')}"
-    notif_link = f"/seller/dashboard/messages/{conversation['id']}" if receiver_type == 'seller' else f"/profile/messages"
-    
-    new_notification = Notification(
-        recipient_id=message_data.receiver_id,
-        recipient_type=receiver_type,
-        type='new_message',
-        title=notif_title,
-        message=message_data.message[:50] + "..." if len(message_data.message) > 50 else message_data.message,
-        link=notif_link
+    await asyncio.gather(
+        db.messages.insert_one(new_message.dict()),
+        unread_counters.increment(db, message_data.receiver_id, receiver_type, "messages")
     )
-    await db.notifications.insert_one(new_notification.dict())
-
-    # Send email notification to seller
-    if receiver_type == 'seller':
-        seller = await db.sellers.find_one({"id": message_data.receiver_id})
-        buyer = await db.users.find_one({"id": sender_id})
-        if seller and seller.get("email") and buyer:
-            email_message = MessageSchema(
-                subject=f"Nouveau message de {buyer.get('name')} sur Nengoo",
-                recipients=[seller["email"]],
-                template_body={
-                    "seller_name": seller["businessName"],
-                    "buyer_name": buyer.get('name'),
-                    "message_content": new_message.message,
-                    "conversation_url": f"https://www.nengoo.com/seller/dashboard/messages/{conversation['id']}"
-                },
-                subtype="html"
-            )
-            background_tasks.add_task(fm.send_message, email_message, template_name="new_message_seller.html")
 
+    background_tasks.add_task(notify_new_message, new_message, sender, receiver)
     return new_message
 
 @api_router.get("/conversations", response_model=List[Conversation])
@@ -908,19 +1122,114 @@ async def get_conversations(user_id: str = Header(...), user_type: str = Header(
         raise HTTPException(status_code=400, detail="Invalid user_type")
         
     query_field = f"{user_type}_id"
-    conversations_cursor = db.conversations.find({query_field: user_id}).sort("last_message_timestamp", -1)
+    conversations_cursor = db.conversations.find(
+        {query_field: user_id}, fast_json.projection(Conversation)
+    ).sort("last_message_timestamp", -1)
     conversations = await conversations_cursor.to_list(1000)
-    return [Conversation(**c) for c in conversations]
+    return fast_json.documents_response([fast_json.fill_defaults(Conversation, c) for c in conversations])
+
+def encode_message_cursor(message: dict) -> str:
+    """
+    Encodes the (timestamp, id) position of a message into an opaque cursor.
+    """
+    raw = f"{message['timestamp'].isoformat()}|{message['id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_message_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, message_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), message_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid message cursor")
 
 @api_router.get("/conversations/{conversation_id}/messages", response_model=List[Message])
-async def get_messages(conversation_id: str):
-    messages_cursor = db.messages.find({"conversation_id": conversation_id}).sort("timestamp", 1)
-    messages = await messages_cursor.to_list(1000)
+async def get_messages(
+    conversation_id: str,
+    response: Response,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    since: Optional[datetime] = None,
+    latest: bool = False,
+    limit: int = Query(1000, ge=1, le=1000)
+):
+    """
+    Returns messages of a conversation in chronological order.
+    - `before`: cursor, older page (scrolling up the history)
+    - `after`: cursor, newer page
+    - `since`: timestamp, only messages received after it (incremental sync)
+    - `latest`: the latest `limit` messages instead of the oldest ones
+    Without parameters, the oldest `limit` messages are returned, as before.
+    The cursors of the first and last returned message are exposed in the
+    X-Prev-Cursor / X-Next-Cursor headers.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+
+    query = {"conversation_id": conversation_id}
+    newest_first = latest
+    if before:
+        ts, message_id = decode_message_cursor(before)
+        query["$or"] = [
+            {"timestamp": {"$lt": ts}},
+            {"timestamp": ts, "id": {"$lt": message_id}}
+        ]
+        newest_first = True
+    elif after:
+        ts, message_id = decode_message_cursor(after)
+        query["$or"] = [
+            {"timestamp": {"$gt": ts}},
+            {"timestamp": ts, "id": {"$gt": message_id}}
+        ]
+        newest_first = False
+    elif since:
+        query["timestamp"] = {"$gt": since}
+        newest_first = False
+
+    direction = DESCENDING if newest_first else ASCENDING
+    messages_cursor = db.messages.find(query).sort([("timestamp", direction), ("id", direction)]).limit(limit)
+    messages = await messages_cursor.to_list(limit)
+    if newest_first:
+        messages.reverse()
+
+    if messages:
+        response.headers["X-Prev-Cursor"] = encode_message_cursor(messages[0])
+        response.headers["X-Next-Cursor"] = encode_message_cursor(messages[-1])
     return [Message(**m) for m in messages]
 
-@api_router.put("/messages/{message_id}/read", status_code=status.HTTP_204_NO_CONTENT)
+@api_router.put("/conversations/{conversation_id}/read")
+async def mark_conversation_as_read(conversation_id: str, user_id: str = Header(...), user_type: str = Header(...)):
+    """Marks every message received by the user in this conversation as read."""
+    if user_type not in ['buyer', 'seller']:
+        raise HTTPException(status_code=400, detail="Invalid user_type")
+
+    conversation = await db.conversations.find_one_and_update(
+        {"id": conversation_id, f"{user_type}_id": user_id},
+        {"$set": {f"{user_type}_unread": False, f"{user_type}_unread_count": 0}}
+    )
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    result = await db.messages.update_many(
+        {"conversation_id": conversation_id, "receiver_id": user_id, "read_status": False},
+        {"$set": {"read_status": True}}
+    )
+    await unread_counters.decrement(db, user_id, user_type, "messages", result.modified_count)
+    return {"updated": result.modified_count}
+
+@api_router.put("/messages/{message_id}/read", status_code=status.HTTP_204_NO_CONTENT, deprecated=True)
 async def mark_message_as_read(message_id: str):
-    await db.messages.update_one({"id": message_id}, {"$set": {"read_status": True}})
+    # Kept for older app builds, use PUT /conversations/{conversation_id}/read instead.
+    message = await db.messages.find_one_and_update(
+        {"id": message_id, "read_status": False},
+        {"$set": {"read_status": True}}
+    )
+    if message:
+        await unread_counters.decrement(db, message["receiver_id"], message["receiver_type"], "messages")
+        await db.conversations.update_one(
+            {"id": message["conversation_id"]},
+            [{"$set": {f"{message['receiver_type']}_unread_count": {"$max": [0, {"$subtract": [{"$ifNull": [f"${message['receiver_type']}_unread_count", 0]}, 1]}]}}}]
+        )
     return
 
 # --- Notification Endpoints ---
@@ -936,10 +1245,10 @@ async def get_notifications(
     notifications_cursor = db.notifications.find({
         "recipient_id": user_id,
         "recipient_type": user_type
-    }).sort("created_at", -1)
+    }, fast_json.projection(Notification)).sort("created_at", -1).limit(100)
     
     notifications = await notifications_cursor.to_list(100) # Limit to last 100 notifications
-    return [Notification(**n) for n in notifications]
+    return fast_json.documents_response([fast_json.fill_defaults(Notification, n) for n in notifications])
 
 @api_router.get("/notifications/unread-count")
 async def get_unread_notifications_count(
@@ -949,24 +1258,22 @@ async def get_unread_notifications_count(
     if user_type not in ['buyer', 'seller']:
         raise HTTPException(status_code=400, detail="Invalid user_type")
         
-    count = await db.notifications.count_documents({
-        "recipient_id": user_id,
-        "recipient_type": user_type,
-        "read": False
-    })
-    return {"count": count}
+    counts = await unread_counters.get_counts(db, user_id, user_type)
+    return {"count": counts["notifications"], "messages": counts["messages"]}
 
 @api_router.put("/notifications/{notification_id}/read", status_code=status.HTTP_204_NO_CONTENT)
 async def mark_notification_as_read(
     notification_id: str,
     user_id: str = Header(..., alias="X-User-Id")
 ):
-    result = await db.notifications.update_one(
+    notification = await db.notifications.find_one_and_update(
         {"id": notification_id, "recipient_id": user_id},
         {"$set": {"read": True}}
     )
-    if result.matched_count == 0:
+    if not notification:
          raise HTTPException(status_code=404, detail="Notification not found or not authorized")
+    if not notification.get("read"):
+        await unread_counters.decrement(db, user_id, notification["recipient_type"], "notifications")
     return
 
 @api_router.put("/notifications/read-all", status_code=status.HTTP_204_NO_CONTENT)
@@ -974,10 +1281,11 @@ async def mark_all_notifications_as_read(
     user_id: str = Header(..., alias="X-User-Id"),
     user_type: str = Header(..., alias="X-User-Type")
 ):
-    await db.notifications.update_many(
+    result = await db.notifications.update_many(
         {"recipient_id": user_id, "recipient_type": user_type, "read": False},
         {"$set": {"read": True}}
     )
+    await unread_counters.decrement(db, user_id, user_type, "notifications", result.modified_count)
     return
 
 @api_router.delete("/notifications/{notification_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -985,9 +1293,11 @@ async def delete_notification(
     notification_id: str,
     user_id: str = Header(..., alias="X-User-Id")
 ):
-    result = await db.notifications.delete_one({"id": notification_id, "recipient_id": user_id})
-    if result.deleted_count == 0:
+    notification = await db.notifications.find_one_and_delete({"id": notification_id, "recipient_id": user_id})
+    if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
+    if not notification.get("read"):
+        await unread_counters.decrement(db, user_id, notification["recipient_type"], "notifications")
     return
 
 # --- Slug Utility ---
@@ -1019,35 +1329,24 @@ async def generate_presigned_url(request: PresignedUrlRequest):
     Requires AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, and S3_BUCKET_NAME
     to be configured in the environment.
     """
-    aws_access_key_id = os.environ.get("AWS_ACCESS_KEY_ID")
-    aws_secret_access_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
-    aws_region = os.environ.get("AWS_REGION")
-    bucket_name = os.environ.get("S3_BUCKET_NAME")
-
-    if not all([aws_access_key_id, aws_secret_access_key, aws_region, bucket_name]):
-        raise HTTPException(status_code=500, detail="AWS S3 environment variables not configured.")
-
-    s3_client = boto3.client(
-        "s3",
-        aws_access_key_id=aws_access_key_id,
-        aws_secret_access_key=aws_secret_access_key,
-        region_name=aws_region,
-        config=boto3.session.Config(signature_version='s3v4')
-    )
-    
-    # Generate a unique object name
-    object_name = f"uploads/{uuid.uuid4()}-{request.fileName}"
+    urls = await presign_or_raise([(request.fileName, request.fileType)])
+    return PresignedUrlResponse(**urls[0])
+
+@api_router.post("/generate-presigned-urls", response_model=List[PresignedUploadResponse], dependencies=[Depends(seller_id_or_support_required)])
+async def generate_presigned_urls(request: PresignedUrlBatchRequest):
+    """
+    Pre-signed uploads for several files in one call (e.g. all the photos of a product).
+    method="post" returns form POST policies, where S3 checks the Content-Type and maxSize.
+    """
+    files = [(file.fileName, file.fileType) for file in request.files]
+    return await presign_or_raise(files, request.method, request.maxSize)
 
+async def presign_or_raise(files, method: str = "put", max_size: Optional[int] = None) -> List[dict]:
     try:
-        response = s3_client.generate_presigned_url(
-            'put_object',
-            Params={'Bucket': bucket_name, 'Key': object_name, 'ContentType': request.fileType},
-            ExpiresIn=3600  # URL expires in 1 hour
-        )
-        public_url = f"https://{bucket_name}.s3.{aws_region}.amazonaws.com/{object_name}"
-        
-        return PresignedUrlResponse(uploadUrl=response, publicUrl=public_url)
-    except ClientError as e:
+        return await s3_storage.presign_many(files, method, max_size)
+    except s3_storage.S3NotConfigured as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:  # botocore ClientError / BotoCoreError
         logging.error(e)
         raise HTTPException(status_code=500, detail="Could not generate pre-signed URL.")
 
@@ -1161,9 +1460,9 @@ async def buyer_login(login_data: BuyerLoginRequest):
 
 @api_router.get("/buyers", response_model=List[Buyer], dependencies=[Depends(super_admin_required)])
 async def list_buyers():
-    buyers_cursor = db.users.find({"type": "buyer"})
+    buyers_cursor = db.users.find({"type": "buyer"}, fast_json.projection(Buyer))
     buyers = await buyers_cursor.to_list(1000)
-    return [Buyer(**b) for b in buyers]
+    return fast_json.documents_response([fast_json.fill_defaults(Buyer, b) for b in buyers])
 
 @api_router.delete("/buyers", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(super_admin_required)])
 async def bulk_delete_buyers(request: BulkDeleteRequest):
@@ -1171,6 +1470,7 @@ async def bulk_delete_buyers(request: BulkDeleteRequest):
         raise HTTPException(status_code=400, detail="No buyer IDs provided for deletion.")
     
     await db.users.delete_many({"id": {"$in": request.ids}, "type": "buyer"})
+    profiles.invalidate_many("buyer", request.ids)
     return
 
 @api_router.put("/buyers/{buyer_id}", response_model=Buyer, dependencies=[Depends(admin_or_higher_required)])
@@ -1183,6 +1483,7 @@ async def update_buyer(buyer_id: str, buyer_data: BuyerUpdate):
         update_data["password"] = hash_password(update_data["password"])
     
     await db.users.update_one({"id": buyer_id, "type": "buyer"}, {"$set": update_data})
+    profiles.invalidate("buyer", buyer_id)
     updated_buyer = await db.users.find_one({"id": buyer_id, "type": "buyer"})
     if not updated_buyer:
         raise HTTPException(status_code=404, detail="Buyer not found")
@@ -1196,37 +1497,101 @@ async def root():
 
 # --- Product Management ---
 @api_router.get("/products", response_model=List[Product])
-async def get_products(search: Optional[str] = None, seller_id: Optional[str] = None):
-    query = {}
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-        ]
-    if seller_id:
-        query["sellerId"] = seller_id
-        
-    products = await db.products.find(query).to_list(1000)
-    return [Product(**p) for p in products]
+async def get_products(
+    search: Optional[str] = None,
+    seller_id: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    in_stock: Optional[bool] = None,
+):
+    query = catalog_facets.build_query(
+        search, category=category, seller_id=seller_id, min_price=min_price,
+        max_price=max_price, min_rating=min_rating, in_stock=in_stock,
+    )
+    products = await db.products.find(query, fast_json.projection(Product)).to_list(1000)
+    return fast_json.documents_response([fast_json.fill_defaults(Product, p) for p in products])
+
+@api_router.get("/products/facets")
+async def get_product_facets(
+    search: Optional[str] = None,
+    seller_id: Optional[str] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    in_stock: Optional[bool] = None,
+):
+    """Counts per category, seller, price bucket, rating bucket and stock state for the same filters as /products."""
+    return await catalog_facets.get_facets(
+        db, search, category=category, seller_id=seller_id, min_price=min_price,
+        max_price=max_price, min_rating=min_rating, in_stock=in_stock,
+    )
+
+@api_router.get("/products/trending", response_model=List[Product])
+async def get_trending_products(category: Optional[str] = None, limit: int = Query(12, ge=1, le=trending.MAX_PER_CATEGORY)):
+    # Ranking held in memory by trending.py (refreshed every TRENDING_REFRESH_SECONDS)
+    ranked_ids = trending.board.top(category, limit)
+    if not ranked_ids:
+        return []
+    found = await db.products.find({"id": {"$in": ranked_ids}}).to_list(len(ranked_ids))
+    by_id = {p["id"]: p for p in found}
+    return [Product(**by_id[i]) for i in ranked_ids if i in by_id]
 
 class MaxPriceResponse(BaseModel):
     maxPrice: float
 
 @api_router.get("/products/max-price", response_model=MaxPriceResponse)
-async def get_max_product_price():
-    # Use find().sort().limit(1) for a more robust way to get the product with the max price
-    product_cursor = db.products.find().sort("price", -1).limit(1)
-    products_list = await product_cursor.to_list(1)
-    
-    logger.info(f"💰 [Backend Debug] products_list from db.products.find(): {products_list}")
+async def get_max_product_price(category: Optional[str] = None):
+    # Served from memory (catalog_stats.py), no query
+    return MaxPriceResponse(maxPrice=catalog_stats.stats.get(category)["maxPrice"] or 0.0)
+
+class CatalogStatsResponse(BaseModel):
+    count: int
+    inStock: int
+    minPrice: Optional[float] = None
+    maxPrice: Optional[float] = None
+
+@api_router.get("/products/stats", response_model=CatalogStatsResponse)
+async def get_catalog_stats(category: Optional[str] = None):
+    return CatalogStatsResponse(**catalog_stats.stats.get(category))
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process answers (no dependency checked)."""
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: startup done, not draining, and MongoDB answers."""
+    mongo_ok = not lifecycle.state.draining and await db_pool.ping(client)
+    ready = lifecycle.state.ready and mongo_ok
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else ("draining" if lifecycle.state.draining else "not_ready"),
+            "mongo": mongo_ok,
+            "in_flight": lifecycle.state.in_flight,
+            "pool": db_pool.pool_stats(mongo_options["maxPoolSize"]),
+        },
+    )
 
-    if products_list:
-        product = products_list[0]
-        logger.info(f"💰 [Backend] Found product with max price: {product['price']}")
-        return MaxPriceResponse(maxPrice=product["price"])
-    
-    logger.info("💰 [Backend] No products found, returning max price 0.0")
-    return MaxPriceResponse(maxPrice=0.0)
+async def metrics_access_required(
+    authorization: Optional[str] = Header(None),
+    role: str = Depends(get_current_admin_role),
+):
+    """Scrapers send `Authorization: Bearer $METRICS_TOKEN`; without a token configured, admins only."""
+    token = os.getenv("METRICS_TOKEN")
+    if token:
+        if not authorization or not hmac.compare_digest(authorization, f"Bearer {token}"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    elif role not in ["super_admin", "admin"]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required for metrics")
+
+@app.get("/metrics", response_class=Response, include_in_schema=False, dependencies=[Depends(metrics_access_required)])
+async def metrics():
+    return Response(content=query_profiler.render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/sitemap.xml", response_class=Response)
 async def generate_sitemap():
@@ -1369,8 +1734,8 @@ async def get_product_og_tags(product_id: str):
     # Frontend URL for redirection
     frontend_url = os.getenv("FRONTEND_URL", "https://www.nengoo.com")
     
-    # Construct absolute image URL
-    images = product.get("images", [])
+    # Construct absolute image URL (1200x630 rendering from image_pipeline.py when available)
+    images = [product["ogImage"]] if product.get("ogImage") else product.get("images", [])
     # Check if images list exists, is not empty, and first element is valid
     # Also check that the image URL is not just whitespace
     if images and len(images) > 0 and images[0] and isinstance(images[0], str) and images[0].strip():
@@ -1521,7 +1886,7 @@ async def create_product(product_data: ProductCreate,
     seller_name_to_use = None
 
     if current_seller_id:
-        seller = await db.sellers.find_one({"id": current_seller_id})
+        seller = await profiles.get(db, "seller", current_seller_id)
         if not seller:
             raise HTTPException(status_code=404, detail="Seller not found.")
         seller_id_to_use = current_seller_id
@@ -1530,10 +1895,10 @@ async def create_product(product_data: ProductCreate,
         if not product_data.sellerId or not product_data.sellerName:
             raise HTTPException(status_code=400, detail="Seller ID and Name must be provided in product data when created by an admin role.")
         
-        seller = await db.sellers.find_one({"id": product_data.sellerId})
+        seller = await profiles.get(db, "seller", product_data.sellerId)
         if not seller:
             # Check if it is an admin acting as a seller
-            admin = await db.admins.find_one({"id": product_data.sellerId})
+            admin = await profiles.get(db, "admin", product_data.sellerId)
             if not admin:
                 raise HTTPException(status_code=404, detail=f"Seller with ID {product_data.sellerId} not found.")
 
@@ -1558,7 +1923,9 @@ async def create_product(product_data: ProductCreate,
     product = Product(**product_dict)
     product.sellerId = seller_id_to_use
     product.sellerName = seller_name_to_use
-    await db.products.insert_one(product.dict())
+    await db.products.insert_one({**product.dict(), "imageVariantsPending": bool(product.images)})
+    catalog_facets.facet_cache.clear()
+    await catalog_stats.record_change(db, None, product.dict())
     return product
 
 @api_router.put("/products/{product_id}", response_model=Product, dependencies=[Depends(product_owner_or_moderator_required)])
@@ -1586,11 +1953,21 @@ async def update_product(product_id: str, product_data: ProductUpdate):
             
             # Also update slug if name changes
             update_data["slug"] = await get_unique_slug(update_data["name"])
-    
-    await db.products.update_one({"id": product_id}, {"$set": update_data})
+
+    if "images" in update_data:
+        update_data["imageVariantsPending"] = True
+        update_data["imageVariantsAttempts"] = 0  # new images: image_pipeline.py retries from scratch
+        update_data["imageVariantsRetryAt"] = None
+
+    before = await db.products.find_one_and_update(
+        {"id": product_id}, {"$set": update_data}, projection=catalog_stats.PROJECTION
+    )
+    catalog_facets.facet_cache.clear()
     updated_product = await db.products.find_one({"id": product_id})
     if not updated_product:
         raise HTTPException(status_code=404, detail="Product not found")
+    if before and update_data.keys() & {"category", "price", "stock"}:
+        await catalog_stats.record_change(db, before, updated_product)
     return Product(**updated_product)
 
 @api_router.delete("/products", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(seller_or_moderator_or_higher_required)])
@@ -1606,7 +1983,10 @@ async def bulk_delete_products(request: BulkDeleteRequest,
     if current_seller_id and admin_role not in ["super_admin", "admin", "moderator"]:
         query["sellerId"] = current_seller_id
 
+    deleted = await db.products.find(query, catalog_stats.PROJECTION).to_list(None)
     result = await db.products.delete_many(query)
+    catalog_facets.facet_cache.clear()
+    await catalog_stats.record_changes(db, [(product, None) for product in deleted])
     
     # Even if some products were not found or did not belong to the seller,
     # we return a success response, as the desired state (deletion of authorized products) is achieved.
@@ -1615,9 +1995,11 @@ async def bulk_delete_products(request: BulkDeleteRequest,
 
 @api_router.delete("/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(seller_or_moderator_or_higher_required)])
 async def delete_product(product_id: str):
-    result = await db.products.delete_one({"id": product_id})
-    if result.deleted_count == 0:
+    deleted = await db.products.find_one_and_delete({"id": product_id}, projection=catalog_stats.PROJECTION)
+    catalog_facets.facet_cache.clear()
+    if not deleted:
         raise HTTPException(status_code=404, detail="Product not found")
+    await catalog_stats.record_change(db, deleted, None)
     return
 
 @api_router.get("/products/{product_id}/reviews", response_model=List[Review])
@@ -1685,6 +2067,23 @@ class CanReviewResponse(BaseModel):
     canReview: bool
     hasAlreadyReviewed: bool
 
+@api_router.get("/products/{product_id}/related", response_model=List[Product])
+async def get_related_products(product_id: str, limit: int = Query(10, ge=1, le=recommender.TOP_K)):
+    """Neighbours precomputed by recommender.py; same category best sellers until the product has some."""
+    related_ids = (await recommender.related_ids(db, product_id))[:limit * 2]  # room for unavailable ones
+    if related_ids:
+        found = await db.products.find({"id": {"$in": related_ids}, "status": "approved"}).to_list(len(related_ids))
+        by_id = {p["id"]: p for p in found}
+        products = [by_id[i] for i in related_ids if i in by_id][:limit]
+    else:
+        product = await db.products.find_one({"id": product_id}, {"_id": 0, "category": 1})
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        products = await db.products.find(
+            {"category": product["category"], "status": "approved", "id": {"$ne": product_id}}
+        ).sort("sold", -1).limit(limit).to_list(limit)
+    return [Product(**p) for p in products]
+
 @api_router.get("/products/{product_id}/can-review", response_model=CanReviewResponse)
 async def can_user_review_product(
     product_id: str,
@@ -1770,6 +2169,11 @@ async def create_product_interaction(
             {"$inc": {"views": 1}}
         )
 
+    await event_store.record(db, [event_store.product_event(
+        interaction_data.interaction, product_id, product.get("sellerId"), interaction.timestamp,
+        userId=user_id, isFavourite=interaction_data.isFavourite, rating=interaction_data.rating,
+    )])
+
     return {
         "status": "OK",
         "statusCode": 200,
@@ -1937,20 +2341,9 @@ async def create_seller(seller_data: SellerCreate, role: Optional[str] = Depends
 
 @api_router.get("/sellers", response_model=List[Seller])
 async def list_sellers():
-    sellers_cursor = db.sellers.find()
+    sellers_cursor = db.sellers.find({}, fast_json.projection(Seller))
     sellers = await sellers_cursor.to_list(1000)
-    valid_sellers = []
-    for s in sellers:
-        try:
-            # Migrate legacy seller data
-            s = migrate_seller_data(s)
-            # The Seller model now includes password as optional, so this should be safe.
-            # We add this try-except block for added robustness against corrupted data.
-            valid_sellers.append(Seller(**s))
-        except Exception as e:
-            # Log the error and the problematic data
-            print(f"Skipping invalid seller data: {s}, error: {e}")
-    return valid_sellers
+    return fast_json.documents_response(fast_json.valid_documents(Seller, sellers))
 
 @api_router.get("/sellers/{seller_id}", response_model=Seller)
 async def get_seller(seller_id: str):
@@ -1958,8 +2351,6 @@ async def get_seller(seller_id: str):
     if not seller:
         raise HTTPException(status_code=404, detail="Seller not found")
 
-    # Migrate legacy seller data
-    seller = migrate_seller_data(seller)
 
     return Seller(**seller)
 
@@ -1997,8 +2388,6 @@ async def seller_login(login_data: SellerLoginRequest):
         logging.warning(f"[SELLER LOGIN] Seller {login_data.whatsapp} not approved: {seller['status']}")
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Votre compte vendeur est en attente d'approbation")
 
-    # Migrate legacy seller data
-    seller = migrate_seller_data(seller)
 
     logging.info(f"[SELLER LOGIN] Login successful for {login_data.whatsapp}")
     return Seller(**seller)
@@ -2012,7 +2401,8 @@ async def seller_oauth_login(oauth_data: SellerOAuthLoginRequest):
     from firebase_admin_config import verify_firebase_token, is_firebase_initialized
 
     # Check if Firebase is initialized
-    if not is_firebase_initialized():
+    # The first call initializes the SDK (lock held for the whole init): off the event loop
+    if not await asyncio.to_thread(is_firebase_initialized):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="OAuth authentication is not available. Please contact support."
@@ -2020,7 +2410,7 @@ async def seller_oauth_login(oauth_data: SellerOAuthLoginRequest):
 
     try:
         # Verify Firebase token
-        decoded_token = verify_firebase_token(oauth_data.idToken)
+        decoded_token = await asyncio.to_thread(verify_firebase_token, oauth_data.idToken)
 
         # Extract user information from token
         firebase_uid = decoded_token.get('uid')
@@ -2050,8 +2440,6 @@ async def seller_oauth_login(oauth_data: SellerOAuthLoginRequest):
                 {"$set": {"last_login": datetime.utcnow()}}
             )
             seller['last_login'] = datetime.utcnow()
-            # Migrate legacy seller data
-            seller = migrate_seller_data(seller)
             return Seller(**seller)
 
         # Check if seller exists by email
@@ -2079,8 +2467,6 @@ async def seller_oauth_login(oauth_data: SellerOAuthLoginRequest):
             seller['oauth_provider'] = provider_id
             seller['oauth_uid'] = firebase_uid
             seller['last_login'] = datetime.utcnow()
-            # Migrate legacy seller data
-            seller = migrate_seller_data(seller)
             return Seller(**seller)
 
         # No seller found - sellers cannot auto-register via OAuth
@@ -2101,11 +2487,10 @@ async def seller_oauth_login(oauth_data: SellerOAuthLoginRequest):
 @api_router.put("/sellers/{seller_id}/approve", response_model=Seller, dependencies=[Depends(moderator_or_higher_required)])
 async def approve_seller(seller_id: str):
     await db.sellers.update_one({"id": seller_id}, {"$set": {"status": "approved"}})
+    profiles.invalidate("seller", seller_id)
     updated_seller = await db.sellers.find_one({"id": seller_id})
     if not updated_seller:
         raise HTTPException(status_code=404, detail="Seller not found")
-    # Migrate legacy seller data
-    updated_seller = migrate_seller_data(updated_seller)
     return Seller(**updated_seller)
 
 @api_router.put("/sellers/{seller_id}", response_model=Seller)
@@ -2132,11 +2517,10 @@ async def update_seller(
         update_data["password"] = hash_password(update_data["password"])
     
     await db.sellers.update_one({"id": seller_id}, {"$set": update_data})
+    profiles.invalidate("seller", seller_id)
     updated_seller = await db.sellers.find_one({"id": seller_id})
     if not updated_seller:
         raise HTTPException(status_code=404, detail="Seller not found")
-    # Migrate legacy seller data
-    updated_seller = migrate_seller_data(updated_seller)
     return Seller(**updated_seller)
 
 @api_router.delete("/sellers", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(admin_or_higher_required)])
@@ -2145,11 +2529,13 @@ async def bulk_delete_sellers(request: BulkDeleteRequest):
         raise HTTPException(status_code=400, detail="No seller IDs provided for deletion.")
     
     await db.sellers.delete_many({"id": {"$in": request.ids}})
+    profiles.invalidate_many("seller", request.ids)
     return
 
 @api_router.delete("/sellers/{seller_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(admin_or_higher_required)])
 async def delete_seller(seller_id: str):
     result = await db.sellers.delete_one({"id": seller_id})
+    profiles.invalidate("seller", seller_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Seller not found")
     return
@@ -2221,21 +2607,27 @@ async def list_orders(seller_id: Optional[str] = None, buyer_id: Optional[str] =
             detail="You do not have permission to access orders."
         )
 
-    orders_cursor = db.orders.find(query).sort("orderedDate", -1) # Sort by most recent
+    orders_cursor = db.orders.find(query, fast_json.projection(Order)).sort("orderedDate", -1) # Sort by most recent
     orders_data = await orders_cursor.to_list(1000)
 
+    # Fetch buyers and pickup points for all orders at once
+    buyers = await profiles.get_many(db, "buyer", [o["buyerId"] for o in orders_data])
+    pickup_point_ids = list({o["pickupPointId"] for o in orders_data if o.get("pickupPointId")})
+    pickup_point_names = {}
+    if pickup_point_ids:
+        pickup_points_cursor = db.pickupPoints.find({"id": {"$in": pickup_point_ids}}, {"_id": 0, "id": 1, "name": 1})
+        pickup_point_names = {pp["id"]: pp.get("name") async for pp in pickup_points_cursor}
+
     enriched_orders = []
     for order_data in orders_data:
-        # Fetch buyer's whatsapp
-        buyer = await db.users.find_one({"id": order_data["buyerId"], "type": "buyer"})
+        # Buyer's whatsapp
+        buyer = buyers.get(order_data["buyerId"])
         if buyer:
             order_data["buyerWhatsapp"] = buyer.get("whatsapp")
 
-        # Fetch pickup point name if pickupPointId exists
-        if order_data.get("pickupPointId"):
-            pickup_point = await db.pickupPoints.find_one({"id": order_data["pickupPointId"]})
-            if pickup_point:
-                order_data["pickupPointName"] = pickup_point.get("name")
+        # Pickup point name if pickupPointId exists
+        if order_data.get("pickupPointId") in pickup_point_names:
+            order_data["pickupPointName"] = pickup_point_names[order_data["pickupPointId"]]
 
         # Handle legacy shippingAddress format (convert dict to string)
         if isinstance(order_data.get("shippingAddress"), dict):
@@ -2269,9 +2661,29 @@ async def list_orders(seller_id: Optional[str] = None, buyer_id: Optional[str] =
                 product["image"] = None
                 product["images"] = []
 
-        enriched_orders.append(Order(**order_data))
+        enriched_orders.append(fast_json.fill_defaults(Order, order_data))
 
-    return enriched_orders
+    return fast_json.documents_response(enriched_orders)
+
+async def record_sale(order: dict):
+    """Logs the sale events of an order once, when it is paid or delivered (trending.py)."""
+    # Claimed on the order: a delivered -> pending -> delivered order is only counted once
+    claimed = await db.orders.update_one(
+        {"id": order["id"], "saleRecordedAt": {"$exists": False}}, {"$set": {"saleRecordedAt": datetime.utcnow()}}
+    )
+    if not claimed.modified_count:
+        return
+    try:
+        await event_store.record(db, [
+            event_store.product_event(
+                "sale", line["productId"], order["sellerId"], datetime.utcnow(),
+                userId=order["buyerId"], quantity=line["quantity"],
+            )
+            for line in order["products"]
+        ])
+    except Exception as e:
+        logger.error(f"Failed to record the sale of order {order['id']}: {e}")
+        await db.orders.update_one({"id": order["id"]}, {"$unset": {"saleRecordedAt": ""}})
 
 @api_router.put("/orders/{order_id}", response_model=Order, dependencies=[Depends(order_owner_or_support_required)])
 async def update_order(order_id: str, order_data: OrderUpdate, background_tasks: BackgroundTasks):
@@ -2296,9 +2708,15 @@ async def update_order(order_id: str, order_data: OrderUpdate, background_tasks:
                 
                 # After decrementing, check the new stock level
                 updated_product_stock = await db.products.find_one({"id": product_in_order['productId']})
+                if updated_product_stock:
+                    await catalog_stats.record_change(
+                        db,
+                        {**updated_product_stock, "stock": updated_product_stock.get("stock", 0) + product_in_order['quantity']},
+                        updated_product_stock,
+                    )
                 
                 if updated_product_stock and updated_product_stock.get('stock') == 3:
-                    seller = await db.sellers.find_one({"id": updated_product_stock['sellerId']})
+                    seller = await profiles.get(db, "seller", updated_product_stock['sellerId'])
                     if seller and seller.get("email"):
                         # Prepare and send email notification
                         message = MessageSchema(
@@ -2311,17 +2729,28 @@ async def update_order(order_id: str, order_data: OrderUpdate, background_tasks:
                             },
                             subtype="html"
                         )
-                        background_tasks.add_task(fm.send_message, message, template_name="low_stock_alert.html")
+                        background_tasks.add_task(send_email, message, template_name="low_stock_alert.html")
         # If status changes from 'delivered' to something else, restock
         elif order_before_update.get('status') == 'delivered':
             for product_in_order in order_before_update['products']:
-                await db.products.update_one(
+                restocked = await db.products.find_one_and_update(
                     {"id": product_in_order['productId']},
-                    {"$inc": {"stock": product_in_order['quantity']}}
+                    {"$inc": {"stock": product_in_order['quantity']}},
+                    projection=catalog_stats.PROJECTION,
+                    return_document=ReturnDocument.AFTER,
                 )
+                if restocked:
+                    await catalog_stats.record_change(
+                        db, {**restocked, "stock": restocked.get("stock", 0) - product_in_order['quantity']}, restocked
+                    )
 
     await db.orders.update_one({"id": order_id}, {"$set": update_data})
     updated_order = await db.orders.find_one({"id": order_id})
+    if "saleRecordedAt" not in updated_order and (
+        updated_order.get("status") == "delivered" or updated_order.get("paymentStatus") == "paid"
+    ):
+        # Cancelled / abandoned checkouts never count as sales
+        background_tasks.add_task(record_sale, updated_order)
     
     # Check if status has changed and send notification
     if 'status' in update_data and order_before_update.get('status') != updated_order.get('status'):
@@ -2337,8 +2766,9 @@ async def update_order(order_id: str, order_data: OrderUpdate, background_tasks:
             link=f"/profile/orders"
         )
         await db.notifications.insert_one(new_notification.dict())
+        await unread_counters.increment(db, updated_order["buyerId"], 'buyer', "notifications")
 
-        buyer = await db.users.find_one({"id": updated_order["buyerId"], "type": "buyer"})
+        buyer = await profiles.get(db, "buyer", updated_order["buyerId"])
         if buyer and buyer.get("email"):
             message = MessageSchema(
                 subject=f"Mise à jour de votre commande Nengoo #{updated_order['id']}",
@@ -2350,7 +2780,7 @@ async def update_order(order_id: str, order_data: OrderUpdate, background_tasks:
                 },
                 subtype="html"
             )
-            background_tasks.add_task(fm.send_message, message, template_name="status_update_buyer.html")
+            background_tasks.add_task(send_email, message, template_name="status_update_buyer.html")
 
             # If order is delivered, send a review request email
             if updated_order.get('status') == 'delivered':
@@ -2370,7 +2800,7 @@ async def update_order(order_id: str, order_data: OrderUpdate, background_tasks:
                     },
                     subtype="html"
                 )
-                background_tasks.add_task(fm.send_message, review_message, template_name="review_request_buyer.html")
+                background_tasks.add_task(send_email, review_message, template_name="review_request_buyer.html")
 
     return Order(**updated_order)
 
@@ -2423,6 +2853,18 @@ async def process_checkout(checkout_data: CheckoutRequest, background_tasks: Bac
     products_from_db_cursor = db.products.find({"id": {"$in": product_ids}})
     products_from_db = {p["id"]: p for p in await products_from_db_cursor.to_list(len(product_ids))}
 
+    # Resolve every seller of the cart at once (admins can also act as sellers)
+    cart_seller_ids = {p["sellerId"] for p in products_from_db.values()}
+    sellers = await profiles.get_many(db, "seller", cart_seller_ids)
+    admin_sellers = await profiles.get_many(db, "admin", cart_seller_ids - sellers.keys())
+    for admin in admin_sellers.values():
+        sellers[admin["id"]] = {
+            "id": admin["id"],
+            "businessName": admin["name"],
+            "deliveryPrice": 0,
+            "email": admin["email"]
+        }
+
     # Group cart items by seller
     seller_orders = {} # {seller_id: {sellerName: str, products: []}}
     for item in checkout_data.cartItems:
@@ -2433,18 +2875,8 @@ async def process_checkout(checkout_data: CheckoutRequest, background_tasks: Bac
         seller_id = product_info["sellerId"]
         
         # Check if seller exists
-        seller = await db.sellers.find_one({"id": seller_id})
-        if not seller:
-            admin = await db.admins.find_one({"id": seller_id})
-            if admin:
-                seller = {
-                    "id": admin["id"],
-                    "businessName": admin["name"],
-                    "deliveryPrice": 0,
-                    "email": admin["email"]
-                }
-            else:
-                raise HTTPException(status_code=400, detail=f"Le vendeur avec l'ID '{seller_id}' pour le produit '{product_info['name']}' est invalide. Veuillez retirer ce produit de votre panier.")
+        if seller_id not in sellers:
+            raise HTTPException(status_code=400, detail=f"Le vendeur avec l'ID '{seller_id}' pour le produit '{product_info['name']}' est invalide. Veuillez retirer ce produit de votre panier.")
 
         if seller_id not in seller_orders:
             seller_orders[seller_id] = {
@@ -2461,21 +2893,14 @@ async def process_checkout(checkout_data: CheckoutRequest, background_tasks: Bac
             images=product_info.get("images", [])
         ))
 
+    # Super admins are alerted of every order
+    super_admins_cursor = db.admins.find({"role": "super_admin", "status": "active"})
+    super_admins = await super_admins_cursor.to_list(10)
+    super_admin_emails = [admin["email"] for admin in super_admins if admin.get("email")]
+
     created_orders = []
     for seller_id, order_details in seller_orders.items():
-        # Fetch seller to get their delivery price
-        seller = await db.sellers.find_one({"id": seller_id})
-        if not seller:
-            admin = await db.admins.find_one({"id": seller_id})
-            if admin:
-                seller = {
-                    "id": admin["id"],
-                    "businessName": admin["name"],
-                    "deliveryPrice": 0,
-                    "email": admin["email"]
-                }
-            else:
-                raise HTTPException(status_code=404, detail=f"Seller {seller_id} not found.")
+        seller = sellers[seller_id]
 
         # Determine shipping cost
         shipping_cost = seller.get("deliveryPrice") if seller.get("deliveryPrice") is not None else global_shipping_price
@@ -2521,6 +2946,7 @@ async def process_checkout(checkout_data: CheckoutRequest, background_tasks: Bac
             message=f"Votre commande #{new_order.id} a été reçue.",
             link="/profile/orders"
         ).dict())
+        await unread_counters.increment(db, buyer_id, 'buyer', "notifications")
 
         # 2. To Seller
         await db.notifications.insert_one(Notification(
@@ -2531,6 +2957,7 @@ async def process_checkout(checkout_data: CheckoutRequest, background_tasks: Bac
             message=f"Nouvelle commande #{new_order.id} de {total_amount} {new_order.currency}",
             link="/seller/dashboard/orders"
         ).dict())
+        await unread_counters.increment(db, seller_id, 'seller', "notifications")
 
         # --- Send Email Notifications ---
         # 1. To Buyer
@@ -2545,7 +2972,7 @@ async def process_checkout(checkout_data: CheckoutRequest, background_tasks: Bac
                 },
                 subtype="html"
             )
-            background_tasks.add_task(fm.send_message, message_buyer, template_name="new_order_buyer.html")
+            background_tasks.add_task(send_email, message_buyer, template_name="new_order_buyer.html")
 
         # 2. To Seller
         if seller and seller.get("email"):
@@ -2560,13 +2987,9 @@ async def process_checkout(checkout_data: CheckoutRequest, background_tasks: Bac
                 },
                 subtype="html"
             )
-            background_tasks.add_task(fm.send_message, message_seller, template_name="new_order_seller.html")
+            background_tasks.add_task(send_email, message_seller, template_name="new_order_seller.html")
 
         # 3. To Super Admins
-        super_admins_cursor = db.admins.find({"role": "super_admin", "status": "active"})
-        super_admins = await super_admins_cursor.to_list(10)
-        super_admin_emails = [admin["email"] for admin in super_admins if admin.get("email")]
-        
         if super_admin_emails:
             message_admin = MessageSchema(
                 subject=f"ALERTE : Nouvelle commande Nengoo #{new_order.id}",
@@ -2583,7 +3006,7 @@ async def process_checkout(checkout_data: CheckoutRequest, background_tasks: Bac
             # We can reuse the new_order_seller template or create a specific one. 
             # For now, using seller one or simple body. Let's assume we use a dedicated one if exists, 
             # but I'll use new_order_seller.html as a base if no specific one is provided.
-            background_tasks.add_task(fm.send_message, message_admin, template_name="new_order_seller.html")
+            background_tasks.add_task(send_email, message_admin, template_name="new_order_seller.html")
 
     return created_orders
 
@@ -2667,9 +3090,9 @@ async def create_pickup_point(pickup_data: PickupPointCreate):
 
 @api_router.get("/pickup-points", response_model=List[PickupPoint])
 async def list_pickup_points():
-    pickup_points_cursor = db.pickupPoints.find()
+    pickup_points_cursor = db.pickupPoints.find({}, fast_json.projection(PickupPoint))
     pickup_points = await pickup_points_cursor.to_list(1000)
-    return [PickupPoint(**p) for p in pickup_points]
+    return fast_json.documents_response([fast_json.fill_defaults(PickupPoint, p) for p in pickup_points])
 
 @api_router.put("/pickup-points/{pickup_point_id}", response_model=PickupPoint, dependencies=[Depends(super_admin_required)])
 async def update_pickup_point(pickup_point_id: str, pickup_data: PickupPointUpdate):
@@ -2795,46 +3218,6 @@ async def delete_ad(ad_id: str):
         raise HTTPException(status_code=404, detail="Ad not found")
     return {"message": "Ad deleted successfully"}
 
-# --- File Upload Management (AWS S3) ---
-@api_router.post("/generate-presigned-url", response_model=PresignedUrlResponse, dependencies=[Depends(seller_id_or_support_required)])
-async def generate_presigned_url(request: PresignedUrlRequest):
-    """
-    Generates a pre-signed URL to upload a file directly to S3.
-    Requires AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_REGION, and S3_BUCKET_NAME
-    to be configured in the environment.
-    """
-    aws_access_key_id = os.environ.get("AWS_ACCESS_KEY_ID")
-    aws_secret_access_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
-    aws_region = os.environ.get("AWS_REGION")
-    bucket_name = os.environ.get("S3_BUCKET_NAME")
-
-    if not all([aws_access_key_id, aws_secret_access_key, aws_region, bucket_name]):
-        raise HTTPException(status_code=500, detail="AWS S3 environment variables not configured.")
-
-    s3_client = boto3.client(
-        "s3",
-        aws_access_key_id=aws_access_key_id,
-        aws_secret_access_key=aws_secret_access_key,
-        region_name=aws_region,
-        config=boto3.session.Config(signature_version='s3v4')
-    )
-    
-    # Generate a unique object name
-    object_name = f"uploads/{uuid.uuid4()}-{request.fileName}"
-
-    try:
-        response = s3_client.generate_presigned_url(
-            'put_object',
-            Params={'Bucket': bucket_name, 'Key': object_name, 'ContentType': request.fileType},
-            ExpiresIn=3600  # URL expires in 1 hour
-        )
-        public_url = f"https://{bucket_name}.s3.{aws_region}.amazonaws.com/{object_name}"
-        
-        return PresignedUrlResponse(uploadUrl=response, publicUrl=public_url)
-    except ClientError as e:
-        logging.error(e)
-        raise HTTPException(status_code=500, detail="Could not generate pre-signed URL.")
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
@@ -2887,20 +3270,9 @@ async def create_admin(admin_data: AdminCreate):
 
 @api_router.get("/admins", response_model=List[Admin], dependencies=[Depends(super_admin_required)])
 async def list_admins():
-    admins_cursor = db.admins.find()
-    admins_from_db = await admins_cursor.to_list(1000)
-    valid_admins = []
-    for admin_data in admins_from_db:
-        try:
-            # Ensure 'type' field exists before validation, defaulting to 'admin'
-            if 'type' not in admin_data:
-                admin_data['type'] = 'admin'
-            valid_admins.append(Admin(**admin_data))
-        except Exception as e:
-            logging.error(f"Skipping invalid admin data due to validation error: {admin_data}")
-            logging.error(f"Error details: {e}")
-            continue
-    return valid_admins
+    admins_cursor = db.admins.find({}, fast_json.projection(Admin))
+    admins = await admins_cursor.to_list(1000)
+    return fast_json.documents_response(fast_json.valid_documents(Admin, admins))
 
 @api_router.put("/admins/{admin_id}", response_model=Admin, dependencies=[Depends(super_admin_required)])
 async def update_admin(admin_id: str, admin_data: AdminUpdate):
@@ -2909,6 +3281,7 @@ async def update_admin(admin_id: str, admin_data: AdminUpdate):
         raise HTTPException(status_code=400, detail="No update data provided.")
 
     await db.admins.update_one({"id": admin_id}, {"$set": update_data})
+    profiles.invalidate("admin", admin_id)
     updated_admin = await db.admins.find_one({"id": admin_id})
     if not updated_admin:
         raise HTTPException(status_code=404, detail="Admin not found")
@@ -2925,6 +3298,7 @@ async def update_admin_status(admin_id: str, status_data: AdminStatusUpdate):
         raise HTTPException(status_code=403, detail="Cannot change the status of a super admin.")
 
     await db.admins.update_one({"id": admin_id}, {"$set": {"status": status_data.status}})
+    profiles.invalidate("admin", admin_id)
     updated_admin = await db.admins.find_one({"id": admin_id})
     if not updated_admin:
         raise HTTPException(status_code=404, detail="Admin not found")
@@ -2953,6 +3327,7 @@ async def bulk_delete_admins(request: BulkDeleteRequest):
     query = {"id": {"$in": request.ids}, "role": {"$ne": "super_admin"}}
     
     await db.admins.delete_many(query)
+    profiles.invalidate_many("admin", request.ids)
     return
 
 @api_router.delete("/admins/{admin_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(super_admin_required)])
@@ -2962,6 +3337,7 @@ async def delete_admin(admin_id: str):
         raise HTTPException(status_code=403, detail="Cannot delete a super admin.")
 
     result = await db.admins.delete_one({"id": admin_id})
+    profiles.invalidate("admin", admin_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Admin not found")
     return
@@ -2990,6 +3366,19 @@ async def migrate_product_slugs():
         count += 1
     return {"message": f"Successfully migrated {count} products."}
 
+@api_router.post("/admin/recount-unread", dependencies=[Depends(super_admin_required)])
+async def recount_unread():
+    count = await unread_counters.recount_unread_counters(db)
+    return {"message": f"Unread counters recomputed for {count} users."}
+
+@api_router.get("/admin/indexes", dependencies=[Depends(super_admin_required)])
+async def get_index_report():
+    return await db_indexes.report_indexes(db)
+
+@api_router.post("/admin/notifications/retention", dependencies=[Depends(super_admin_required)])
+async def run_notification_retention():
+    return await notification_retention.run_retention(db)
+
 # --- Privacy Policy Management ---
 @api_router.get("/privacy-policy", response_model=PrivacyPolicy)
 async def get_privacy_policy():
@@ -3168,7 +3557,7 @@ async def product_og_preview(id_or_slug: str):
     raw_desc = product.get("description", "Découvrez ce produit sur Nengoo")
     description = _escape_html(raw_desc[:160])
     images = product.get("images", [])
-    image = images[0] if images else default_image
+    image = product.get("ogImage") or (images[0] if images else default_image)
     price = product.get("promoPrice") or product.get("price") or 0
     currency = product.get("currency", "XAF")
     slug = product.get("slug") or product.get("id")
@@ -3221,6 +3610,36 @@ app.include_router(api_router)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+@lifecycle.background_warmer
+async def warm_firebase():
+    # First OAuth login would otherwise pay the firebase_admin import
+    await asyncio.to_thread(initialize_firebase_admin)
+
+@lifecycle.background_warmer
+async def warm_s3_client():
+    try:
+        s3_storage.bucket_settings()
+    except s3_storage.S3NotConfigured:
+        return
+    await asyncio.to_thread(s3_storage.get_s3_client)
+
+@lifecycle.warmer
+async def warm_trending():
+    await trending.refresh(db)
+
+@lifecycle.periodic(trending.REFRESH_SECONDS)
+async def refresh_trending():
+    await trending.refresh(db)
+
+@lifecycle.warmer
+async def warm_catalog_stats():
+    await catalog_stats.load(db)
+
+@lifecycle.periodic(catalog_stats.REFRESH_SECONDS)
+async def refresh_catalog_stats():
+    await catalog_stats.stats.reload(db)
+
+@lifecycle.warmer
+async def warm_admin_profiles():
+    admins = await db.admins.find({"status": "active"}, {"_id": 0, "id": 1}).to_list(None)
+    await profiles.get_many(db, "admin", [admin["id"] for admin in admins])
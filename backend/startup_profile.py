@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Cold start profile of the API.
+
+Imports server.py in a fresh interpreter with `-X importtime` and prints the
+import time per top-level package (self time summed over its modules), then
+optionally times the lifespan startup (Mongo ping, indexes, warm-up):
+
+    python startup_profile.py            # import breakdown
+    python startup_profile.py --lifespan # + startup against MONGO_URL/DB_NAME of .env
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+
+
+def import_profile() -> tuple:
+    """Returns ({package: self time in seconds}, total import time in seconds) of `import server`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"❌ import server failed:\n{result.stderr[-2000:]}")
+
+    per_package = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        per_package[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return dict(per_package), sum(per_package.values())
+
+
+async def lifespan_startup() -> float:
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    from benchmark import Lifespan
+
+    lifespan = Lifespan(server.app)
+    start = time.perf_counter()
+    await lifespan.startup()
+    elapsed = time.perf_counter() - start
+    await lifespan.shutdown()
+    return elapsed
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Profile the cold start of server.py")
+    parser.add_argument("--top", type=int, default=20, help="number of packages listed")
+    parser.add_argument("--lifespan", action="store_true", help="also time the lifespan startup")
+    args = parser.parse_args()
+
+    per_package, total = import_profile()
+    print(f"⏱️  import server: {total * 1000:.0f} ms")
+    for package, seconds in sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"   {package:<28}{seconds * 1000:>8.1f} ms  {seconds / total:>5.1%}")
+
+    if args.lifespan:
+        print(f"⏱️  lifespan startup: {asyncio.run(lifespan_startup()) * 1000:.0f} ms")
@@ -0,0 +1,469 @@
+"""
+Deterministic synthetic data for load tests and benchmarks.
+
+Documents follow the models of server.py (ids, field names, types), so the API
+can be exercised against them as against production data. Distributions are
+skewed like production traffic:
+- product popularity (orders, interactions, views) follows a Zipf law
+- a few sellers own most of the catalog (heavy tail)
+- order volume is seasonal (year-end peak, weekends, evening hours)
+- names are French, with accents and duplicates, for slug/search edge cases
+
+The same seed always produces the same documents. As a script, into a
+database whose name contains "bench" (never the one of .env):
+    python synthetic_data.py --db-name nengoo_bench --products 1000000 --orders 2000000 --drop
+"""
+
+import os
+import re
+import random
+import asyncio
+import unicodedata
+import uuid
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+from pathlib import Path
+from pymongo import UpdateOne
+
+CATEGORIES = [
+    {"id": "clothing_accessories", "name": "Vêtements et Accessoires", "description": "Mode pour hommes, femmes et enfants."},
+    {"id": "electronics", "name": "Électronique", "description": "Appareils électroniques, gadgets et accessoires."},
+    {"id": "home_garden", "name": "Maison et Jardin", "description": "Articles pour la maison, la décoration et le jardinage."},
+    {"id": "handicrafts", "name": "Artisanat", "description": "Produits artisanaux et faits main."},
+    {"id": "beauty_care", "name": "Beauté et Soins", "description": "Produits cosmétiques et de soins personnels."},
+    {"id": "food_drinks", "name": "Aliments et Boissons", "description": "Produits alimentaires, épicerie et boissons."},
+    {"id": "sports_articles", "name": "Articles de Sport", "description": "Équipements et vêtements de sport."},
+]
+
+PRODUCT_NOUNS = {
+    "clothing_accessories": ["Robe en pagne", "Chemise en wax", "Écharpe", "Sac à main", "Chaussures", "Boubou brodé", "Montre", "Casquette"],
+    "electronics": ["Téléphone", "Écouteurs", "Chargeur", "Télévision", "Enceinte", "Ordinateur portable", "Câble USB", "Batterie"],
+    "home_garden": ["Marmite", "Rideau", "Théière", "Lampe", "Chaise", "Arrosoir", "Nappe brodée", "Coussin"],
+    "handicrafts": ["Panier tressé", "Masque bamiléké", "Statuette", "Tabouret sculpté", "Collier de perles", "Bracelet", "Poterie"],
+    "beauty_care": ["Crème", "Savon", "Huile de karité", "Beurre de cacao", "Parfum", "Lotion", "Mèches"],
+    "food_drinks": ["Café", "Miel", "Poivre de Penja", "Pâte d'arachide", "Thé", "Jus de bissap", "Chocolat", "Huile de palme"],
+    "sports_articles": ["Ballon", "Maillot", "Crampons", "Haltères", "Tapis de yoga", "Gourde", "Survêtement"],
+}
+
+QUALIFIERS = [
+    "élégant", "de qualité supérieure", "fait main", "100% naturel", "édition spéciale", "à l'ancienne",
+    "écologique", "pour enfant", "très résistant", "spécial fêtes", "garantie 1 an", "légèreté extrême",
+]
+
+# Search terms of the benchmark scenarios, with and without accents
+WORDS = ["robe", "pagne", "sac", "téléphone", "telephone", "écharpe", "crème", "creme", "savon", "miel",
+         "panier", "ballon", "montre", "café", "pâte", "huile", "élégant", "fait main"]
+
+FIRST_NAMES = ["Amélie", "Hélène", "Frédéric", "Jérôme", "Chloé", "Noël", "Loïc", "Zoé", "Aïcha", "Émile",
+               "Thérèse", "François", "Désiré", "Bénédicte", "Joël", "Gaëlle", "Cédric", "Séverin"]
+LAST_NAMES = ["Mbarga", "Essomba", "Tchakounté", "Abéga", "Kamdem", "Fotso", "Njoya", "Bélinga",
+              "Ngué", "Ékambi", "Mballa", "Nkoulou", "Ebéné", "Tchoupé"]
+
+CITIES = [("Douala", "Littoral"), ("Yaoundé", "Centre"), ("Bafoussam", "Ouest"), ("Garoua", "Nord"),
+          ("Bamenda", "Nord-Ouest"), ("Ébolowa", "Sud"), ("Ngaoundéré", "Adamaoua")]
+
+# Relative order volume per month (January first): year-end peak, back-to-school in September
+MONTH_WEIGHTS = [0.8, 0.75, 0.85, 0.9, 0.9, 0.85, 0.9, 1.0, 1.2, 0.9, 1.1, 1.8]
+# Relative volume per hour of the day
+HOUR_WEIGHTS = [0.1, 0.05, 0.05, 0.05, 0.05, 0.1, 0.3, 0.5, 0.7, 0.9, 1.0, 1.0,
+                1.1, 1.0, 0.9, 0.9, 1.0, 1.2, 1.5, 1.7, 1.8, 1.5, 0.9, 0.4]
+WEEKEND_BOOST = 1.3
+
+PRODUCT_ZIPF_EXPONENT = 1.07
+SELLER_ZIPF_EXPONENT = 1.2
+
+BATCH_SIZE = int(os.getenv("SYNTHETIC_BATCH_SIZE", "1000"))
+PARALLEL_BATCHES = int(os.getenv("SYNTHETIC_PARALLEL_BATCHES", "4"))
+
+
+def _id(rng: random.Random, prefix: str) -> str:
+    return f"{prefix}_{uuid.UUID(int=rng.getrandbits(128)).hex[:12]}"
+
+
+def generate_slug(text: str) -> str:
+    """Same rules as server.generate_slug."""
+    text = unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode('utf-8')
+    text = re.sub(r'[^\w\s-]', '', text).lower().strip()
+    return re.sub(r'[-\s]+', '-', text)
+
+
+def person_name(index: int) -> str:
+    """Deterministic name of the index-th person (no need to keep the names in memory)."""
+    return f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+
+
+def zipf_cum_weights(count: int, exponent: float) -> list:
+    """Cumulative weights of ranks 1..count for random.choices / bisect."""
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+class SyntheticDataset:
+    """Generates a coherent dataset; ids of every generated entity are kept for the scenarios."""
+
+    def __init__(self, seed: int = 42, now: datetime = None):
+        self.rng = random.Random(seed)
+        self.now = now or datetime(2026, 1, 1)
+        self.seller_ids = []
+        self.buyer_ids = []
+        self.product_ids = []
+        self.conversation_ids = []
+        self.pickup_point_ids = []
+        # Per product (same index as product_ids), to build order lines without reading back
+        self.product_names = []
+        self.product_prices = []
+        self.product_sellers = []  # seller index
+        self.seller_products = []  # product indexes per seller index
+        self._popularity = None  # (cumulative Zipf weights, popularity rank -> product index)
+        self._max_season = max(MONTH_WEIGHTS) * max(HOUR_WEIGHTS) * WEEKEND_BOOST
+
+    def _date(self, days: int = 365) -> datetime:
+        return self.now - timedelta(seconds=self.rng.randrange(days * 24 * 3600))
+
+    def _seasonal_date(self, days: int = 365) -> datetime:
+        """Date drawn over the last `days`, weighted by month, weekday and hour (rejection sampling)."""
+        while True:
+            date = self._date(days)
+            weight = MONTH_WEIGHTS[date.month - 1] * HOUR_WEIGHTS[date.hour]
+            if date.weekday() >= 5:
+                weight *= WEEKEND_BOOST
+            if self.rng.random() * self._max_season < weight:
+                return date
+
+    def _popular_product(self) -> int:
+        """Index of a product, drawn by Zipfian popularity."""
+        if self._popularity is None:
+            ranks = list(range(len(self.product_ids)))
+            self.rng.shuffle(ranks)  # popularity independent of creation order
+            self._popularity = (zipf_cum_weights(len(ranks), PRODUCT_ZIPF_EXPONENT), ranks)
+        cum_weights, ranks = self._popularity
+        rank = bisect_right(cum_weights, self.rng.random() * cum_weights[-1])
+        return ranks[min(rank, len(ranks) - 1)]
+
+    def sellers(self, count: int):
+        for i in range(count):
+            seller_id = _id(self.rng, "seller")
+            self.seller_ids.append(seller_id)
+            self.seller_products.append([])
+            city, region = self.rng.choice(CITIES)
+            yield {
+                "id": seller_id,
+                "whatsapp": f"+2376{i:08d}",
+                "password": None,
+                "name": person_name(i),
+                "businessName": f"Boutique {LAST_NAMES[i % len(LAST_NAMES)]} {i}",
+                "email": f"seller{i}@example.com",
+                "city": city,
+                "region": region,
+                "address": f"{i} rue du Marché, {city}",
+                "categories": [self.rng.choice(CATEGORIES)["id"]],
+                "description": "Boutique de démonstration générée",
+                "status": "approved",
+                "type": "seller",
+                "deliveryPrice": self.rng.choice([None, 1000, 1500, 2000]),
+                "createdAt": self._date(),
+            }
+
+    def buyers(self, count: int):
+        for i in range(count):
+            buyer_id = _id(self.rng, "buyer")
+            self.buyer_ids.append(buyer_id)
+            yield {
+                "id": buyer_id,
+                "whatsapp": f"+2375{i:08d}",
+                "name": person_name(i),
+                "email": f"buyer{i}@example.com",
+                "type": "buyer",
+                "joinDate": self._date(),
+                "status": "active",
+                "totalOrders": 0,
+                "totalSpent": 0.0,
+            }
+
+    def pickup_points(self, count: int):
+        for i in range(count):
+            pickup_id = _id(self.rng, "pickup")
+            self.pickup_point_ids.append(pickup_id)
+            city, region = self.rng.choice(CITIES)
+            yield {
+                "id": pickup_id, "name": f"Point relais {city} {i}", "address": f"{i} avenue Centrale",
+                "city": city, "region": region, "managerName": person_name(i),
+                "managerWhatsApp": f"+2374{i:08d}", "phone": f"+2374{i:08d}",
+                "email": f"pickup{i}@example.com", "hours": "8h-18h", "description": "",
+                "status": "active", "createdDate": self._date(), "updatedAt": self.now,
+                "capacity": 50, "currentLoad": 0, "verified": True, "totalOrders": 0,
+                "activeOrders": 0, "rating": 0.0, "reviewsCount": 0,
+            }
+
+    def products(self, count: int):
+        seller_weights = zipf_cum_weights(len(self.seller_ids), SELLER_ZIPF_EXPONENT)
+        slug_counts = {}
+        start = len(self.product_ids)
+        for i in range(start, start + count):
+            product_id = _id(self.rng, "prod")
+            category = self.rng.choice(CATEGORIES)["id"]
+            name = f"{self.rng.choice(PRODUCT_NOUNS[category])} {self.rng.choice(QUALIFIERS)}"
+            seller_index = self.rng.choices(range(len(self.seller_ids)), cum_weights=seller_weights)[0]
+            price = float(max(100, min(2_000_000, round(self.rng.lognormvariate(9.5, 1.2), -2))))
+
+            # Duplicate names get -1, -2... suffixes, as server.get_unique_slug does
+            base_slug = generate_slug(name)
+            duplicates = slug_counts.get(base_slug, 0)
+            slug_counts[base_slug] = duplicates + 1
+            slug = f"{base_slug}-{duplicates}" if duplicates else base_slug
+
+            self.product_ids.append(product_id)
+            self.product_names.append(name)
+            self.product_prices.append(price)
+            self.product_sellers.append(seller_index)
+            self.seller_products[seller_index].append(i)
+
+            created = self._date()
+            yield {
+                "id": product_id,
+                "slug": slug,
+                "name": name,
+                "description": f"{name}. Livraison partout au Cameroun, qualité garantie.",
+                "category": category,
+                "price": price,
+                "promoPrice": round(price * 0.8, -2) if self.rng.random() < 0.1 else None,
+                "oldPrice": None,
+                "sellerId": self.seller_ids[seller_index],
+                "sellerName": f"Boutique {LAST_NAMES[seller_index % len(LAST_NAMES)]} {seller_index}",
+                "stock": 0 if self.rng.random() < 0.08 else self.rng.randrange(1, 200),
+                "images": [f"https://example.com/images/{product_id}.jpg"],
+                "status": "approved" if self.rng.random() < 0.95 else "pending",
+                "currency": "XAF",
+                "sold": 0,
+                "verified": True,
+                "featured": self.rng.random() < 0.01,
+                "rating": 0.0,
+                "reviewsCount": 0,
+                "views": 0,
+                "favorites": 0,
+                "tags": [],
+                "createdAt": created,
+                "updatedAt": created,
+            }
+        self._popularity = None  # ranks are drawn again over the whole catalog
+
+    def product_views(self, expected_views: int):
+        """(product index, views) pairs following the popularity law, for the most viewed products."""
+        if self._popularity is None:
+            self._popular_product()
+        cum_weights, ranks = self._popularity
+        total = cum_weights[-1]
+        previous = 0.0
+        for rank, cumulative in enumerate(cum_weights):
+            views = int(expected_views * (cumulative - previous) / total)
+            previous = cumulative
+            if views == 0:
+                break
+            yield ranks[rank], views
+
+    def orders(self, count: int):
+        for _ in range(count):
+            first = self._popular_product()
+            seller_index = self.product_sellers[first]
+            catalog = self.seller_products[seller_index]
+            extra = self.rng.choices(catalog, k=self.rng.choice([0, 0, 0, 1, 1, 2])) if len(catalog) > 1 else []
+            lines = []
+            for index in dict.fromkeys([first] + extra):
+                product_id = self.product_ids[index]
+                image = f"https://example.com/images/{product_id}.jpg"
+                lines.append({
+                    "productId": product_id, "name": self.product_names[index], "quantity": self.rng.randint(1, 3),
+                    "price": self.product_prices[index], "image": image, "images": [image],
+                })
+            buyer_index = self.rng.randrange(len(self.buyer_ids))
+            city, region = self.rng.choice(CITIES)
+            ordered = self._seasonal_date()
+            pickup = self.rng.random() < 0.3 and self.pickup_point_ids
+            yield {
+                "id": _id(self.rng, "ord"),
+                "buyerId": self.buyer_ids[buyer_index],
+                "buyerName": person_name(buyer_index),
+                "sellerId": self.seller_ids[seller_index],
+                "sellerName": f"Boutique {LAST_NAMES[seller_index % len(LAST_NAMES)]} {seller_index}",
+                "products": lines,
+                "totalAmount": sum(line["price"] * line["quantity"] for line in lines) + 2500,
+                "shippingCost": 2500,
+                "shippingAddress": "Quartier Bastos",
+                "shippingCity": city,
+                "shippingRegion": region,
+                "shippingPhone": f"+2375{buyer_index:08d}",
+                "currency": "XAF",
+                "status": self.rng.choices(
+                    ["pending", "processing", "shipped", "delivered", "cancelled"], weights=[10, 10, 10, 60, 10]
+                )[0],
+                "paymentStatus": "pending",
+                "pickupPointId": self.rng.choice(self.pickup_point_ids) if pickup else None,
+                "pickupStatus": "pending_pickup" if pickup else "not_applicable",
+                "orderedDate": ordered,
+                "createdAt": ordered,
+                "updatedAt": ordered,
+            }
+
+    def interactions(self, count: int):
+        for _ in range(count):
+            kind = self.rng.choices(["view", "favourite", "rate"], weights=[85, 10, 5])[0]
+            yield {
+                "id": _id(self.rng, "int"),
+                "userId": self.rng.choice(self.buyer_ids),
+                "productId": self.product_ids[self._popular_product()],
+                "isFavourite": kind == "favourite",
+                "rating": self.rng.choices([1, 2, 3, 4, 5], weights=[5, 5, 15, 35, 40])[0] if kind == "rate" else 0,
+                "interaction": kind,
+                "timestamp": self._seasonal_date(),
+            }
+
+    def conversations_and_messages(self, conversations: int, messages: int):
+        conversation_docs = []
+        for _ in range(conversations):
+            conversation_id = _id(self.rng, "conv")
+            product_index = self._popular_product()
+            self.conversation_ids.append(conversation_id)
+            conversation_docs.append({
+                "id": conversation_id,
+                "buyer_id": self.rng.choice(self.buyer_ids),
+                "seller_id": self.seller_ids[self.product_sellers[product_index]],
+                "product_id": self.product_ids[product_index],
+                "last_message_timestamp": self.now,
+                "last_message_preview": "Bonjour",
+                "seller_unread": False,
+                "buyer_unread": False,
+                "seller_unread_count": 0,
+                "buyer_unread_count": 0,
+            })
+        for start in range(0, len(conversation_docs), BATCH_SIZE):
+            yield "conversations", conversation_docs[start:start + BATCH_SIZE]
+
+        message_docs = []
+        for _ in range(messages):
+            conversation = self.rng.choice(conversation_docs)
+            from_buyer = self.rng.random() < 0.5
+            message_docs.append({
+                "id": _id(self.rng, "msg"),
+                "conversation_id": conversation["id"],
+                "sender_id": conversation["buyer_id"] if from_buyer else conversation["seller_id"],
+                "receiver_id": conversation["seller_id"] if from_buyer else conversation["buyer_id"],
+                "sender_type": "buyer" if from_buyer else "seller",
+                "receiver_type": "seller" if from_buyer else "buyer",
+                "message": self.rng.choice(["Est-ce toujours disponible ?", "Bonjour, quel est le délai de livraison ?",
+                                            "Merci, c'est noté.", "Livrez-vous à Ngaoundéré ?"]),
+                "timestamp": self._date(30),
+                "read_status": True,
+            })
+            if len(message_docs) >= BATCH_SIZE:
+                yield "messages", message_docs
+                message_docs = []
+        if message_docs:
+            yield "messages", message_docs
+
+
+def _batches(documents, size: int = BATCH_SIZE):
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _insert_batches(collection, documents, parallel: int = PARALLEL_BATCHES) -> int:
+    """insert_many of BATCH_SIZE batches, at most `parallel` in flight. Returns the number of documents."""
+    pending = set()
+    inserted = 0
+    for batch in _batches(documents):
+        if len(pending) >= parallel:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        pending.add(asyncio.ensure_future(collection.insert_many(batch, ordered=False)))
+        inserted += len(batch)
+    if pending:
+        await asyncio.gather(*pending)
+    return inserted
+
+
+async def seed_database(db, products: int = 10000, orders: int = 5000, interactions: int = 20000,
+                        messages: int = 10000, seed: int = 42, sellers: int = None, buyers: int = None,
+                        parallel: int = PARALLEL_BATCHES) -> SyntheticDataset:
+    """Fills `db` (expected empty) and returns the dataset with the generated ids."""
+    dataset = SyntheticDataset(seed)
+    sellers = sellers or max(1, products // 50)
+    buyers = buyers or max(1, products // 10)
+
+    await db.categories.insert_many([dict(c) for c in CATEGORIES])
+    await _insert_batches(db.sellers, dataset.sellers(sellers), parallel)
+    await _insert_batches(db.users, dataset.buyers(buyers), parallel)
+    await _insert_batches(db.pickupPoints, dataset.pickup_points(10), parallel)
+    await _insert_batches(db.products, dataset.products(products), parallel)
+
+    # Views of the popular products (interactions only cover a sample of the traffic)
+    view_updates = [
+        ({"id": dataset.product_ids[index]}, views) for index, views in dataset.product_views(interactions * 10)
+    ]
+    for batch in _batches(view_updates):
+        await db.products.bulk_write(
+            [UpdateOne(query, {"$set": {"views": views}}) for query, views in batch], ordered=False
+        )
+
+    await _insert_batches(db.orders, dataset.orders(orders), parallel)
+    await _insert_batches(db.interactions, dataset.interactions(interactions), parallel)
+    for collection_name, docs in dataset.conversations_and_messages(max(1, messages // 20), messages):
+        await db[collection_name].insert_many(docs, ordered=False)
+    return dataset
+
+
+SEEDED_COLLECTIONS = ["categories", "sellers", "users", "pickupPoints", "products", "orders",
+                      "interactions", "conversations", "messages"]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset at scale")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--interactions", type=int, default=1000000)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--sellers", type=int, help="default: products / 50")
+    parser.add_argument("--buyers", type=int, help="default: products / 10")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--parallel", type=int, default=PARALLEL_BATCHES, help="insert_many batches in flight")
+    parser.add_argument("--db-name", required=True, help="target database, its name must contain 'bench'")
+    parser.add_argument("--drop", action="store_true", help="drop the seeded collections first")
+    args = parser.parse_args()
+    if "bench" not in args.db_name:
+        sys.exit("❌ --db-name doit contenir 'bench' : les collections générées remplacent les données réelles")
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[args.db_name]
+        if args.drop:
+            for name in SEEDED_COLLECTIONS:
+                await db.drop_collection(name)
+        elif await db.products.estimated_document_count():
+            print(f"❌ La base {args.db_name} contient déjà des produits (utilisez --drop)")
+            sys.exit(1)
+
+        start = time.perf_counter()
+        await seed_database(
+            db, args.products, args.orders, args.interactions, args.messages, args.seed,
+            sellers=args.sellers, buyers=args.buyers, parallel=args.parallel,
+        )
+        print(f"✅ Données générées en {time.perf_counter() - start:.1f}s dans {args.db_name}")
+        for name in SEEDED_COLLECTIONS:
+            print(f"   {name}: {await db[name].estimated_document_count()}")
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+"""
+Trending products: time-decayed popularity scores.
+
+Every product event (event_store.record: views, favourites, ratings, WhatsApp
+clicks, sales) adds weight * 2^((t - epoch) / half-life) to the score of its
+product in `db.product_trending` ({_id: productId, score}). Scaling new events
+up instead of decaying old ones down gives the same ranking as
+sum(weight * 2^(-(now - t) / half-life)) with a single $inc per event and no
+periodic rewrite; `rebase` moves the epoch forward (and prunes faded
+products) long before the scale factors could overflow. The new epoch is
+announced with a switch time a couple of refreshes ahead: every worker
+switches at that time, then the stored scores are rescaled, so no old-epoch
+increment lands on rescaled scores (the few landing on not yet rescaled
+ones are the negligible error).
+
+Each API worker keeps the top products per category in memory, sorted, and
+reloads them every TRENDING_REFRESH_SECONDS, so GET /api/products/trending
+does not rank anything per request.
+
+    python trending.py --rebase   # weekly cron is plenty
+"""
+
+import os
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "48"))
+REFRESH_SECONDS = float(os.getenv("TRENDING_REFRESH_SECONDS", "60"))
+POOL_SIZE = 5000  # best scores loaded per refresh
+MAX_PER_CATEGORY = 50
+REBASE_AFTER_HALF_LIVES = 100
+PRUNE_BELOW = 0.01  # score, in units of a view at the new epoch
+
+WEIGHTS = {"view": 1.0, "rate": 2.0, "favourite": 3.0, "click": 4.0, "sale": 5.0}
+DEFAULT_EPOCH = datetime(2025, 1, 1)
+STATE_ID = "trending"
+ALL = "__all__"
+
+
+class TrendingBoard:
+    """{category: [productId, ...] by decreasing score}, replaced as a whole on refresh."""
+
+    def __init__(self):
+        self.epoch = DEFAULT_EPOCH
+        self.next_epoch: Optional[datetime] = None
+        self.switch_at: Optional[datetime] = None
+        self.by_category: Dict[str, List[str]] = {}
+        self.refreshed_at: Optional[datetime] = None
+
+    def current_epoch(self) -> datetime:
+        if self.next_epoch and datetime.utcnow() >= self.switch_at:
+            return self.next_epoch
+        return self.epoch
+
+    def top(self, category: Optional[str], limit: int) -> List[str]:
+        return self.by_category.get(category or ALL, [])[:limit]
+
+
+board = TrendingBoard()
+
+
+def decay_factor(timestamp: datetime, epoch: datetime) -> float:
+    return 2 ** ((timestamp - epoch).total_seconds() / 3600 / HALF_LIFE_HOURS)
+
+
+async def bump(db, events: List[dict]):
+    """Adds product events ({"timestamp", "meta": {"type", "productId"}, ...}) to the scores."""
+    increments = Counter()
+    epoch = board.current_epoch()
+    for event in events:
+        weight = WEIGHTS.get(event["meta"]["type"])
+        if weight:
+            weight *= event.get("quantity", 1)
+            increments[event["meta"]["productId"]] += weight * decay_factor(event["timestamp"], epoch)
+    if increments:
+        await db.product_trending.bulk_write(
+            [UpdateOne({"_id": product_id}, {"$inc": {"score": score}}, upsert=True)
+             for product_id, score in increments.items()],
+            ordered=False,
+        )
+
+
+async def load_epoch(db):
+    state = await db.trending_state.find_one({"_id": STATE_ID}) or {}
+    board.epoch = state.get("epoch", DEFAULT_EPOCH)
+    board.next_epoch = state.get("nextEpoch")
+    board.switch_at = state.get("switchAt")
+
+
+async def refresh(db):
+    """Reloads the per category rankings of this worker."""
+    await load_epoch(db)
+    scores = await db.product_trending.find({}, {"score": 1}).sort("score", -1).limit(POOL_SIZE).to_list(POOL_SIZE)
+    ranked_ids = [doc["_id"] for doc in scores]
+    products = await db.products.find(
+        {"id": {"$in": ranked_ids}, "status": "approved"}, {"_id": 0, "id": 1, "category": 1}
+    ).to_list(len(ranked_ids))
+    category_of = {p["id"]: p.get("category") for p in products}
+
+    by_category = {ALL: []}
+    for product_id in ranked_ids:  # already by decreasing score
+        if product_id not in category_of:
+            continue
+        for key in (ALL, category_of[product_id]):
+            ranking = by_category.setdefault(key, [])
+            if len(ranking) < MAX_PER_CATEGORY:
+                ranking.append(product_id)
+    board.by_category = by_category
+    board.refreshed_at = datetime.utcnow()
+
+
+async def rebase(db, now: Optional[datetime] = None) -> dict:
+    """
+    Moves the epoch to `now` when it is far behind, rescaling and pruning the scores.
+    Takes about two refresh intervals (the time for every worker to learn the switch).
+    """
+    await load_epoch(db)
+    new_epoch = board.next_epoch or now or datetime.utcnow()  # resumes an interrupted rebase
+    half_lives = (new_epoch - board.epoch).total_seconds() / 3600 / HALF_LIFE_HOURS
+    if half_lives < REBASE_AFTER_HALF_LIVES:
+        return {"rebased": False, "pruned": 0}
+
+    switch_at = board.switch_at or datetime.utcnow() + timedelta(seconds=2 * REFRESH_SECONDS + 5)
+    await db.trending_state.update_one(
+        {"_id": STATE_ID}, {"$set": {"nextEpoch": new_epoch, "switchAt": switch_at}}, upsert=True
+    )
+    await asyncio.sleep(max(0.0, (switch_at - datetime.utcnow()).total_seconds()) + 5)
+
+    await db.product_trending.update_many({}, {"$mul": {"score": 2 ** -half_lives}})
+    await db.trending_state.update_one(
+        {"_id": STATE_ID}, {"$set": {"epoch": new_epoch}, "$unset": {"nextEpoch": "", "switchAt": ""}}
+    )
+    pruned = await db.product_trending.delete_many({"score": {"$lt": PRUNE_BELOW}})
+    await load_epoch(db)
+    return {"rebased": True, "pruned": pruned.deleted_count}
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Trending scores maintenance")
+    parser.add_argument("--rebase", action="store_true", help="move the epoch forward if needed")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        if args.rebase:
+            result = await rebase(db)
+            print(f"✅ Époque {'déplacée' if result['rebased'] else 'inchangée'}, {result['pruned']} produits retirés")
+        else:
+            await refresh(db)
+            for category, ranking in sorted(board.by_category.items()):
+                print(f"{category}: {', '.join(ranking[:5])}")
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""
+Denormalized unread counters (notifications and messages) per user.
+
+One document per user in `db.unread_counters`:
+    {"_id": "<user_type>:<user_id>", "user_id", "user_type", "notifications": int, "messages": int}
+
+Counters are maintained with atomic $inc on insert and read, so the badge
+endpoints are a single point lookup (served from a short in-process cache).
+`recount_unread_counters` rebuilds them from the source collections; it can be
+run as a script: python unread_counters.py
+"""
+
+import os
+import time
+import logging
+from pathlib import Path
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("notifications", "messages")
+
+# Short TTL: other workers update the counters too
+CACHE_TTL_SECONDS = float(os.getenv("UNREAD_CACHE_TTL", "5"))
+CACHE_MAX_ENTRIES = 10000
+
+_cache = {}  # {key: (expires_at, counts)}
+
+
+def counter_key(user_id: str, user_type: str) -> str:
+    return f"{user_type}:{user_id}"
+
+
+def _invalidate(key: str):
+    _cache.pop(key, None)
+
+
+async def increment(db, user_id: str, user_type: str, field: str, amount: int = 1):
+    """Atomically adds `amount` to a counter, creating the counter document if needed."""
+    if amount == 0:
+        return
+    key = counter_key(user_id, user_type)
+    await db.unread_counters.update_one(
+        {"_id": key},
+        {
+            "$inc": {field: amount},
+            "$setOnInsert": {"user_id": user_id, "user_type": user_type},
+        },
+        upsert=True,
+    )
+    _invalidate(key)
+
+
+async def decrement(db, user_id: str, user_type: str, field: str, amount: int = 1):
+    """Subtracts `amount` from a counter without ever going below zero."""
+    if amount <= 0:
+        return
+    key = counter_key(user_id, user_type)
+    await db.unread_counters.update_one(
+        {"_id": key},
+        [{"$set": {field: {"$max": [0, {"$subtract": [{"$ifNull": [f"${field}", 0]}, amount]}]}}}],
+    )
+    _invalidate(key)
+
+
+async def get_counts(db, user_id: str, user_type: str) -> dict:
+    """Returns {"notifications": n, "messages": m} for a user."""
+    key = counter_key(user_id, user_type)
+    now = time.monotonic()
+    cached = _cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    doc = await db.unread_counters.find_one({"_id": key}) or {}
+    counts = {field: max(0, doc.get(field, 0)) for field in COUNTER_FIELDS}
+
+    if len(_cache) >= CACHE_MAX_ENTRIES:
+        _cache.clear()
+    _cache[key] = (now + CACHE_TTL_SECONDS, counts)
+    return counts
+
+
+async def recount_unread_counters(db) -> int:
+    """
+    Rebuilds every counter (per user and per conversation) from the
+    notifications and messages collections. Returns the number of users updated.
+    """
+    counts = {}
+
+    notifications_cursor = db.notifications.aggregate([
+        {"$match": {"read": False}},
+        {"$group": {"_id": {"id": "$recipient_id", "type": "$recipient_type"}, "count": {"$sum": 1}}},
+    ])
+    async for row in notifications_cursor:
+        user = (row["_id"]["id"], row["_id"]["type"])
+        counts.setdefault(user, dict.fromkeys(COUNTER_FIELDS, 0))["notifications"] = row["count"]
+
+    messages_cursor = db.messages.aggregate([
+        {"$match": {"read_status": False}},
+        {"$group": {
+            "_id": {"id": "$receiver_id", "type": "$receiver_type", "conversation_id": "$conversation_id"},
+            "count": {"$sum": 1},
+        }},
+    ])
+    conversation_ops = []
+    async for row in messages_cursor:
+        user = (row["_id"]["id"], row["_id"]["type"])
+        counts.setdefault(user, dict.fromkeys(COUNTER_FIELDS, 0))["messages"] += row["count"]
+        conversation_ops.append(UpdateOne(
+            {"id": row["_id"]["conversation_id"]},
+            {"$set": {f"{row['_id']['type']}_unread_count": row["count"]}},
+        ))
+
+    await db.conversations.update_many({}, {"$set": {"buyer_unread_count": 0, "seller_unread_count": 0}})
+    if conversation_ops:
+        await db.conversations.bulk_write(conversation_ops, ordered=False)
+
+    keys = [counter_key(user_id, user_type) for user_id, user_type in counts]
+    await db.unread_counters.update_many(
+        {"_id": {"$nin": keys}},
+        {"$set": dict.fromkeys(COUNTER_FIELDS, 0)},
+    )
+    counter_ops = [
+        UpdateOne(
+            {"_id": counter_key(user_id, user_type)},
+            {"$set": {"user_id": user_id, "user_type": user_type, **values}},
+            upsert=True,
+        )
+        for (user_id, user_type), values in counts.items()
+    ]
+    if counter_ops:
+        await db.unread_counters.bulk_write(counter_ops, ordered=False)
+
+    _cache.clear()
+    logger.info(f"Unread counters recomputed for {len(counts)} users")
+    return len(counts)
+
+
+if __name__ == "__main__":
+    import asyncio
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        updated = await recount_unread_counters(client[os.environ['DB_NAME']])
+        print(f"✅ Compteurs non lus recalculés pour {updated} utilisateurs")
+        client.close()
+
+    asyncio.run(main())
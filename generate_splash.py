@@ -1,12 +1,34 @@
-from PIL import Image
+"""
+Génère les assets graphiques de l'app à partir du logo :
+- splash screens Android (fond violet + logo centré) pour chaque densité
+- icône splash Android 12+ (transparente, logo réduit dans la zone sûre)
+- icônes PWA du manifest (frontend/public/icons/icon-NxN.png, déclarées
+  "any maskable" : logo dans la zone sûre de 80% sur fond violet) et favicon
+
+Les images sont rendues en parallèle (pool de processus) et une image n'est
+régénérée que si le logo, ses paramètres ou le générateur ont changé
+(empreintes dans .asset_cache.json) :
+
+    python generate_splash.py                     # tout, chemins du dépôt
+    python generate_splash.py --targets pwa web   # seulement les icônes web
+    python generate_splash.py --force             # tout régénérer
+"""
+
+import argparse
+import hashlib
+import json
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
 
-LOGO_PATH = r"C:\wamp64\www\Nengoo-app-web\frontend\public\icons\logo-512x512.png"
-RES_DIR   = r"C:\wamp64\www\Nengoo-app-web\frontend\android\app\src\main\res"
-BG_COLOR  = (139, 92, 246, 255)  # #8B5CF6 violet Nengoo
+ROOT = Path(__file__).parent
+GENERATOR_VERSION = 1  # à incrémenter si le rendu change
+BG_COLOR = (139, 92, 246, 255)  # #8B5CF6 violet Nengoo
 
-# --- Splash PNGs (fond violet + logo centré) ---
-SIZES = [
+# --- Splash PNGs (dossier res, largeur, hauteur, taille du logo) ---
+SPLASH_SIZES = [
     ("drawable",              1080, 1920, 400),
     ("drawable-port-mdpi",     320,  480, 120),
     ("drawable-port-hdpi",     480,  800, 180),
@@ -20,31 +42,124 @@ SIZES = [
     ("drawable-land-xxxhdpi", 1920, 1280, 480),
 ]
 
-logo = Image.open(LOGO_PATH).convert("RGBA")
-
-for folder, w, h, logo_size in SIZES:
-    img = Image.new("RGBA", (w, h), BG_COLOR)
-    logo_resized = logo.resize((logo_size, logo_size), Image.LANCZOS)
-    x = (w - logo_size) // 2
-    y = (h - logo_size) // 2
-    img.paste(logo_resized, (x, y), logo_resized)
-    out_path = os.path.join(RES_DIR, folder, "splash.png")
-    img.convert("RGB").save(out_path, "PNG", optimize=True)
-    print("splash OK " + folder)
-
-# --- Icône splash Android 12+ (transparente avec logo réduit + padding) ---
-# Android clippe en cercle : zone sûre ~66% du diamètre
-# On place le logo à 50% de la canvas avec fond transparent
-ICON_SIZE = 512
-logo_inner = int(ICON_SIZE * 0.50)  # logo occupe 50% -> reste dans le cercle
-
-icon_canvas = Image.new("RGBA", (ICON_SIZE, ICON_SIZE), (0, 0, 0, 0))
-logo_for_icon = logo.resize((logo_inner, logo_inner), Image.LANCZOS)
-x = (ICON_SIZE - logo_inner) // 2
-y = (ICON_SIZE - logo_inner) // 2
-icon_canvas.paste(logo_for_icon, (x, y), logo_for_icon)
-icon_path = os.path.join(RES_DIR, "drawable", "nengoo_icon.png")
-icon_canvas.save(icon_path, "PNG")
-print("nengoo_icon.png genere (512x512, logo 50%, transparent)")
-
-print("Termine !")
+# Icônes du manifest PWA (frontend/public/manifest.json)
+PWA_ICON_SIZES = [72, 96, 128, 144, 152, 192, 384, 512]
+
+# Android 12+ clippe l'icône en cercle : zone sûre ~66% du diamètre,
+# le logo occupe 50% d'une toile transparente de 512px
+ANDROID12_ICON_SIZE = 512
+ANDROID12_LOGO_RATIO = 0.50
+
+# Icônes maskable : les launchers rognent tout ce qui dépasse le cercle de
+# 80% du côté, le logo est donc réduit à cette zone sur le fond violet
+MASKABLE_SAFE_RATIO = 0.80
+
+
+def build_jobs(res_dir: Path, public_dir: Path, targets) -> list:
+    """[(target, output path, params)] des images à produire."""
+    jobs = []
+    if "splash" in targets:
+        for folder, width, height, logo_size in SPLASH_SIZES:
+            jobs.append(("splash", res_dir / folder / "splash.png",
+                         {"kind": "splash", "size": [width, height], "logo": logo_size}))
+    if "android-icon" in targets:
+        jobs.append(("android-icon", res_dir / "drawable" / "nengoo_icon.png",
+                     {"kind": "transparent", "size": ANDROID12_ICON_SIZE,
+                      "logo": int(ANDROID12_ICON_SIZE * ANDROID12_LOGO_RATIO)}))
+    if "pwa" in targets:
+        for size in PWA_ICON_SIZES:
+            jobs.append(("pwa", public_dir / "icons" / f"icon-{size}x{size}.png",
+                         {"kind": "maskable", "size": size, "logo": int(size * MASKABLE_SAFE_RATIO)}))
+    if "web" in targets:
+        jobs.append(("web", public_dir / "favicon.png", {"kind": "icon", "size": 192}))
+    return jobs
+
+
+@lru_cache(maxsize=1)
+def _load_logo(logo_path: str):
+    from PIL import Image
+    return Image.open(logo_path).convert("RGBA")
+
+
+def render(logo_path: str, out_path: str, params: dict) -> str:
+    """Rendu d'une image (exécuté dans un processus du pool)."""
+    from PIL import Image
+
+    logo = _load_logo(logo_path)
+    kind = params["kind"]
+    if kind == "splash":
+        width, height = params["size"]
+        canvas = Image.new("RGBA", (width, height), BG_COLOR)
+        logo_size = params["logo"]
+        resized = logo.resize((logo_size, logo_size), Image.LANCZOS)
+        canvas.paste(resized, ((width - logo_size) // 2, (height - logo_size) // 2), resized)
+        image = canvas.convert("RGB")
+    elif kind in ("transparent", "maskable"):
+        size, logo_size = params["size"], params["logo"]
+        image = Image.new("RGBA", (size, size), (0, 0, 0, 0) if kind == "transparent" else BG_COLOR)
+        resized = logo.resize((logo_size, logo_size), Image.LANCZOS)
+        image.paste(resized, ((size - logo_size) // 2, (size - logo_size) // 2), resized)
+    else:
+        image = logo.resize((params["size"], params["size"]), Image.LANCZOS)
+
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    image.save(out_path, "PNG", optimize=True)
+    return out_path
+
+
+def fingerprint(logo_digest: str, params: dict) -> str:
+    payload = json.dumps({"logo": logo_digest, "params": params, "version": GENERATOR_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache_key(path: Path) -> str:
+    """Chemin relatif au dépôt, pour un cache indépendant de l'emplacement du clone."""
+    resolved = path.resolve()
+    return str(resolved.relative_to(ROOT.resolve())) if resolved.is_relative_to(ROOT.resolve()) else str(resolved)
+
+
+def main():
+    frontend = ROOT / "frontend"
+    parser = argparse.ArgumentParser(description="Génère les splash screens et icônes Nengoo")
+    parser.add_argument("--logo", default=str(frontend / "public" / "icons" / "logo-512x512.png"))
+    parser.add_argument("--android-res", default=str(frontend / "android" / "app" / "src" / "main" / "res"))
+    parser.add_argument("--public-dir", default=str(frontend / "public"))
+    parser.add_argument("--targets", nargs="+", default=["splash", "android-icon", "pwa", "web"],
+                        choices=["splash", "android-icon", "pwa", "web"])
+    parser.add_argument("--cache", default=str(ROOT / ".asset_cache.json"))
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--force", action="store_true", help="ignore le cache")
+    args = parser.parse_args()
+
+    logo_path = Path(args.logo)
+    if not logo_path.exists():
+        sys.exit(f"Logo introuvable : {logo_path}")
+    logo_digest = hashlib.sha256(logo_path.read_bytes()).hexdigest()
+
+    cache_path = Path(args.cache)
+    cache = json.loads(cache_path.read_text()) if cache_path.exists() and not args.force else {}
+
+    jobs = build_jobs(Path(args.android_res), Path(args.public_dir), args.targets)
+    pending = []
+    for target, out_path, params in jobs:
+        key = _cache_key(out_path)
+        digest = fingerprint(logo_digest, params)
+        if cache.get(key) == digest and out_path.exists():
+            continue
+        pending.append((target, key, out_path, params, digest))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [(pool.submit(render, str(logo_path), str(out_path), params), target, key, digest)
+                       for target, key, out_path, params, digest in pending]
+            for future, target, key, digest in futures:
+                future.result()
+                cache[key] = digest
+                print(f"{target} OK {key}")
+        cache_path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+
+    print(f"Termine ! {len(pending)} image(s) générée(s), {len(jobs) - len(pending)} inchangée(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+The incremental co-occurrence matrix of backend/recommender.py must equal a full
+recount, whatever the chunking and however late the events arrive.
+"""
+
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import recommender  # noqa: E402
+
+START = datetime(2026, 1, 1)
+COLUMNS = ["basket", "productId", "weight", "received"]
+
+
+def _rows():
+    day = timedelta(days=1)
+    rows = [
+        # Basket of day 1, completed by offline events received days later
+        ("u1:d1", "p1", 1.0, START),
+        ("u1:d1", "p2", 1.0, START + timedelta(hours=3)),
+        ("u1:d1", "p3", 3.0, START + 4 * day),
+        ("u1:d1", "p2", 3.0, START + 6 * day),  # same product, higher weight
+        ("u2:d2", "p1", 2.0, START + day),
+        ("u2:d2", "p3", 2.0, START + day),
+        ("u3:d3", "p2", 1.0, START + 2 * day),
+    ]
+    # Basket over MAX_BASKET_SIZE: late high weights evict products already counted
+    capped = [("u4:d1", f"q{i}", 1.0, START + timedelta(hours=i)) for i in range(recommender.MAX_BASKET_SIZE + 5)]
+    capped += [("u4:d1", "p1", 3.0, START + 5 * day), ("u4:d1", "q0", 2.0, START + 7 * day)]
+    return pd.DataFrame(rows + capped, columns=COLUMNS)
+
+
+def _recount(rows):
+    items, pairs = recommender.matrix_delta(recommender.to_baskets(rows))
+    return items.to_dict(), {(a, b): w for a, b, w in pairs.itertuples(index=False)}
+
+
+def _incremental(rows, chunk, end, counted_from=None):
+    """Applies the deltas of recommender.run, chunk by chunk of reception time."""
+    items, pairs = defaultdict(float), defaultdict(float)
+    start = counted_from or START
+    while start < end:
+        chunk_end = min(start + chunk, end)
+        received = rows[rows["received"] < chunk_end]
+        before, after = recommender.changed_baskets(received, start, counted_from)
+        if not after.empty:
+            item_delta, pair_delta = recommender.matrix_delta(after, before)
+            for product_id, weight in item_delta.items():
+                items[product_id] += weight
+            for a, b, w in pair_delta.itertuples(index=False):
+                pairs[(a, b)] += w
+        start = chunk_end
+    # Entries that went back to zero, as a recount does not produce them
+    return (
+        {key: w for key, w in items.items() if abs(w) > 1e-9},
+        {key: w for key, w in pairs.items() if abs(w) > 1e-9},
+    )
+
+
+@pytest.mark.parametrize("chunk", [timedelta(days=30), timedelta(days=1), timedelta(hours=1)])
+def test_incremental_matches_recount(chunk):
+    rows = _rows()
+    expected_items, expected_pairs = _recount(rows)
+    items, pairs = _incremental(rows, chunk, START + timedelta(days=10))
+
+    assert items == pytest.approx(expected_items)
+    assert pairs.keys() == expected_pairs.keys()
+    assert pairs == pytest.approx(expected_pairs)
+
+
+def test_capped_basket_keeps_the_heaviest_products():
+    baskets = recommender.to_baskets(_rows())
+    capped = baskets[baskets["basket"] == "u4:d1"]
+
+    assert len(capped) == recommender.MAX_BASKET_SIZE
+    assert {"p1", "q0"} <= set(capped["productId"])
+
+
+def test_bootstrap_ignores_rows_received_before_it():
+    rows = _rows()
+    counted_from = START + timedelta(days=3)
+    expected_items, expected_pairs = _recount(rows[rows["received"] >= counted_from])
+    items, pairs = _incremental(rows, timedelta(days=1), START + timedelta(days=10), counted_from)
+
+    assert items == pytest.approx(expected_items)
+    assert pairs == pytest.approx(expected_pairs)